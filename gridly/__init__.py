@@ -1,3 +1,7 @@
 from gridly.direction import Direction
 from gridly.location import Location
-from gridly.grid import DenseGrid, SparseGrid, CompositeGrid, Grid
+from gridly.neighbors import ADJACENT, DIAGONALS, SURROUNDING
+from gridly.grid import (
+    DenseGrid, TypedDenseGrid, SparseGrid, ChunkedGrid, MappedGrid,
+    CompositeGrid, FunctionGrid, BitGrid, NumpyGrid, Grid)
+from gridly.patch import Patch, diff, apply_patch
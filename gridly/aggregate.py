@@ -0,0 +1,255 @@
+'''
+Indexes for fast rectangle aggregates: sums, counts of non-zero cells, and
+means.
+
+SummedAreaTable answers queries in O(1) time, but is rebuilt in O(area)
+after the grid changes, so it suits grids which are read much more often than
+written. FenwickTree2D answers queries and absorbs each changed cell in
+O(log(num_rows) * log(num_columns)) time, so it suits grids which change
+between queries.
+
+Both observe the grid (see GridBase.add_observer), so they stay correct as
+long as the grid is modified through its methods. Call close(), or use the
+index as a context manager, to detach it from the grid.
+'''
+import itertools
+import operator
+
+from gridly.tracking import GridObserver
+
+
+def _identity(cell):
+    return cell
+
+
+class _RegionIndex(GridObserver):
+    '''
+    Base class for the aggregate indexes. Subclasses build self._sums and
+    self._counts, tables of key(cell) and of whether it is non-zero, and
+    implement _prefix(table, row, column), the total of a table over the
+    rectangle [0, row) x [0, column). Tables have a row and column of padding
+    at the top and left, so are (num_rows + 1) x (num_columns + 1), and are
+    stored flat.
+    '''
+    def __init__(self, grid, key=None):
+        self.grid = grid
+        self.key = _identity if key is None else key
+        self._width = grid.num_columns + 1
+        self._build()
+        grid.add_observer(self)
+
+    def _values(self):
+        '''
+        Return the padded, flat tables of key(cell), and of whether it is
+        non-zero.
+        '''
+        width = self._width
+        key = self.key
+        sums = [0] * (width * (self.grid.num_rows + 1))
+        counts = [0] * len(sums)
+        for row, cells in enumerate(self.grid.rows(), 1):
+            start = row * width + 1
+            values = list(map(key, cells))
+            sums[start:start + len(values)] = values
+            counts[start:start + len(values)] = [int(value != 0) for value in values]
+        return sums, counts
+
+    def _refresh(self):
+        '''
+        Bring the tables up to date before a query.
+        '''
+        pass
+
+    def _rect_total(self, table, top, left, num_rows, num_columns):
+        bottom = top + num_rows
+        right = left + num_columns
+        prefix = self._prefix
+        return (
+            prefix(table, bottom, right) - prefix(table, top, right) -
+            prefix(table, bottom, left) + prefix(table, top, left))
+
+    def sum(self, top, left, num_rows, num_columns):
+        '''
+        Return the sum of key(cell) over the rectangle with the given top-left
+        corner and size. Raises IndexError if the rectangle is out of range.
+        '''
+        rect = self.grid.check_rect(top, left, num_rows, num_columns)
+        self._refresh()
+        return self._rect_total(self._sums, *rect)
+
+    def count(self, top, left, num_rows, num_columns):
+        '''
+        Return the number of cells in the rectangle for which key(cell) is
+        non-zero. Raises IndexError if the rectangle is out of range.
+        '''
+        rect = self.grid.check_rect(top, left, num_rows, num_columns)
+        self._refresh()
+        return self._rect_total(self._counts, *rect)
+
+    def mean(self, top, left, num_rows, num_columns):
+        '''
+        Return the mean of key(cell) over every cell in the rectangle. Raises
+        IndexError if the rectangle is out of range, or ValueError if it is
+        empty.
+        '''
+        total = self.sum(top, left, num_rows, num_columns)
+        if num_rows * num_columns == 0:
+            raise ValueError("mean of an empty rectangle")
+        return total / (num_rows * num_columns)
+
+    def close(self):
+        '''
+        Stop observing the grid. The index can't be used afterwards.
+        '''
+        if self.grid is not None:
+            self.grid.remove_observer(self)
+            self.grid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SummedAreaTable(_RegionIndex):
+    '''
+    SummedAreaTable holds the totals of every rectangle anchored at the
+    grid's top-left corner, from which the total of any rectangle is computed
+    with four lookups. key(cell) gives the number to aggregate for a cell; by
+    default it is the cell itself. When the grid changes, the table is marked
+    stale, and rebuilt by the next query.
+    '''
+    def _build(self):
+        width = self._width
+        sums, counts = self._values()
+        for table in (sums, counts):
+            # Prefix sums along each row, then down the columns
+            for start in range(width, len(table), width):
+                table[start:start + width] = itertools.accumulate(table[start:start + width])
+            for start in range(2 * width, len(table), width):
+                table[start:start + width] = map(
+                    operator.add, table[start - width:start], table[start:start + width])
+
+        self._sums = sums
+        self._counts = counts
+        self.stale = False
+
+    def _refresh(self):
+        if self.stale:
+            self._build()
+
+    def _prefix(self, table, row, column):
+        return table[row * self._width + column]
+
+    def cells_changed(self, grid, locations):
+        self.stale = True
+
+    def rect_changed(self, grid, top, left, num_rows, num_columns):
+        self.stale = True
+
+
+class FenwickTree2D(_RegionIndex):
+    '''
+    FenwickTree2D is a two dimensional binary indexed tree over key(cell),
+    which is updated as the grid changes. key(cell) gives the number to
+    aggregate for a cell; by default it is the cell itself.
+
+    Before each write, the index reads the old values of the cells about to
+    change, and after it, adds the differences into the tree, so a write of
+    a rectangle costs O(area * log(num_rows) * log(num_columns)).
+    '''
+    def _build(self):
+        width = self._width
+        num_rows = self.grid.num_rows
+        num_columns = self.grid.num_columns
+        sums, counts = self._values()
+
+        # Linear-time construction: push each node's total into its parent,
+        # first along the rows, then along the columns.
+        for table in (sums, counts):
+            for row in range(1, num_rows + 1):
+                start = row * width
+                for column in range(1, num_columns + 1):
+                    parent = column + (column & -column)
+                    if parent <= num_columns:
+                        table[start + parent] += table[start + column]
+            for row in range(1, num_rows + 1):
+                parent = row + (row & -row)
+                if parent <= num_rows:
+                    start = row * width
+                    parent_start = parent * width
+                    for column in range(1, num_columns + 1):
+                        table[parent_start + column] += table[start + column]
+
+        self._sums = sums
+        self._counts = counts
+        self._pending = None
+
+    def _prefix(self, table, row, column):
+        width = self._width
+        total = 0
+        while row > 0:
+            start = row * width
+            index = column
+            while index > 0:
+                total += table[start + index]
+                index -= index & -index
+            row -= row & -row
+        return total
+
+    def _add(self, row, column, value, count):
+        width = self._width
+        sums = self._sums
+        counts = self._counts
+        num_rows = self.grid.num_rows
+        num_columns = self.grid.num_columns
+        row += 1
+        while row <= num_rows:
+            start = row * width
+            index = column + 1
+            while index <= num_columns:
+                sums[start + index] += value
+                counts[start + index] += count
+                index += index & -index
+            row += row & -row
+
+    def _apply(self, grid):
+        '''
+        Add the differences between the pending old values and the grid's
+        current values into the tree.
+        '''
+        key = self.key
+        unsafe_get = grid.unsafe_get
+        for location, old in self._pending.items():
+            new = key(unsafe_get(location))
+            if new != old:
+                self._add(location[0], location[1], new - old, int(new != 0) - int(old != 0))
+        self._pending = None
+
+    def cells_changing(self, grid, locations):
+        key = self.key
+        unsafe_get = grid.unsafe_get
+        # A location may appear more than once in a batch; its old value is
+        # the value before the whole batch.
+        pending = {}
+        for location in locations:
+            if location not in pending:
+                pending[location] = key(unsafe_get(location))
+        self._pending = pending
+
+    def cells_changed(self, grid, locations):
+        self._apply(grid)
+
+    def rect_changing(self, grid, top, left, num_rows, num_columns):
+        key = self.key
+        right = left + num_columns
+        pending = {}
+        for row in range(top, top + num_rows):
+            cells = itertools.islice(grid.unsafe_row(row), left, right)
+            for column, cell in zip(range(left, right), cells):
+                pending[row, column] = key(cell)
+        self._pending = pending
+
+    def rect_changed(self, grid, top, left, num_rows, num_columns):
+        self._apply(grid)
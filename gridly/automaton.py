@@ -0,0 +1,192 @@
+'''
+Double-buffered cellular automaton stepping.
+'''
+import copy
+import operator
+
+from gridly.neighbors import SURROUNDING
+
+try:
+    import numpy
+except ImportError:  # numpy is an optional dependency
+    numpy = None
+
+
+def _flat_content(grid):
+    '''
+    Return the content of a dense grid as a flat, row-major sequence.
+    '''
+    content = grid.content
+    if numpy is not None and isinstance(content, numpy.ndarray):
+        return content.reshape(-1)
+    return content
+
+
+def _clone(grid):
+    '''
+    Create a grid of the same type, shape and content as a dense grid
+    '''
+    clone = copy.copy(grid)
+    clone.content = copy.copy(grid.content)
+    return clone
+
+
+class Automaton:
+    '''
+    Automaton runs a cellular automaton over a dense grid (a DenseGrid,
+    TypedDenseGrid or NumpyGrid). It keeps two grids of the same type and
+    swaps between them each generation, so stepping allocates no new grids.
+
+    The rule is given either as a function, rule(cell, neighbors), which
+    returns the next value of a cell given the current value and a list of the
+    values of its in-bounds neighbors, or as a table for totalistic rules over
+    integer states, where table[cell][sum of neighbors] is the next value.
+    For example, Conway's Game of Life is:
+
+        table=[[0, 0, 0, 1, 0, 0, 0, 0, 0], [0, 0, 1, 1, 0, 0, 0, 0, 0]]
+
+    When a table is used and numpy is available, TypedDenseGrids and
+    NumpyGrids are stepped with vectorized numpy operations. Otherwise, if
+    tile_size is given, the grid is divided into square tiles, and tiles whose
+    neighborhoods did not change in the previous generation are skipped. This
+    requires that the stencil not reach further than one tile. If the grid is
+    modified other than by stepping, call invalidate().
+
+    Each step writes the next generation into the other grid, reporting the
+    write to that grid's observers, and then makes it the current grid, so
+    automaton.grid is a different object after each step.
+    '''
+    def __init__(self, grid, rule=None, *, table=None, stencil=SURROUNDING, tile_size=None):
+        if (rule is None) == (table is None):
+            raise ValueError("Exactly one of rule or table must be given")
+
+        if numpy is not None and isinstance(grid.content, numpy.ndarray):
+            if not grid.content.flags.c_contiguous:
+                raise ValueError("NumpyGrid content must be C-contiguous")
+
+        self.grid = grid
+        self._back = _clone(grid)
+        self.rule = rule
+        self.table = table
+        self.stencil = stencil
+        self.generation = 0
+
+        self._vectorized = (
+            table is not None and numpy is not None and
+            self._as_array(grid) is not None)
+        if self._vectorized:
+            self._table = numpy.array(table)
+
+        if tile_size is None:
+            tile_size = max(grid.num_rows, grid.num_columns, 1)
+        else:
+            reach = max(max(abs(row), abs(column)) for row, column in stencil)
+            if reach > tile_size:
+                raise ValueError("tile_size must be at least the stencil's reach", tile_size)
+
+        self.tile_size = tile_size
+        self._tile_rows = -(-grid.num_rows // tile_size)
+        self._tile_columns = -(-grid.num_columns // tile_size)
+        self.invalidate()
+
+    @staticmethod
+    def _as_array(grid):
+        '''
+        Return a 2D numpy array sharing memory with grid, or None if there
+        isn't one.
+        '''
+        if hasattr(grid, 'typecode') or isinstance(grid.content, numpy.ndarray):
+            return grid.to_numpy()
+        return None
+
+    def invalidate(self):
+        '''
+        Mark every tile as changed, so the next step recomputes the whole grid.
+        '''
+        self._active = {
+            (tile_row, tile_column)
+            for tile_row in range(self._tile_rows)
+            for tile_column in range(self._tile_columns)}
+
+    def step(self, generations=1):
+        '''
+        Advance the automaton by some number of generations.
+        '''
+        for _ in range(generations):
+            if self._vectorized:
+                self._step_vectorized()
+            else:
+                self._step_tiles()
+            self.grid, self._back = self._back, self.grid
+            self.generation += 1
+
+    def _step_vectorized(self):
+        front = self._as_array(self.grid)
+        num_rows, num_columns = front.shape
+        reach = max(max(abs(row), abs(column)) for row, column in self.stencil)
+
+        # Sum the neighbors by adding shifted views of a zero-padded copy
+        padded = numpy.pad(front, reach)
+        sums = numpy.zeros(front.shape, dtype=numpy.int64)
+        for row, column in self.stencil:
+            sums += padded[
+                reach + row:reach + row + num_rows,
+                reach + column:reach + column + num_columns]
+
+        # Report the write, so observers of the back grid see it
+        self._back._observed_rect(
+            (0, 0, num_rows, num_columns), operator.setitem,
+            self._as_array(self._back), Ellipsis, self._table[front, sums])
+
+    def _step_tile(self, front, back, top, left, num_rows, num_columns):
+        '''
+        Compute the next generation of a tile into back. Return true if any
+        cell changed.
+        '''
+        grid_columns = self.grid.num_columns
+        neighbor_indices = self.grid.neighbor_table(self.stencil).neighbor_indices
+        rule = self.rule
+        table = self.table
+        changed = False
+
+        for row in range(top, top + num_rows):
+            start = row * grid_columns + left
+            for index in range(start, start + num_columns):
+                cell = front[index]
+                if table is not None:
+                    new = table[cell][sum([front[neighbor] for neighbor in neighbor_indices(index)])]
+                else:
+                    new = rule(cell, [front[neighbor] for neighbor in neighbor_indices(index)])
+                back[index] = new
+                if new != cell:
+                    changed = True
+        return changed
+
+    def _step_tiles(self):
+        front = _flat_content(self.grid)
+        back = _flat_content(self._back)
+        num_rows, num_columns = self.grid.dimensions
+        tile_size = self.tile_size
+        changed = set()
+
+        for tile_row, tile_column in self._active:
+            top = tile_row * tile_size
+            left = tile_column * tile_size
+            rect = (top, left, min(tile_size, num_rows - top), min(tile_size, num_columns - left))
+            # The back grid's content is written directly, so the write is
+            # reported to its observers here
+            if self._back._observed_rect(rect, self._step_tile, front, back, *rect):
+                changed.add((tile_row, tile_column))
+
+        # Tiles which weren't recomputed didn't change in the previous
+        # generation either, so they're already the same in both buffers.
+        # The tiles to compute next time are the changed tiles and their
+        # neighbors.
+        tile_rows = range(self._tile_rows)
+        tile_columns = range(self._tile_columns)
+        self._active = {
+            (tile_row + row, tile_column + column)
+            for tile_row, tile_column in changed
+            for row in (-1, 0, 1)
+            for column in (-1, 0, 1)
+            if tile_row + row in tile_rows and tile_column + column in tile_columns}
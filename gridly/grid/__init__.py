@@ -1,4 +1,15 @@
-from gridly.grid.dense import DenseGrid
+from gridly.grid.dense import DenseGrid, TypedDenseGrid
 from gridly.grid.sparse import SparseGrid
 from gridly.grid.composite import CompositeGrid
+from gridly.grid.chunked import ChunkedGrid
+from gridly.grid.mapped import MappedGrid
+from gridly.grid.function import FunctionGrid
+from gridly.grid.bit import BitGrid
+from gridly.grid.snapshot import SnapshotGrid
+from gridly.grid.instrumented import InstrumentedGrid
 Grid = DenseGrid
+
+try:
+    from gridly.grid.ndarray import NumpyGrid
+except ImportError:  # numpy is an optional dependency
+    NumpyGrid = None
@@ -1,5 +1,40 @@
 import abc
+import inspect
+import itertools
+
 from gridly import Location
+from gridly.neighbors import ADJACENT, neighbor_table
+
+# The unsafe_* mutators which are wrapped while a grid has observers. Every
+# write to a grid goes through one of these.
+_MUTATORS = (
+    'unsafe_set', 'unsafe_set_flat', 'unsafe_set_many', 'unsafe_fill_rect',
+    'unsafe_copy_rect', 'unsafe_set_row', 'unsafe_set_column')
+
+
+def _describe_change(grid, name, args):
+    '''
+    Given a mutator name and its arguments, return (kind, change, args), where
+    kind is 'cells' or 'rect', change is a list of locations or a
+    (top, left, num_rows, num_columns) rectangle, and args are the arguments
+    to pass on (which may have been materialized).
+    '''
+    if name == 'unsafe_set':
+        return 'cells', [Location(*args[0])], args
+    if name == 'unsafe_set_flat':
+        return 'cells', [Location(*divmod(args[0], grid.num_columns))], args
+    if name == 'unsafe_set_many':
+        pairs = list(args[0])
+        return 'cells', [Location(*location) for location, _ in pairs], (pairs,)
+    if name == 'unsafe_fill_rect':
+        return 'rect', args[:4], args
+    if name == 'unsafe_copy_rect':
+        return 'rect', args[1:3] + args[5:7], args
+    if name == 'unsafe_set_row':
+        return 'rect', (args[0], 0, 1, grid.num_columns), args
+    if name == 'unsafe_set_column':
+        return 'rect', (0, args[0], grid.num_rows, 1), args
+    raise ValueError(name)
 
 
 class GridBase(metaclass=abc.ABCMeta):
@@ -14,10 +49,22 @@ class GridBase(metaclass=abc.ABCMeta):
     iterates over all cells in a row) only bounds-checks the row once.
     '''
 
+    # Replaced with a list on the instance when the first observer is added
+    _observers = ()
+    _observer_depth = 0
+
     def __init__(self, num_rows, num_columns):
         self._row_range = range(num_rows)
         self._col_range = range(num_columns)
 
+    def __getstate__(self):
+        # Observers and the mutator wrappers belong to this instance; copies
+        # and pickles start out unobserved.
+        state = self.__dict__.copy()
+        for name in ('_observers', '_observer_depth') + _MUTATORS:
+            state.pop(name, None)
+        return state
+
     @property
     def num_rows(self):
         return len(self._row_range)
@@ -99,6 +146,75 @@ class GridBase(metaclass=abc.ABCMeta):
         else:
             raise IndexError(location)
 
+    def valid_rect(self, top, left, num_rows, num_columns):
+        '''
+        Return true if the rectangle with the given top-left corner and size
+        lies entirely within the bounds of this grid. Raise a TypeError if any
+        argument is not an int.
+        '''
+        for value in (top, left, num_rows, num_columns):
+            if not isinstance(value, int):
+                raise TypeError(value)
+
+        return (
+            num_rows >= 0 and num_columns >= 0 and
+            0 <= top and top + num_rows <= self.num_rows and
+            0 <= left and left + num_columns <= self.num_columns)
+
+    def check_rect(self, top, left, num_rows, num_columns):
+        '''
+        Return the (top, left, num_rows, num_columns) rectangle if it is valid.
+        Raise IndexError otherwise. May also raise a TypeError if any argument
+        is an invalid type.
+        '''
+        rect = (top, left, num_rows, num_columns)
+        if self.valid_rect(*rect):
+            return rect
+        else:
+            raise IndexError(rect)
+
+    def valid_index(self, index):
+        '''
+        Return true if a row-major flat index is in the bounds of this grid.
+        Raise a TypeError if index is not an int.
+        '''
+        if not isinstance(index, int):
+            raise TypeError(index)
+
+        return 0 <= index < self.num_rows * self.num_columns
+
+    def check_index(self, index):
+        '''
+        Return the flat index if it is in the bounds. Raise IndexError
+        otherwise. May also raise a TypeError if index is an invalid type.
+        '''
+        if self.valid_index(index):
+            return index
+        else:
+            raise IndexError(index)
+
+    def check_locations(self, locations):
+        '''
+        Return the locations as a list if they are all valid. Raise IndexError
+        (or TypeError) for the first invalid location otherwise. The whole batch
+        is validated in one step, by checking the types and the extremes of the
+        rows and columns, rather than checking each location individually.
+        '''
+        locations = list(locations)
+
+        if locations and set(map(len, locations)) == {2}:
+            rows, columns = zip(*locations)
+            if (set(map(type, rows + columns)) == {int} and
+                    0 <= min(rows) and max(rows) < self.num_rows and
+                    0 <= min(columns) and max(columns) < self.num_columns):
+                return locations
+
+        # Slow path. Either the batch is empty or some location is invalid;
+        # find it so that the error matches what check_location would raise.
+        for location in locations:
+            self.check_location(location)
+        return locations
+
     ####################################################################
     # Basic element access
     ####################################################################
@@ -125,6 +241,197 @@ class GridBase(metaclass=abc.ABCMeta):
     get = __getitem__
     set = __setitem__
 
+    ####################################################################
+    # Flat indexes
+    ####################################################################
+    # Every cell also has a row-major flat index, row * num_columns + column.
+    # Hot loops can work entirely in flat indexes, avoiding a Location for
+    # each cell; grid types with flat storage override the unsafe_*_flat
+    # methods to index it directly.
+
+    def unsafe_index(self, location):
+        '''
+        Return the flat index of a location. Performs no bounds checking.
+        '''
+        return location[0] * self.num_columns + location[1]
+
+    def index(self, location):
+        '''
+        Return the flat index of a location. Raises IndexError if location is
+        out of range.
+        '''
+        row, column = self.check_location(location)
+        return row * self.num_columns + column
+
+    def unsafe_location(self, index):
+        '''
+        Return the Location of a flat index. Performs no bounds checking.
+        '''
+        return Location(*divmod(index, self.num_columns))
+
+    def location(self, index):
+        '''
+        Return the Location of a flat index. Raises IndexError if index is out
+        of range.
+        '''
+        return Location(*divmod(self.check_index(index), self.num_columns))
+
+    def unsafe_get_flat(self, index):
+        return self.unsafe_get(divmod(index, self.num_columns))
+
+    def unsafe_set_flat(self, index, value):
+        self.unsafe_set(divmod(index, self.num_columns), value)
+
+    def get_flat(self, index):
+        '''
+        Return the cell at a flat index. Raises IndexError if index is out of
+        range.
+        '''
+        return self.unsafe_get_flat(self.check_index(index))
+
+    def set_flat(self, index, value):
+        '''
+        Set the cell at a flat index. Raises IndexError if index is out of
+        range.
+        '''
+        self.unsafe_set_flat(self.check_index(index), value)
+
+    def cells_flat(self):
+        '''
+        Iterate over (index, cell) pairs for every cell, in row-major order.
+        '''
+        return enumerate(itertools.chain.from_iterable(
+            map(self.unsafe_row, self._row_range)))
+
+    ####################################################################
+    # Bulk element access
+    ####################################################################
+    # The bulk methods check a whole batch, row, or rectangle once, then
+    # hand off to an unsafe_* method. Grid types override the unsafe_*
+    # methods to write straight into their storage.
+
+    def unsafe_get_many(self, locations):
+        '''
+        Return a list of the cells at each location. Performs no bounds checking.
+        '''
+        return list(map(self.unsafe_get, locations))
+
+    def unsafe_set_many(self, pairs):
+        '''
+        Given an iterable of (location, value) pairs, set each cell. Performs
+        no bounds checking.
+        '''
+        unsafe_set = self.unsafe_set
+        for location, value in pairs:
+            unsafe_set(location, value)
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        '''
+        Set every cell in a rectangle to value. Performs no bounds checking.
+        '''
+        columns = range(left, left + num_columns)
+        self.unsafe_set_many(
+            ((row, column), value)
+            for row in range(top, top + num_rows)
+            for column in columns)
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        '''
+        Copy a rectangle of cells from source, starting at (source_top,
+        source_left), into this grid, starting at (top, left). Performs no
+        bounds checking. The source rectangle is read completely before
+        anything is written, so it is safe for the source and destination
+        to overlap.
+        '''
+        source_get = source.unsafe_get
+        columns = range(num_columns)
+        pairs = [
+            ((top + row, left + column), source_get((source_top + row, source_left + column)))
+            for row in range(num_rows)
+            for column in columns]
+        self.unsafe_set_many(pairs)
+
+    def unsafe_set_row(self, row, values):
+        '''
+        Set every cell in a row from a sequence of num_columns values. Performs
+        no bounds checking.
+        '''
+        self.unsafe_set_many(zip(((row, column) for column in self._col_range), values))
+
+    def unsafe_set_column(self, column, values):
+        '''
+        Set every cell in a column from a sequence of num_rows values. Performs
+        no bounds checking.
+        '''
+        self.unsafe_set_many(zip(((row, column) for row in self._row_range), values))
+
+    def get_many(self, locations):
+        '''
+        Return a list of the cells at each location. Raises IndexError if any
+        location is out of range, in which case nothing is read.
+        '''
+        return self.unsafe_get_many(self.check_locations(locations))
+
+    def set_many(self, pairs):
+        '''
+        Given an iterable of (location, value) pairs, set each cell. Raises
+        IndexError if any location is out of range, in which case nothing is
+        written.
+        '''
+        pairs = list(pairs)
+        self.check_locations(location for location, value in pairs)
+        self.unsafe_set_many(pairs)
+
+    def fill_rect(self, top, left, num_rows, num_columns, value):
+        '''
+        Set every cell in the rectangle with the given top-left corner and size
+        to value. Raises IndexError if the rectangle is out of range.
+        '''
+        self.check_rect(top, left, num_rows, num_columns)
+        self.unsafe_fill_rect(top, left, num_rows, num_columns, value)
+
+    def copy_rect(self, source, top, left, source_top=0, source_left=0, num_rows=None, num_columns=None):
+        '''
+        Copy a rectangle of cells from the source grid into this grid. The
+        rectangle starts at (source_top, source_left) in the source and at
+        (top, left) in this grid. By default it extends to the bottom-right
+        corner of the source. Raises IndexError if the rectangle is out of
+        range of either grid.
+        '''
+        if num_rows is None:
+            num_rows = source.num_rows - source_top
+        if num_columns is None:
+            num_columns = source.num_columns - source_left
+
+        source.check_rect(source_top, source_left, num_rows, num_columns)
+        self.check_rect(top, left, num_rows, num_columns)
+        self.unsafe_copy_rect(
+            source, top, left, source_top, source_left, num_rows, num_columns)
+
+    def set_row(self, row, values):
+        '''
+        Set every cell in a row from an iterable of values. Raises IndexError
+        if the row is out of range, or ValueError if there isn't exactly one
+        value for each column.
+        '''
+        self.check_row(row)
+        values = list(values)
+        if len(values) != self.num_columns:
+            raise ValueError("values must have length {}".format(self.num_columns))
+        self.unsafe_set_row(row, values)
+
+    def set_column(self, column, values):
+        '''
+        Set every cell in a column from an iterable of values. Raises IndexError
+        if the column is out of range, or ValueError if there isn't exactly one
+        value for each row.
+        '''
+        self.check_column(column)
+        values = list(values)
+        if len(values) != self.num_rows:
+            raise ValueError("values must have length {}".format(self.num_rows))
+        self.unsafe_set_column(column, values)
+
     ####################################################################
     # Iterators
     ####################################################################
@@ -227,3 +534,264 @@ class GridBase(metaclass=abc.ABCMeta):
         the locations that are within the bounds of the grid
         '''
         return self.unsafe_cells(self.in_bounds(locations))
+
+    ####################################################################
+    # Observers
+    ####################################################################
+    # Observers are notified before and after every write through the
+    # unsafe_* mutators (and so through every safe method). An observer
+    # implements the methods of gridly.tracking.GridObserver:
+    #
+    #   cells_changing(grid, locations) / cells_changed(grid, locations)
+    #   rect_changing(grid, top, left, num_rows, num_columns)
+    #   rect_changed(grid, top, left, num_rows, num_columns)
+    #
+    # While a grid has observers, its mutators are shadowed by wrappers on
+    # the instance; when the last observer is removed the wrappers are
+    # deleted, so unobserved grids pay nothing. Writes made directly to a
+    # grid's content, bypassing its methods, are not observed; nor are writes
+    # through arrays shared with to_numpy() or NumpyGrid.region(). Grid
+    # methods which write to their storage in bulk report the write as a
+    # rect change with _observed_rect.
+
+    def add_observer(self, observer):
+        '''
+        Start notifying observer of changes to this grid.
+        '''
+        if not self._observers:
+            self._observers = []
+            for name in _MUTATORS:
+                setattr(self, name, self._observed_mutator(name))
+        self._observers.append(observer)
+
+    def remove_observer(self, observer):
+        '''
+        Stop notifying observer of changes to this grid. Raises ValueError if
+        it isn't an observer.
+        '''
+        if observer not in self._observers:
+            raise ValueError("Not an observer of this grid", observer)
+
+        self._observers.remove(observer)
+        if not self._observers:
+            del self._observers
+            for name in _MUTATORS:
+                delattr(self, name)
+
+    def _observed_mutator(self, name):
+        '''
+        Create the instance wrapper for a mutator. Only the outermost write is
+        reported; mutators called by other mutators run unwrapped.
+        '''
+        method = getattr(type(self), name).__get__(self)
+
+        def observed(*args, **kwargs):
+            if self._observer_depth:
+                return method(*args, **kwargs)
+
+            if kwargs:
+                # Normalize to positional arguments, so the change can be
+                # described
+                args = inspect.signature(method).bind(*args, **kwargs).args
+            kind, change, args = _describe_change(self, name, args)
+            self._notify(kind + '_changing', kind, change)
+            self._observer_depth += 1
+            try:
+                return method(*args)
+            finally:
+                self._observer_depth -= 1
+                self._notify(kind + '_changed', kind, change)
+
+        return observed
+
+    def _notify(self, hook, kind, change):
+        for observer in list(self._observers):
+            if kind == 'cells':
+                getattr(observer, hook)(self, change)
+            else:
+                getattr(observer, hook)(self, *change)
+
+    def _observed_rect(self, rect, method, *args):
+        '''
+        Call method(*args), which writes to the (top, left, num_rows,
+        num_columns) rectangle rect, and report the write to any observers.
+        Grid types use this for writes which don't go through the mutators,
+        such as vectorized operations on their storage.
+        '''
+        if not self._observers or self._observer_depth:
+            return method(*args)
+
+        self._notify('rect_changing', 'rect', rect)
+        self._observer_depth += 1
+        try:
+            return method(*args)
+        finally:
+            self._observer_depth -= 1
+            self._notify('rect_changed', 'rect', rect)
+
+    ####################################################################
+    # Neighbors
+    ####################################################################
+    # Neighbor lookups use a NeighborTable, which is built once per grid shape
+    # and stencil and cached. A stencil is a sequence of (row, column)
+    # offsets; see gridly.neighbors for the common ones.
+
+    def neighbor_table(self, stencil=ADJACENT):
+        '''
+        Return the (cached) NeighborTable for this grid's shape and a stencil.
+        '''
+        return neighbor_table(self.num_rows, self.num_columns, stencil)
+
+    def neighbors(self, location, stencil=ADJACENT):
+        '''
+        Return a list of the in-bounds neighbors of location. Raises IndexError
+        if location is out of range.
+        '''
+        return self.neighbor_table(stencil).neighbors(self.check_location(location))
+
+    def neighbor_indices(self, index, stencil=ADJACENT):
+        '''
+        Return a list of the flat indexes of the in-bounds neighbors of the
+        cell at a flat index. Raises IndexError if index is out of range.
+        '''
+        return self.neighbor_table(stencil).neighbor_indices(self.check_index(index))
+
+    def flat_offsets(self, stencil=ADJACENT):
+        '''
+        Return a tuple of the flat index offsets of a stencil for this grid's
+        shape. Adding an offset to a flat index only gives the neighbor's index
+        if the neighbor is in bounds; use neighbor_indices near the edges.
+        '''
+        return self.neighbor_table(stencil).flat_offsets
+
+    def neighbor_cells(self, location, stencil=ADJACENT):
+        '''
+        Iterate over (location, cell) pairs for the in-bounds neighbors of
+        location. Raises IndexError if location is out of range.
+        '''
+        return self.unsafe_cells(self.neighbors(location, stencil))
+
+    def distance_field(self, sources, passable=None, *, metric='manhattan', stencil=None):
+        '''
+        Return a DistanceField of the distance from the nearest of sources to
+        every cell of this grid. See gridly.path.distance_field.
+        '''
+        from gridly.path import distance_field
+        return distance_field(self, sources, passable, metric=metric, stencil=stencil)
+
+    ####################################################################
+    # Views
+    ####################################################################
+    # Views share data with this grid: reads and writes through a view are
+    # remapped onto this grid, and nothing is copied.
+
+    def _transformed_view(self, origin, row_step, column_step, num_rows, num_columns):
+        '''
+        Create a view where view cell (row, column) is the location
+        origin + row * row_step + column * column_step in this grid. Grid
+        types override this to create views specialized for their storage.
+        '''
+        from gridly.grid.view import GridView
+        return GridView(self, origin, row_step, column_step, num_rows, num_columns)
+
+    def view(self, top, left, num_rows, num_columns):
+        '''
+        Return a view of the rectangular region with the given top-left corner
+        and size. Raises IndexError if the region is out of range.
+        '''
+        self.check_rect(top, left, num_rows, num_columns)
+        return self._transformed_view(
+            (top, left), (1, 0), (0, 1), num_rows, num_columns)
+
+    def transposed(self):
+        '''
+        Return a view of this grid with rows and columns swapped.
+        '''
+        return self._transformed_view(
+            (0, 0), (0, 1), (1, 0), self.num_columns, self.num_rows)
+
+    def rotated(self, turns=1):
+        '''
+        Return a view of this grid rotated clockwise by the given number of
+        quarter turns. Negative turns rotate counter-clockwise.
+        '''
+        num_rows, num_columns = self.dimensions
+        turns %= 4
+        if turns == 0:
+            return self._transformed_view(
+                (0, 0), (1, 0), (0, 1), num_rows, num_columns)
+        elif turns == 1:
+            return self._transformed_view(
+                (num_rows - 1, 0), (0, 1), (-1, 0), num_columns, num_rows)
+        elif turns == 2:
+            return self._transformed_view(
+                (num_rows - 1, num_columns - 1), (-1, 0), (0, -1),
+                num_rows, num_columns)
+        else:
+            return self._transformed_view(
+                (0, num_columns - 1), (0, -1), (1, 0), num_columns, num_rows)
+
+    def flipped_vertically(self):
+        '''
+        Return a view of this grid with the order of the rows reversed.
+        '''
+        return self._transformed_view(
+            (self.num_rows - 1, 0), (-1, 0), (0, 1), self.num_rows, self.num_columns)
+
+    def flipped_horizontally(self):
+        '''
+        Return a view of this grid with the order of the columns reversed.
+        '''
+        return self._transformed_view(
+            (0, self.num_columns - 1), (1, 0), (0, -1), self.num_rows, self.num_columns)
+
+    ####################################################################
+    # Serialization
+    ####################################################################
+    def save(self, file, *, compress=False):
+        '''
+        Save this grid to a path or binary file object. See gridly.serialize.
+        '''
+        from gridly.serialize import save
+        save(self, file, compress=compress)
+
+    @classmethod
+    def load(cls, file, *, trusted=False):
+        '''
+        Load a grid from a path or binary file object, as this type of grid.
+        Pickled values are only loaded if they are plain data, unless trusted
+        is true; never pass trusted=True for a file from an untrusted source.
+        Raises ValueError if the file can't be loaded as this type of grid.
+        To load into an existing grid, such as a MappedGrid, use
+        gridly.serialize.load_into.
+        '''
+        from gridly.serialize import load
+        grid = load(file, trusted=trusted)
+        if isinstance(grid, cls):
+            return grid
+        return cls._convert_loaded(grid)
+
+    @classmethod
+    def _convert_loaded(cls, grid):
+        '''
+        Convert a grid returned by gridly.serialize.load to this type of grid.
+        Grid types which can be built from any grid override this.
+        '''
+        raise ValueError("File contains a {}, not a {}".format(
+            type(grid).__name__, cls.__name__))
+
+    ####################################################################
+    # NumPy interop
+    ####################################################################
+    # numpy is an optional dependency, so it is only imported when one of
+    # these methods is actually called.
+
+    def to_numpy(self, dtype=None):
+        '''
+        Return a new 2D numpy array with the contents of this grid. Requires
+        numpy.
+        '''
+        import numpy
+        return numpy.array(
+            [list(row) for row in self.rows()],
+            dtype=dtype).reshape(self.dimensions)
@@ -0,0 +1,316 @@
+import operator
+
+from gridly import Location
+from gridly.grid.base import GridBase
+from gridly.neighbors import ADJACENT
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+_OPERATORS = {
+    'and': operator.and_,
+    'or': operator.or_,
+    'xor': operator.xor,
+}
+
+
+def _bits(values):
+    '''
+    Return the int with bit c set for each truthy value at position c. The
+    binary digits are joined as a string and parsed once, which takes
+    linear time, where summing shifted bits would take quadratic time.
+    '''
+    return int(''.join(['1' if value else '0' for value in values])[::-1] or '0', 2)
+
+
+class BitGrid(GridBase):
+    '''
+    BitGrid is for boolean grids, such as masks. Each row is stored as a
+    single Python int, with column c in bit c, so a cell takes one bit, and
+    whole rows are combined, counted and shifted with single integer
+    operations. Cells read as True or False; writing any truthy value sets a
+    cell.
+
+    BitGrids of the same dimensions can be combined with &, |, ^ and ~ (and
+    the in-place forms); combine_rect and invert_rect work on rectangles.
+    shifted, dilated and eroded build new grids from whole-row shifts.
+    Observers are notified of bitwise operations in place, as rectangle
+    changes.
+    '''
+    def __init__(self, num_rows, num_columns, *, fill=False):
+        GridBase.__init__(self, num_rows, num_columns)
+        self._mask = (1 << num_columns) - 1
+        self.bits = [self._mask if fill else 0] * num_rows
+
+    @classmethod
+    def from_grid(cls, grid, predicate=bool):
+        '''
+        Create a BitGrid with the dimensions of another grid, where each cell
+        is predicate(cell) of the other grid's cell.
+        '''
+        result = cls(grid.num_rows, grid.num_columns)
+        result.bits = [_bits(map(predicate, row)) for row in grid.rows()]
+        return result
+
+    def copy(self):
+        '''
+        Return a new BitGrid with the same cells.
+        '''
+        result = BitGrid(self.num_rows, self.num_columns)
+        result.bits = list(self.bits)
+        return result
+
+    def _rect_mask(self, left, num_columns):
+        return ((1 << num_columns) - 1) << left
+
+    ####################################################################
+    # Basic element access
+    ####################################################################
+    def unsafe_get(self, location):
+        return (self.bits[location[0]] >> location[1]) & 1 == 1
+
+    def unsafe_set(self, location, value):
+        row, column = location
+        if value:
+            self.bits[row] |= 1 << column
+        else:
+            self.bits[row] &= ~(1 << column)
+
+    ####################################################################
+    # Bulk access
+    ####################################################################
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        mask = self._rect_mask(left, num_columns)
+        bits = self.bits
+        if value:
+            for row in range(top, top + num_rows):
+                bits[row] |= mask
+        else:
+            mask = ~mask
+            for row in range(top, top + num_rows):
+                bits[row] &= mask
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        if isinstance(source, BitGrid):
+            self._combine_rect(
+                None, source, top, left, source_top, source_left, num_rows, num_columns)
+        else:
+            GridBase.unsafe_copy_rect(
+                self, source, top, left, source_top, source_left, num_rows, num_columns)
+
+    def unsafe_set_row(self, row, values):
+        self.bits[row] = _bits(values)
+
+    ####################################################################
+    # Iterators
+    ####################################################################
+    def unsafe_row(self, row):
+        if not self.num_columns:
+            # format would still produce a single '0' digit
+            return iter(())
+        # The binary representation, least significant bit first
+        digits = format(self.bits[row], '0{}b'.format(self.num_columns))[::-1]
+        return map('1'.__eq__, digits)
+
+    def true_locations(self):
+        '''
+        Iterate over the locations of every True cell, in row-major order.
+        '''
+        for row, bits in enumerate(self.bits):
+            while bits:
+                lowest = bits & -bits
+                yield Location(row, lowest.bit_length() - 1)
+                bits ^= lowest
+
+    ####################################################################
+    # Counting and scanning
+    ####################################################################
+    def count(self):
+        '''
+        Return the number of True cells.
+        '''
+        return sum(map(_popcount, self.bits))
+
+    def unsafe_count_rect(self, top, left, num_rows, num_columns):
+        mask = self._rect_mask(left, num_columns)
+        return sum(_popcount(bits & mask) for bits in self.bits[top:top + num_rows])
+
+    def count_rect(self, top, left, num_rows, num_columns):
+        '''
+        Return the number of True cells in a rectangle. Raises IndexError if
+        the rectangle is out of range.
+        '''
+        return self.unsafe_count_rect(*self.check_rect(top, left, num_rows, num_columns))
+
+    def unsafe_find(self, row, start=0, value=True):
+        bits = self.bits[row]
+        if not value:
+            bits = ~bits & self._mask
+        bits >>= start
+        if not bits:
+            return None
+        return start + (bits & -bits).bit_length() - 1
+
+    def find(self, row, start=0, value=True):
+        '''
+        Return the column of the first cell in a row, at or after column
+        start, which is equal to value, or None if there isn't one. Raises
+        IndexError if row or start is out of range.
+        '''
+        self.check_row(row)
+        if start != self.num_columns:
+            self.check_column(start)
+        return self.unsafe_find(row, start, value)
+
+    ####################################################################
+    # Bitwise operations
+    ####################################################################
+    def _check_same_dimensions(self, other):
+        if other.dimensions != self.dimensions:
+            raise ValueError("BitGrid dimensions differ", self.dimensions, other.dimensions)
+
+    def _combined(self, other, op):
+        if not isinstance(other, BitGrid):
+            return NotImplemented
+        self._check_same_dimensions(other)
+        result = BitGrid(self.num_rows, self.num_columns)
+        result.bits = list(map(op, self.bits, other.bits))
+        return result
+
+    def _combine(self, other, op):
+        if not isinstance(other, BitGrid):
+            return NotImplemented
+        self._check_same_dimensions(other)
+        self._observed_rect(
+            (0, 0, self.num_rows, self.num_columns), self._combine_all, other, op)
+        return self
+
+    def _combine_all(self, other, op):
+        self.bits[:] = map(op, self.bits, other.bits)
+
+    def __and__(self, other):
+        return self._combined(other, operator.and_)
+
+    def __or__(self, other):
+        return self._combined(other, operator.or_)
+
+    def __xor__(self, other):
+        return self._combined(other, operator.xor)
+
+    def __iand__(self, other):
+        return self._combine(other, operator.and_)
+
+    def __ior__(self, other):
+        return self._combine(other, operator.or_)
+
+    def __ixor__(self, other):
+        return self._combine(other, operator.xor)
+
+    def __invert__(self):
+        mask = self._mask
+        result = BitGrid(self.num_rows, self.num_columns)
+        result.bits = [bits ^ mask for bits in self.bits]
+        return result
+
+    # _combine_rect and _invert_rect write bits directly, without bounds
+    # checks or notifying observers, so they are only called from the
+    # observed methods: combine_rect, invert_rect and unsafe_copy_rect.
+
+    def _combine_rect(self, op, source, top, left, source_top, source_left, num_rows, num_columns):
+        op = None if op is None else _OPERATORS[op]
+        mask = self._rect_mask(left, num_columns)
+        keep = ~mask
+        shift = left - source_left
+        bits = self.bits
+        source_bits = source.bits[source_top:source_top + num_rows]
+        for row, other in enumerate(source_bits, top):
+            other = (other << shift if shift >= 0 else other >> -shift) & mask
+            if op is None:
+                bits[row] = (bits[row] & keep) | other
+            else:
+                bits[row] = (bits[row] & keep) | (op(bits[row], other) & mask)
+
+    def combine_rect(self, op, source, top, left, source_top=0, source_left=0, num_rows=None, num_columns=None):
+        '''
+        Combine a rectangle of another BitGrid into this one with op, which
+        is 'and', 'or' or 'xor'. The rectangle is placed at (top, left) in this
+        grid, and taken from (source_top, source_left) in source; its size
+        defaults to the rest of the source. Raises IndexError if either
+        rectangle is out of range, TypeError if source isn't a BitGrid, or
+        ValueError if op is unknown.
+        '''
+        if op not in _OPERATORS:
+            raise ValueError("Unknown operation", op)
+        if not isinstance(source, BitGrid):
+            raise TypeError("Expected a BitGrid", type(source).__name__)
+        if num_rows is None:
+            num_rows = source.num_rows - source_top
+        if num_columns is None:
+            num_columns = source.num_columns - source_left
+        source.check_rect(source_top, source_left, num_rows, num_columns)
+        self.check_rect(top, left, num_rows, num_columns)
+        self._observed_rect(
+            (top, left, num_rows, num_columns), self._combine_rect,
+            op, source, top, left, source_top, source_left, num_rows, num_columns)
+
+    def _invert_rect(self, top, left, num_rows, num_columns):
+        mask = self._rect_mask(left, num_columns)
+        bits = self.bits
+        for row in range(top, top + num_rows):
+            bits[row] ^= mask
+
+    def invert_rect(self, top, left, num_rows, num_columns):
+        '''
+        Invert every cell in a rectangle. Raises IndexError if the rectangle
+        is out of range.
+        '''
+        rect = self.check_rect(top, left, num_rows, num_columns)
+        self._observed_rect(rect, self._invert_rect, *rect)
+
+    ####################################################################
+    # Shifts and morphology
+    ####################################################################
+    def shifted(self, rows, columns):
+        '''
+        Return a new BitGrid with every cell moved by (rows, columns). Cells
+        moved off the grid are dropped, and vacated cells are False.
+        '''
+        mask = self._mask
+        if columns >= 0:
+            moved = [(bits << columns) & mask for bits in self.bits]
+        else:
+            moved = [bits >> -columns for bits in self.bits]
+
+        empty = [0] * min(abs(rows), self.num_rows)
+        if rows >= 0:
+            moved = empty + moved[:self.num_rows - len(empty)]
+        else:
+            moved = moved[len(empty):] + empty
+
+        result = BitGrid(self.num_rows, self.num_columns)
+        result.bits = moved
+        return result
+
+    def dilated(self, stencil=ADJACENT):
+        '''
+        Return a new BitGrid where a cell is True if it, or any of its
+        neighbors under stencil, is True in this grid.
+        '''
+        result = self.copy()
+        for row, column in stencil:
+            result |= self.shifted(-row, -column)
+        return result
+
+    def eroded(self, stencil=ADJACENT):
+        '''
+        Return a new BitGrid where a cell is True if it, and all of its
+        neighbors under stencil, are True in this grid. Cells outside the
+        grid count as False, so cells at the edges are cleared.
+        '''
+        result = self.copy()
+        for row, column in stencil:
+            result &= self.shifted(-row, -column)
+        return result
@@ -0,0 +1,185 @@
+import itertools
+from array import array
+
+from gridly import Location
+from gridly.grid.base import GridBase
+from gridly.grid.dense import DenseGrid, TypedDenseGrid
+
+
+class ChunkedGrid(GridBase):
+    '''
+    ChunkedGrid is for very large grids whose content is clustered. The grid
+    is divided into square chunks of chunk_size x chunk_size cells (chunks at
+    the bottom and right edges are clipped to the grid). Each chunk which
+    contains a non-fill cell is stored as a dense grid in a dict keyed by
+    (chunk row, chunk column); chunks are allocated on the first write of a
+    non-fill value and freed when every cell in them returns to fill.
+
+    If typecode is given, chunks are TypedDenseGrids of that typecode, and
+    fill defaults to 0. Otherwise they are DenseGrids.
+    '''
+    def __init__(self, num_rows, num_columns, *, chunk_size=64, fill=None, typecode=None):
+        GridBase.__init__(self, num_rows, num_columns)
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive", chunk_size)
+        if typecode is not None and fill is None:
+            fill = 0
+
+        self.chunk_size = chunk_size
+        self.fill = fill
+        self.typecode = typecode
+        self._chunks = {}
+        # The number of non-fill cells in each allocated chunk
+        self._counts = {}
+
+    @classmethod
+    def _convert_loaded(cls, grid):
+        typecode = getattr(grid, 'typecode', None)
+        result = cls(grid.num_rows, grid.num_columns, fill=getattr(grid, 'fill', None), typecode=typecode)
+        if hasattr(grid, 'occupied'):
+            result.unsafe_set_many(grid.occupied())
+        else:
+            result.unsafe_set_many(grid.cells())
+        return result
+
+    ####################################################################
+    # Chunks
+    ####################################################################
+    def _chunk_dimensions(self, key):
+        '''
+        Return the dimensions of the chunk with the given key.
+        '''
+        size = self.chunk_size
+        return (
+            min(size, self.num_rows - key[0] * size),
+            min(size, self.num_columns - key[1] * size))
+
+    def _allocate(self, key, fill):
+        '''
+        Create and store a chunk where every cell is fill.
+        '''
+        num_rows, num_columns = self._chunk_dimensions(key)
+        if self.typecode is None:
+            chunk = DenseGrid(num_rows, num_columns, fill=fill)
+        else:
+            chunk = TypedDenseGrid(num_rows, num_columns, self.typecode, fill=fill)
+        self._chunks[key] = chunk
+        self._counts[key] = 0 if fill == self.fill else num_rows * num_columns
+        return chunk
+
+    def _free(self, key):
+        del self._chunks[key]
+        del self._counts[key]
+
+    def chunk_at(self, location):
+        '''
+        Return the chunk containing a location, or None if it is not
+        allocated. Raises IndexError if location is out of range.
+        '''
+        row, column = self.check_location(location)
+        return self._chunks.get((row // self.chunk_size, column // self.chunk_size))
+
+    def chunks(self):
+        '''
+        Iterate over (location, chunk) pairs for every allocated chunk, in
+        row-major order, where location is the location in this grid of the
+        chunk's top-left cell. Chunks are DenseGrids (or TypedDenseGrids);
+        writing to them directly bypasses the chunk bookkeeping, so they
+        should be treated as read-only.
+        '''
+        size = self.chunk_size
+        chunks = self._chunks
+        for key in sorted(chunks):
+            yield Location(key[0] * size, key[1] * size), chunks[key]
+
+    @property
+    def num_chunks(self):
+        return len(self._chunks)
+
+    ####################################################################
+    # Basic element access
+    ####################################################################
+    def unsafe_get(self, location):
+        size = self.chunk_size
+        row_key, row = divmod(location[0], size)
+        column_key, column = divmod(location[1], size)
+        chunk = self._chunks.get((row_key, column_key))
+        if chunk is None:
+            return self.fill
+        return chunk.content[row * chunk.num_columns + column]
+
+    def unsafe_set(self, location, value):
+        size = self.chunk_size
+        row_key, row = divmod(location[0], size)
+        column_key, column = divmod(location[1], size)
+        key = (row_key, column_key)
+        fill = self.fill
+
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            if value == fill:
+                return
+            if self.typecode is not None:
+                # Check the value fits the typecode before allocating, so a
+                # failed write doesn't leave an empty chunk behind
+                array(self.typecode, (value,))
+            chunk = self._allocate(key, fill)
+
+        content = chunk.content
+        index = row * chunk.num_columns + column
+        was_fill = content[index] == fill
+        content[index] = value
+
+        if was_fill != (value == fill):
+            count = self._counts[key] + (1 if was_fill else -1)
+            if count == 0:
+                self._free(key)
+            else:
+                self._counts[key] = count
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        # Chunks entirely inside the rectangle are replaced or freed whole;
+        # only the partially covered chunks are filled cell by cell.
+        size = self.chunk_size
+        bottom = top + num_rows
+        right = left + num_columns
+
+        for row_key in range(top // size, -(-bottom // size)):
+            chunk_top = row_key * size
+            for column_key in range(left // size, -(-right // size)):
+                chunk_left = column_key * size
+                key = (row_key, column_key)
+                chunk_rows, chunk_columns = self._chunk_dimensions(key)
+
+                inner_top = max(top, chunk_top)
+                inner_left = max(left, chunk_left)
+                inner_rows = min(bottom, chunk_top + chunk_rows) - inner_top
+                inner_columns = min(right, chunk_left + chunk_columns) - inner_left
+
+                if inner_rows == chunk_rows and inner_columns == chunk_columns:
+                    if key in self._chunks:
+                        self._free(key)
+                    if value != self.fill:
+                        self._allocate(key, value)
+                else:
+                    GridBase.unsafe_fill_rect(
+                        self, inner_top, inner_left, inner_rows, inner_columns, value)
+
+    ####################################################################
+    # Iterators
+    ####################################################################
+    def unsafe_row(self, row):
+        size = self.chunk_size
+        row_key, chunk_row = divmod(row, size)
+        fill = self.fill
+        chunks = self._chunks
+
+        segments = []
+        for column_key in range(-(-self.num_columns // size)):
+            chunk = chunks.get((row_key, column_key))
+            if chunk is None:
+                width = min(size, self.num_columns - column_key * size)
+                segments.append(itertools.repeat(fill, width))
+            else:
+                segments.append(chunk.unsafe_row(chunk_row))
+        return itertools.chain.from_iterable(segments)
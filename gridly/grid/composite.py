@@ -1,7 +1,44 @@
+import itertools
+import operator
+
+from gridly import Location
 from gridly.grid.base import GridBase
+from gridly.grid.dense import TypedDenseGrid
+
+try:
+    from gridly.grid.ndarray import NumpyGrid
+except ImportError:  # numpy is an optional dependency
+    NumpyGrid = None
+
+_OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+}
+
+
+def _array_layer(grid):
+    '''
+    Return a 2D numpy array sharing memory with a layer, or None if the layer
+    doesn't have one, or numpy isn't installed. NumpyGrid is None exactly
+    when numpy can't be imported.
+    '''
+    if NumpyGrid is not None and isinstance(grid, (TypedDenseGrid, NumpyGrid)):
+        return grid.to_numpy()
+    return None
 
 
 class CompositeGrid(GridBase):
+    '''
+    CompositeGrid stacks several grids of the same dimensions as layers.
+    Indexing the composite returns a CellProxy, through which each layer of
+    the cell can be read or written. The layer methods (get_layer,
+    layer_row, where, etc.) go straight to the layers, without creating a
+    proxy for each cell, and should be preferred in hot loops.
+    '''
     ####################################################################
     # Proxy class for access to individual grids
     ####################################################################
@@ -36,9 +73,213 @@ class CompositeGrid(GridBase):
         GridBase.__init__(self, dimensions[0], dimensions[1])
         self.grids = grids
 
+    @property
+    def num_layers(self):
+        return len(self.grids)
+
+    def layer(self, index):
+        '''
+        Return the grid for a layer.
+        '''
+        return self.grids[index]
+
+    ####################################################################
+    # Basic element access
+    ####################################################################
+    # Values written to the composite are sequences with one value for each
+    # layer, in layer order.
+
     def unsafe_get(self, location):
         return CompositeGrid.CellProxy(self.grids, location)
 
     def unsafe_set(self, location, value):
-        for grid, sub_value in zip(self.content, value):
+        for grid, sub_value in zip(self.grids, value):
             grid.unsafe_set(location, sub_value)
+
+    def unsafe_get_layer(self, location, layer):
+        '''
+        Return the value of one layer of a cell. Performs no bounds checking.
+        '''
+        return self.grids[layer].unsafe_get(location)
+
+    def get_layer(self, location, layer):
+        '''
+        Return the value of one layer of a cell. Raises IndexError if the
+        location is out of range.
+        '''
+        return self.grids[layer].unsafe_get(self.check_location(location))
+
+    def unsafe_get_all(self, location):
+        '''
+        Return a tuple of the values of every layer of a cell. Performs no
+        bounds checking.
+        '''
+        return tuple(grid.unsafe_get(location) for grid in self.grids)
+
+    def get_all(self, location):
+        '''
+        Return a tuple of the values of every layer of a cell. Raises
+        IndexError if the location is out of range.
+        '''
+        return self.unsafe_get_all(self.check_location(location))
+
+    ####################################################################
+    # Bulk element access
+    ####################################################################
+    # These split the work by layer, so each layer's own fast path is used.
+
+    def unsafe_set_many(self, pairs):
+        pairs = list(pairs)
+        for index, grid in enumerate(self.grids):
+            grid.unsafe_set_many((location, value[index]) for location, value in pairs)
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        for grid, sub_value in zip(self.grids, value):
+            grid.unsafe_fill_rect(top, left, num_rows, num_columns, sub_value)
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        if not isinstance(source, CompositeGrid) or source.num_layers != self.num_layers:
+            return GridBase.unsafe_copy_rect(
+                self, source, top, left, source_top, source_left, num_rows, num_columns)
+
+        for grid, source_grid in zip(self.grids, source.grids):
+            grid.unsafe_copy_rect(
+                source_grid, top, left, source_top, source_left, num_rows, num_columns)
+
+    ####################################################################
+    # Layer iterators
+    ####################################################################
+    def layer_row(self, layer, row):
+        '''
+        Iterate over the values of one layer in a row. Raises IndexError if
+        the row is out of range.
+        '''
+        return self.grids[layer].unsafe_row(self.check_row(row))
+
+    def layer_column(self, layer, column):
+        '''
+        Iterate over the values of one layer in a column. Raises IndexError
+        if the column is out of range.
+        '''
+        return self.grids[layer].unsafe_column(self.check_column(column))
+
+    def unsafe_layer_rect(self, layer, top, left, num_rows, num_columns):
+        '''
+        Iterate over the rows of one layer in a rectangle, where each row is
+        an iterator over its values. Performs no bounds checking.
+        '''
+        grid = self.grids[layer]
+        right = left + num_columns
+        for row in range(top, top + num_rows):
+            yield itertools.islice(grid.unsafe_row(row), left, right)
+
+    def layer_rect(self, layer, top, left, num_rows, num_columns):
+        '''
+        Iterate over the rows of one layer in the rectangle with the given
+        top-left corner and size. Raises IndexError if the rectangle is out of
+        range.
+        '''
+        return self.unsafe_layer_rect(layer, *self.check_rect(top, left, num_rows, num_columns))
+
+    ####################################################################
+    # Queries
+    ####################################################################
+    # A query is a sequence of (layer, op, value) conditions, which must all
+    # be true of a cell for it to match. op is a comparison string ('==',
+    # '!=', '<', '<=', '>' or '>='), or a function op(cell, value). When every
+    # layer in the query is a TypedDenseGrid or NumpyGrid, the query is
+    # evaluated with vectorized numpy operations; op functions must then
+    # accept arrays.
+
+    def _conditions(self, conditions):
+        return [
+            (layer, _OPERATORS.get(op, op), value)
+            for layer, op, value in conditions]
+
+    def _query_mask(self, conditions, rect):
+        '''
+        Return a boolean numpy array of the matching cells in rect, or None if
+        the query can't be vectorized.
+        '''
+        arrays = {}
+        for layer, _, _ in conditions:
+            if layer not in arrays:
+                array = _array_layer(self.grids[layer])
+                if array is None:
+                    return None
+                arrays[layer] = array
+
+        top, left, num_rows, num_columns = rect
+        mask = None
+        for layer, op, value in conditions:
+            region = arrays[layer][top:top + num_rows, left:left + num_columns]
+            result = op(region, value)
+            mask = result if mask is None else mask & result
+        return mask
+
+    def _query_rows(self, conditions, rect):
+        '''
+        Iterate over (row, matching columns) for each row in rect, reading the
+        layers cell by cell.
+        '''
+        top, left, num_rows, num_columns = rect
+        layers = sorted({layer for layer, _, _ in conditions})
+        positions = {layer: position for position, layer in enumerate(layers)}
+        tests = [(positions[layer], op, value) for layer, op, value in conditions]
+        right = left + num_columns
+
+        for row in range(top, top + num_rows):
+            layer_rows = [
+                itertools.islice(self.grids[layer].unsafe_row(row), left, right)
+                for layer in layers]
+            yield row, [
+                column
+                for column, values in zip(range(left, right), zip(*layer_rows))
+                if all(op(values[position], value) for position, op, value in tests)]
+
+    def where(self, conditions, rect=None):
+        '''
+        Return a list of the locations of the cells matching every condition,
+        in row-major order. If rect is given, only the cells in that region
+        are considered. For example, the cells where layer 0 is 'x' and layer
+        2 is greater than 5:
+
+            grid.where([(0, '==', 'x'), (2, '>', 5)])
+        '''
+        conditions = self._conditions(conditions)
+        rect = (0, 0, self.num_rows, self.num_columns) if rect is None else self.check_rect(*rect)
+        if not conditions:
+            top, left, num_rows, num_columns = rect
+            return [
+                Location(row, column)
+                for row in range(top, top + num_rows)
+                for column in range(left, left + num_columns)]
+
+        mask = self._query_mask(conditions, rect)
+        if mask is not None:
+            import numpy
+            top, left = rect[0], rect[1]
+            rows, columns = numpy.nonzero(mask)
+            return [
+                Location(row + top, column + left)
+                for row, column in zip(rows.tolist(), columns.tolist())]
+
+        return [
+            Location(row, column)
+            for row, columns in self._query_rows(conditions, rect)
+            for column in columns]
+
+    def count_where(self, conditions, rect=None):
+        '''
+        Return the number of cells matching every condition. See where().
+        '''
+        conditions = self._conditions(conditions)
+        rect = (0, 0, self.num_rows, self.num_columns) if rect is None else self.check_rect(*rect)
+        if not conditions:
+            return rect[2] * rect[3]
+
+        mask = self._query_mask(conditions, rect)
+        if mask is not None:
+            return int(mask.sum())
+
+        return sum(len(columns) for _, columns in self._query_rows(conditions, rect))
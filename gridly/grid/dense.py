@@ -1,4 +1,26 @@
+from array import array, typecodes
+
 from gridly.grid.base import GridBase
+from gridly.grid.view import DenseGridView
+from gridly.grid.snapshot import SnapshotGrid
+
+
+def _numpy_content(ndarray, typecode):
+    '''
+    Copy a numpy array into a new array.array of typecode, which defaults to
+    the numpy array's dtype. Raises ValueError if the typecode isn't an array
+    module typecode.
+    '''
+    import numpy
+    if typecode is None:
+        typecode = ndarray.dtype.char
+    if typecode not in typecodes:
+        raise ValueError(
+            "Not an array typecode; convert the array or give a typecode", typecode)
+    content = array(typecode)
+    # Viewed as bytes without copying, so that it is accepted by frombytes
+    content.frombytes(numpy.ascontiguousarray(ndarray, dtype=typecode).ravel().view('B'))
+    return content
 
 
 class DenseGrid(GridBase):
@@ -11,13 +33,27 @@ class DenseGrid(GridBase):
         size = num_rows * num_columns
 
         if func is not None:
-            self.content = list(map(func, self.locations()))
+            self.content = self._make_content(map(func, self.locations()))
         elif content is not None:
             if len(content) != size:
                 raise ValueError("content must have length {}".format(size))
-            self.content = list(content)
+            self.content = self._make_content(content)
         else:
-            self.content = [fill] * size
+            self.content = self._make_content([fill]) * size
+
+    def _make_content(self, values):
+        '''
+        Create the backing sequence from an iterable of values. Subclasses
+        override this to change the storage type.
+        '''
+        return list(values)
+
+    def _coerce(self, values):
+        '''
+        Return a sequence of values in a form which can be slice-assigned into
+        content. The length is not checked.
+        '''
+        return values
 
     def _index(self, location):
         '''
@@ -25,8 +61,180 @@ class DenseGrid(GridBase):
         '''
         return (self.num_columns * location[0]) + location[1]
 
+    def _row_slice(self, row):
+        '''
+        Return the slice of content which holds a row. Performs no bounds
+        checking.
+        '''
+        start = self.num_columns * row
+        return slice(start, start + self.num_columns)
+
     def unsafe_get(self, location):
         return self.content[self._index(location)]
 
     def unsafe_set(self, location, value):
         self.content[self._index(location)] = value
+
+    def unsafe_row(self, row):
+        return iter(self.content[self._row_slice(row)])
+
+    def unsafe_get_flat(self, index):
+        return self.content[index]
+
+    def unsafe_set_flat(self, index, value):
+        self.content[index] = value
+
+    def cells_flat(self):
+        return enumerate(self.content)
+
+    def unsafe_column(self, column):
+        return iter(self.content[column::self.num_columns])
+
+    def unsafe_get_many(self, locations):
+        content = self.content
+        num_columns = self.num_columns
+        return [content[row * num_columns + column] for row, column in locations]
+
+    def unsafe_set_many(self, pairs):
+        content = self.content
+        num_columns = self.num_columns
+        for (row, column), value in pairs:
+            content[row * num_columns + column] = value
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        content = self.content
+        stride = self.num_columns
+        values = self._make_content([value]) * num_columns
+        first = top * stride + left
+        for start in range(first, first + num_rows * stride, stride):
+            content[start:start + num_columns] = values
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        if not isinstance(source, DenseGrid):
+            return GridBase.unsafe_copy_rect(
+                self, source, top, left, source_top, source_left, num_rows, num_columns)
+
+        # Each row slice is a copy, so the only hazard when copying within a
+        # single grid is overwriting source rows before they are read. Avoid
+        # that by copying bottom-up when moving rows down.
+        rows = range(num_rows)
+        if source.content is self.content and top > source_top:
+            rows = reversed(rows)
+
+        content = self.content
+        source_content = source.content
+        stride = self.num_columns
+        source_stride = source.num_columns
+        for row in rows:
+            start = (top + row) * stride + left
+            source_start = (source_top + row) * source_stride + source_left
+            content[start:start + num_columns] = self._coerce(
+                source_content[source_start:source_start + num_columns])
+
+    def unsafe_set_row(self, row, values):
+        self.content[self._row_slice(row)] = self._coerce(values)
+
+    def unsafe_set_column(self, column, values):
+        self.content[column::self.num_columns] = self._coerce(values)
+
+    def snapshot(self):
+        '''
+        Return a read-only SnapshotGrid of this grid's current content. This
+        takes constant time; rows are copied only as this grid writes to
+        them. Writes made directly to content, rather than through this grid's
+        methods, are not seen by the snapshot and will show through it.
+        '''
+        return SnapshotGrid(self)
+
+    def _transformed_view(self, origin, row_step, column_step, num_rows, num_columns):
+        return DenseGridView(self, origin, row_step, column_step, num_rows, num_columns)
+
+    def to_numpy(self, dtype=None):
+        import numpy
+        return numpy.array(self.content, dtype=dtype).reshape(self.dimensions)
+
+    @classmethod
+    def from_numpy(cls, ndarray, **kwargs):
+        '''
+        Create a new grid from a 2D numpy array. The data is copied. Extra
+        keyword arguments are passed to the constructor.
+        '''
+        num_rows, num_columns = ndarray.shape
+        return cls(num_rows, num_columns, content=ndarray.ravel().tolist(), **kwargs)
+
+
+class TypedDenseGrid(DenseGrid):
+    '''
+    TypedDenseGrid is a DenseGrid which stores its cells unboxed in an
+    `array.array` of the given typecode, rather than as a list of Python
+    objects. The content supports the buffer protocol, so the whole grid can be
+    shared with other code without copying via `memoryview`.
+    '''
+    def __init__(self, num_rows, num_columns, typecode, *, fill=0, content=None, func=None):
+        self.typecode = typecode
+        DenseGrid.__init__(
+            self, num_rows, num_columns,
+            fill=fill, content=content, func=func)
+
+    def _make_content(self, values):
+        return array(self.typecode, values)
+
+    def _coerce(self, values):
+        if isinstance(values, array) and values.typecode == self.typecode:
+            return values
+        return array(self.typecode, values)
+
+    def to_numpy(self, dtype=None):
+        '''
+        Return a 2D numpy array which shares memory with this grid, unless a
+        different dtype is requested, in which case the data is copied.
+        '''
+        import numpy
+        result = numpy.frombuffer(self.content, dtype=self.typecode)
+        result = result.reshape(self.dimensions)
+        if dtype is not None and result.dtype != dtype:
+            result = result.astype(dtype)
+        return result
+
+    @classmethod
+    def from_numpy(cls, ndarray, typecode=None, **kwargs):
+        '''
+        Create a new grid from a 2D numpy array. The data is copied. If
+        typecode is not given, it is taken from the array's dtype. Raises
+        ValueError if the typecode isn't an array module typecode, as for
+        bool or float16 arrays.
+        '''
+        num_rows, num_columns = ndarray.shape
+        content = _numpy_content(ndarray, typecode)
+        return cls(num_rows, num_columns, content.typecode, content=content, **kwargs)
+
+    def memoryview(self):
+        '''
+        Return a 2D (num_rows x num_columns) memoryview over the grid's
+        content. Writes to the memoryview are writes to the grid. While the
+        grid has observers, the memoryview is read-only, since observers
+        can't see writes through it.
+
+        A memoryview can't have a 0 in a multi-dimensional shape, so for an
+        empty grid (no rows or no columns), this is instead an empty,
+        read-only, 1D memoryview.
+        '''
+        if not (self.num_rows and self.num_columns):
+            return memoryview(self.content).toreadonly()
+        return self._buffer().cast('B').cast(self.typecode, self.dimensions)
+
+    def row_view(self, row):
+        '''
+        Return a 1D memoryview over a single row. Raises IndexError if row is
+        out of range. Like memoryview(), it is read-only while the grid has
+        observers.
+        '''
+        return self._buffer()[self._row_slice(self.check_row(row))]
+
+    def _buffer(self):
+        view = memoryview(self.content)
+        return view.toreadonly() if self._observers else view
+
+    def __buffer__(self, flags):
+        # Python 3.12+ hook, so that memoryview(grid) works directly
+        return self.memoryview()
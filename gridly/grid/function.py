@@ -0,0 +1,304 @@
+from collections import OrderedDict
+
+from gridly import Location
+from gridly.grid.base import GridBase
+
+_MISSING = object()
+
+_POLICIES = ('lru', 'tile')
+
+
+class FunctionGrid(GridBase):
+    '''
+    FunctionGrid is a grid whose cells are computed lazily by func(location)
+    and cached, for procedurally generated content where only a fraction of
+    the cells are ever read. Unlike DenseGrid(func=...), nothing is computed
+    until it is read.
+
+    At most max_cells computed cells are cached (by default, every cell is).
+    With policy='lru', the least recently used cells are evicted one at a
+    time. With policy='tile', the grid is divided into tile_size x tile_size
+    tiles, and the least recently used tiles are evicted whole. If prefetch
+    is true, reading a cell which isn't cached computes every uncached cell
+    of its tile at once; with policy='lru', this is skipped if a whole tile
+    wouldn't fit in max_cells.
+
+    Cells which are written are stored separately, replacing any cached
+    value, and are never evicted. Call invalidate() or invalidate_rect() to
+    discard the cached and written values of cells, so that they are
+    recomputed by func on the next read.
+    '''
+    def __init__(
+            self, num_rows, num_columns, func, *,
+            max_cells=None, policy='lru', tile_size=16, prefetch=False):
+        GridBase.__init__(self, num_rows, num_columns)
+        if policy not in _POLICIES:
+            raise ValueError("Unknown cache policy", policy)
+        if tile_size < 1:
+            raise ValueError("tile_size must be positive", tile_size)
+        if max_cells is not None and max_cells < 1:
+            raise ValueError("max_cells must be positive", max_cells)
+
+        self.func = func
+        self.max_cells = max_cells
+        self.policy = policy
+        self.tile_size = tile_size
+        self.prefetch = prefetch
+
+        # With the 'lru' policy, _cache maps flat index to value. With the
+        # 'tile' policy, it maps tile key to a dict of flat index to value.
+        # Either way, it is ordered from least to most recently used.
+        self._cache = OrderedDict()
+        self._num_cached = 0
+        self._written = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    ####################################################################
+    # Cache
+    ####################################################################
+    @property
+    def num_cached(self):
+        '''
+        The number of computed cells currently cached.
+        '''
+        return self._num_cached
+
+    def _tile_key(self, index):
+        row, column = divmod(index, self.num_columns)
+        return row // self.tile_size, column // self.tile_size
+
+    def _tile_indexes(self, key):
+        '''
+        Iterate over the flat indexes of the cells in a tile, clipped to the
+        grid.
+        '''
+        size = self.tile_size
+        num_columns = self.num_columns
+        top = key[0] * size
+        left = key[1] * size
+        right = min(left + size, num_columns)
+        for row in range(top, min(top + size, self.num_rows)):
+            start = row * num_columns
+            yield from range(start + left, start + right)
+
+    def _prefetch_fits(self):
+        '''
+        Return true if prefetching should be done. With the 'lru' policy, a
+        tile which can't fit in the cache would evict its own cells as they
+        were computed, so it isn't prefetched.
+        '''
+        return self.prefetch and (
+            self.max_cells is None or self.tile_size * self.tile_size <= self.max_cells)
+
+    def _compute(self, index):
+        return self.func(Location(*divmod(index, self.num_columns)))
+
+    def _evict(self):
+        '''
+        Evict least recently used entries until the cache is within
+        max_cells. The most recently used entry is never evicted.
+        '''
+        cache = self._cache
+        if self.policy == 'lru':
+            while self._num_cached > self.max_cells and len(cache) > 1:
+                cache.popitem(last=False)
+                self._num_cached -= 1
+                self.evictions += 1
+        else:
+            while self._num_cached > self.max_cells and len(cache) > 1:
+                _, tile = cache.popitem(last=False)
+                self._num_cached -= len(tile)
+                self.evictions += len(tile)
+
+    def _miss_lru(self, index):
+        cache = self._cache
+        if not self._prefetch_fits():
+            value = cache[index] = self._compute(index)
+            self._num_cached += 1
+        else:
+            compute = self._compute
+            for other in self._tile_indexes(self._tile_key(index)):
+                if other in cache:
+                    cache.move_to_end(other)
+                elif other not in self._written:
+                    cache[other] = compute(other)
+                    self._num_cached += 1
+            value = cache.pop(index)
+            cache[index] = value
+
+        if self.max_cells is not None:
+            self._evict()
+        return value
+
+    def _miss_tile(self, key, tile, index):
+        # The values are computed before anything is cached, so if func
+        # raises, the cache is left as it was
+        if not self.prefetch:
+            computed = {index: self._compute(index)}
+        else:
+            compute = self._compute
+            written = self._written
+            computed = {
+                other: compute(other) for other in self._tile_indexes(key)
+                if (tile is None or other not in tile) and other not in written}
+
+        if tile is None:
+            self._cache[key] = computed
+        else:
+            tile.update(computed)
+        self._num_cached += len(computed)
+        value = computed[index]
+
+        if self.max_cells is not None:
+            self._evict()
+        return value
+
+    def cached(self, location):
+        '''
+        Return true if the cell at location is cached or written, so reading
+        it won't call func. Raises IndexError if location is out of range.
+        '''
+        row, column = self.check_location(location)
+        index = row * self.num_columns + column
+        if index in self._written:
+            return True
+        if self.policy == 'lru':
+            return index in self._cache
+        tile = self._cache.get(self._tile_key(index))
+        return tile is not None and index in tile
+
+    def _uncache(self, index):
+        '''
+        Discard the cached value of a cell, if there is one.
+        '''
+        cache = self._cache
+        if self.policy == 'lru':
+            if cache.pop(index, _MISSING) is not _MISSING:
+                self._num_cached -= 1
+        else:
+            key = self._tile_key(index)
+            tile = cache.get(key)
+            if tile is not None and tile.pop(index, _MISSING) is not _MISSING:
+                self._num_cached -= 1
+                if not tile:
+                    del cache[key]
+
+    def _stored_in_rect(self, stored, top, left, num_rows, num_columns):
+        '''
+        Return a list of the flat indexes in stored which are in a rectangle.
+        Visits whichever is smaller: stored, or the cells of the rectangle.
+        '''
+        grid_columns = self.num_columns
+        if len(stored) < num_rows * num_columns:
+            bottom = top + num_rows
+            right = left + num_columns
+            return [
+                index for index in stored
+                if top <= index // grid_columns < bottom and left <= index % grid_columns < right]
+
+        result = []
+        for row in range(top, top + num_rows):
+            start = row * grid_columns + left
+            result.extend(index for index in range(start, start + num_columns) if index in stored)
+        return result
+
+    def unsafe_invalidate_rect(self, top, left, num_rows, num_columns):
+        written = self._written
+        for index in self._stored_in_rect(written, top, left, num_rows, num_columns):
+            del written[index]
+
+        cache = self._cache
+        if self.policy == 'lru':
+            for index in self._stored_in_rect(cache, top, left, num_rows, num_columns):
+                del cache[index]
+                self._num_cached -= 1
+            return
+
+        # Visit whichever is smaller: the cached tiles, or the tiles the
+        # rectangle overlaps
+        size = self.tile_size
+        bottom = top + num_rows
+        right = left + num_columns
+        tile_rows = range(top // size, (bottom - 1) // size + 1)
+        tile_columns = range(left // size, (right - 1) // size + 1)
+        if len(cache) < len(tile_rows) * len(tile_columns):
+            keys = [key for key in cache if key[0] in tile_rows and key[1] in tile_columns]
+        else:
+            keys = [
+                (tile_row, tile_column) for tile_row in tile_rows
+                for tile_column in tile_columns if (tile_row, tile_column) in cache]
+
+        for key in keys:
+            tile = cache[key]
+            tile_top = max(top, key[0] * size)
+            tile_left = max(left, key[1] * size)
+            for index in self._stored_in_rect(
+                    tile, tile_top, tile_left,
+                    min(bottom, (key[0] + 1) * size) - tile_top,
+                    min(right, (key[1] + 1) * size) - tile_left):
+                del tile[index]
+                self._num_cached -= 1
+            if not tile:
+                del cache[key]
+
+    def invalidate(self, location):
+        '''
+        Discard the cached or written value of a cell, so that it is
+        recomputed on the next read. Raises IndexError if location is out of
+        range.
+        '''
+        row, column = self.check_location(location)
+        self.unsafe_invalidate_rect(row, column, 1, 1)
+
+    def invalidate_rect(self, top, left, num_rows, num_columns):
+        '''
+        Discard the cached or written values of every cell in a rectangle.
+        Raises IndexError if the rectangle is out of range.
+        '''
+        self.unsafe_invalidate_rect(*self.check_rect(top, left, num_rows, num_columns))
+
+    def clear_cache(self):
+        '''
+        Discard every cached value. Written values are kept.
+        '''
+        self._cache.clear()
+        self._num_cached = 0
+
+    ####################################################################
+    # Basic element access
+    ####################################################################
+    def unsafe_get(self, location):
+        index = location[0] * self.num_columns + location[1]
+        if self._written:
+            value = self._written.get(index, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        cache = self._cache
+        if self.policy == 'lru':
+            value = cache.get(index, _MISSING)
+            if value is not _MISSING:
+                cache.move_to_end(index)
+                self.hits += 1
+                return value
+            self.misses += 1
+            return self._miss_lru(index)
+
+        key = (location[0] // self.tile_size, location[1] // self.tile_size)
+        tile = cache.get(key)
+        if tile is not None:
+            cache.move_to_end(key)
+            value = tile.get(index, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+        self.misses += 1
+        return self._miss_tile(key, tile, index)
+
+    def unsafe_set(self, location, value):
+        index = location[0] * self.num_columns + location[1]
+        self._uncache(index)
+        self._written[index] = value
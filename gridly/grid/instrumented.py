@@ -0,0 +1,335 @@
+import collections
+import itertools
+from array import array
+
+from gridly.grid.base import GridBase
+from gridly.grid.dense import TypedDenseGrid
+
+
+class InstrumentedGrid(GridBase):
+    '''
+    InstrumentedGrid wraps another grid and records how it is used: the
+    number of calls to each access method (checked and unsafe counted
+    separately), the number of failed bounds checks, and heat maps of the
+    cells read and written in each row and, if tile_size is given, in each
+    tile_size x tile_size tile.
+
+    Every operation is forwarded to the wrapped grid, using its unsafe_*
+    methods (and so its fast paths) after any checking. Iterators are counted
+    when they are created, and the cells they cover are counted as read at
+    that time. Instrumentation is opt-in: only code given the wrapper pays for
+    it, and the wrapped grid itself is unchanged.
+    '''
+    def __init__(self, grid, *, tile_size=None):
+        GridBase.__init__(self, grid.num_rows, grid.num_columns)
+        if tile_size is not None and tile_size < 1:
+            raise ValueError("tile_size must be positive", tile_size)
+
+        self.grid = grid
+        self.tile_size = tile_size
+        self._in_checked_call = False
+        if tile_size is not None:
+            self.tile_rows = -(-grid.num_rows // tile_size)
+            self.tile_columns = -(-grid.num_columns // tile_size)
+        self.reset()
+
+    def reset(self):
+        '''
+        Clear all the counts and heat maps.
+        '''
+        self.calls = collections.Counter()
+        self.bounds_errors = 0
+        self.row_reads = array('Q', bytes(8 * self.num_rows))
+        self.row_writes = array('Q', bytes(8 * self.num_rows))
+        if self.tile_size is not None:
+            self.tile_heat = array('Q', bytes(8 * self.tile_rows * self.tile_columns))
+
+    ####################################################################
+    # Recording
+    ####################################################################
+    def _heat(self, rows, location):
+        row, column = location
+        rows[row] += 1
+        tile_size = self.tile_size
+        if tile_size is not None:
+            self.tile_heat[(row // tile_size) * self.tile_columns + column // tile_size] += 1
+
+    def _heat_rect(self, rows, top, left, num_rows, num_columns):
+        for row in range(top, top + num_rows):
+            rows[row] += num_columns
+
+        tile_size = self.tile_size
+        if tile_size is not None:
+            bottom = top + num_rows
+            right = left + num_columns
+            for tile_row in range(top // tile_size, -(-bottom // tile_size)):
+                tile_top = tile_row * tile_size
+                height = min(bottom, tile_top + tile_size) - max(top, tile_top)
+                for tile_column in range(left // tile_size, -(-right // tile_size)):
+                    tile_left = tile_column * tile_size
+                    width = min(right, tile_left + tile_size) - max(left, tile_left)
+                    self.tile_heat[tile_row * self.tile_columns + tile_column] += height * width
+
+    def _checked(self, check, *args):
+        try:
+            return check(*args)
+        except IndexError:
+            self.bounds_errors += 1
+            raise
+
+    def _checked_call(self, name, method, *args):
+        '''
+        Count a call to a checked method, and run GridBase's version of it,
+        which checks the arguments and calls the matching unsafe_* method.
+        That inner call records heat but isn't counted itself.
+        '''
+        self.calls[name] += 1
+        self._in_checked_call = True
+        try:
+            return method(self, *args)
+        finally:
+            self._in_checked_call = False
+
+    def _count_unsafe(self, name):
+        if not self._in_checked_call:
+            self.calls[name] += 1
+
+    def check_row(self, row):
+        return self._checked(GridBase.check_row, self, row)
+
+    def check_column(self, column):
+        return self._checked(GridBase.check_column, self, column)
+
+    def check_location(self, location):
+        return self._checked(GridBase.check_location, self, location)
+
+    def check_rect(self, top, left, num_rows, num_columns):
+        return self._checked(GridBase.check_rect, self, top, left, num_rows, num_columns)
+
+    def check_index(self, index):
+        return self._checked(GridBase.check_index, self, index)
+
+    ####################################################################
+    # Element access
+    ####################################################################
+    def unsafe_get(self, location):
+        self.calls['unsafe_get'] += 1
+        self._heat(self.row_reads, location)
+        return self.grid.unsafe_get(location)
+
+    def unsafe_set(self, location, value):
+        self.calls['unsafe_set'] += 1
+        self._heat(self.row_writes, location)
+        self.grid.unsafe_set(location, value)
+
+    def __getitem__(self, location):
+        self.calls['get'] += 1
+        location = self.check_location(location)
+        self._heat(self.row_reads, location)
+        return self.grid.unsafe_get(location)
+
+    def __setitem__(self, location, value):
+        self.calls['set'] += 1
+        location = self.check_location(location)
+        self._heat(self.row_writes, location)
+        self.grid.unsafe_set(location, value)
+
+    get = __getitem__
+    set = __setitem__
+
+    def unsafe_get_flat(self, index):
+        self.calls['unsafe_get_flat'] += 1
+        self._heat(self.row_reads, divmod(index, self.num_columns))
+        return self.grid.unsafe_get_flat(index)
+
+    def unsafe_set_flat(self, index, value):
+        self.calls['unsafe_set_flat'] += 1
+        self._heat(self.row_writes, divmod(index, self.num_columns))
+        self.grid.unsafe_set_flat(index, value)
+
+    def get_flat(self, index):
+        self.calls['get_flat'] += 1
+        index = self.check_index(index)
+        self._heat(self.row_reads, divmod(index, self.num_columns))
+        return self.grid.unsafe_get_flat(index)
+
+    def set_flat(self, index, value):
+        self.calls['set_flat'] += 1
+        index = self.check_index(index)
+        self._heat(self.row_writes, divmod(index, self.num_columns))
+        self.grid.unsafe_set_flat(index, value)
+
+    ####################################################################
+    # Bulk element access
+    ####################################################################
+    def unsafe_get_many(self, locations):
+        self._count_unsafe('unsafe_get_many')
+        locations = list(locations)
+        for location in locations:
+            self._heat(self.row_reads, location)
+        return self.grid.unsafe_get_many(locations)
+
+    def unsafe_set_many(self, pairs):
+        self._count_unsafe('unsafe_set_many')
+        pairs = list(pairs)
+        for location, _ in pairs:
+            self._heat(self.row_writes, location)
+        self.grid.unsafe_set_many(pairs)
+
+    def get_many(self, locations):
+        return self._checked_call('get_many', GridBase.get_many, locations)
+
+    def set_many(self, pairs):
+        self._checked_call('set_many', GridBase.set_many, pairs)
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        self._count_unsafe('unsafe_fill_rect')
+        self._heat_rect(self.row_writes, top, left, num_rows, num_columns)
+        self.grid.unsafe_fill_rect(top, left, num_rows, num_columns, value)
+
+    def fill_rect(self, top, left, num_rows, num_columns, value):
+        self._checked_call('fill_rect', GridBase.fill_rect, top, left, num_rows, num_columns, value)
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        self._count_unsafe('unsafe_copy_rect')
+        self._heat_rect(self.row_writes, top, left, num_rows, num_columns)
+        if isinstance(source, InstrumentedGrid):
+            source = source.grid
+        self.grid.unsafe_copy_rect(
+            source, top, left, source_top, source_left, num_rows, num_columns)
+
+    def copy_rect(self, source, top, left, source_top=0, source_left=0, num_rows=None, num_columns=None):
+        self._checked_call(
+            'copy_rect', GridBase.copy_rect,
+            source, top, left, source_top, source_left, num_rows, num_columns)
+
+    def unsafe_set_row(self, row, values):
+        self._count_unsafe('unsafe_set_row')
+        self._heat_rect(self.row_writes, row, 0, 1, self.num_columns)
+        self.grid.unsafe_set_row(row, values)
+
+    def unsafe_set_column(self, column, values):
+        self._count_unsafe('unsafe_set_column')
+        self._heat_rect(self.row_writes, 0, column, self.num_rows, 1)
+        self.grid.unsafe_set_column(column, values)
+
+    def set_row(self, row, values):
+        self._checked_call('set_row', GridBase.set_row, row, values)
+
+    def set_column(self, column, values):
+        self._checked_call('set_column', GridBase.set_column, column, values)
+
+    ####################################################################
+    # Iterators
+    ####################################################################
+    def unsafe_row(self, row):
+        self.calls['unsafe_row'] += 1
+        self._heat_rect(self.row_reads, row, 0, 1, self.num_columns)
+        return self.grid.unsafe_row(row)
+
+    def unsafe_column(self, column):
+        self.calls['unsafe_column'] += 1
+        self._heat_rect(self.row_reads, 0, column, self.num_rows, 1)
+        return self.grid.unsafe_column(column)
+
+    def row(self, row):
+        self.calls['row'] += 1
+        row = self.check_row(row)
+        self._heat_rect(self.row_reads, row, 0, 1, self.num_columns)
+        return self.grid.unsafe_row(row)
+
+    def column(self, column):
+        self.calls['column'] += 1
+        column = self.check_column(column)
+        self._heat_rect(self.row_reads, 0, column, self.num_rows, 1)
+        return self.grid.unsafe_column(column)
+
+    def rows(self):
+        self.calls['rows'] += 1
+        self._heat_rect(self.row_reads, 0, 0, self.num_rows, self.num_columns)
+        return self.grid.rows()
+
+    def columns(self):
+        self.calls['columns'] += 1
+        self._heat_rect(self.row_reads, 0, 0, self.num_rows, self.num_columns)
+        return self.grid.columns()
+
+    def cells(self, locations=None):
+        self.calls['cells'] += 1
+        if locations is None:
+            self._heat_rect(self.row_reads, 0, 0, self.num_rows, self.num_columns)
+            return self.grid.cells()
+        return self._cells(locations)
+
+    def _cells(self, locations):
+        unsafe_get = self.grid.unsafe_get
+        row_reads = self.row_reads
+        for location in map(self.check_location, locations):
+            self._heat(row_reads, location)
+            yield location, unsafe_get(location)
+
+    def cells_flat(self):
+        self.calls['cells_flat'] += 1
+        self._heat_rect(self.row_reads, 0, 0, self.num_rows, self.num_columns)
+        return self.grid.cells_flat()
+
+    ####################################################################
+    # Reports
+    ####################################################################
+    @property
+    def reads(self):
+        return sum(self.row_reads)
+
+    @property
+    def writes(self):
+        return sum(self.row_writes)
+
+    def hottest_rows(self, count=10):
+        '''
+        Return a list of up to count (row, accesses) pairs for the rows with
+        the most reads and writes, hottest first.
+        '''
+        heat = [reads + writes for reads, writes in zip(self.row_reads, self.row_writes)]
+        rows = sorted(range(self.num_rows), key=heat.__getitem__, reverse=True)
+        return [(row, heat[row]) for row in itertools.islice(rows, count) if heat[row]]
+
+    def hottest_tiles(self, count=10):
+        '''
+        Return a list of up to count ((tile row, tile column), accesses) pairs
+        for the tiles with the most reads and writes, hottest first. Raises
+        TypeError if the grid wasn't created with a tile_size.
+        '''
+        if self.tile_size is None:
+            raise TypeError("Tile heat requires a tile_size")
+        heat = self.tile_heat
+        tiles = sorted(range(len(heat)), key=heat.__getitem__, reverse=True)
+        return [
+            (divmod(tile, self.tile_columns), heat[tile])
+            for tile in itertools.islice(tiles, count) if heat[tile]]
+
+    def heat_grid(self):
+        '''
+        Return the tile heat map as a TypedDenseGrid with one cell per tile.
+        Raises TypeError if the grid wasn't created with a tile_size.
+        '''
+        if self.tile_size is None:
+            raise TypeError("Tile heat requires a tile_size")
+        return TypedDenseGrid(
+            self.tile_rows, self.tile_columns, 'Q', content=array('Q', self.tile_heat))
+
+    def summary(self, count=10):
+        '''
+        Return a summary of the recorded activity as a dict of plain values,
+        suitable for logging or JSON export.
+        '''
+        summary = {
+            'calls': dict(self.calls),
+            'bounds_errors': self.bounds_errors,
+            'reads': self.reads,
+            'writes': self.writes,
+            'hottest_rows': self.hottest_rows(count),
+        }
+        if self.tile_size is not None:
+            summary['tile_size'] = self.tile_size
+            summary['hottest_tiles'] = self.hottest_tiles(count)
+        return summary
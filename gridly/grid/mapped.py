@@ -0,0 +1,135 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from gridly.grid.base import GridBase
+from gridly.grid.dense import TypedDenseGrid, _numpy_content
+
+# File header: magic, format version, typecode, byte order ('<' or '>'),
+# num_rows, num_columns. The cells follow immediately after, in row-major
+# order, in the native layout of the typecode.
+_HEADER = struct.Struct('<8sHcc4xQQ')
+_MAGIC = b'GRIDLYMM'
+_VERSION = 1
+_BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+
+class MappedGrid(TypedDenseGrid):
+    '''
+    MappedGrid is a TypedDenseGrid whose content is a memory-mapped file, for
+    grids larger than memory. Its content is a memoryview over the mapping,
+    so cells are read and written directly in the file, with the same
+    row-major addressing as DenseGrid, and opening a grid takes the same time
+    regardless of its size.
+
+    Create a new file with MappedGrid.create, and open an existing one with
+    MappedGrid(path); since every grid needs a file, from_numpy also takes a
+    path. A grid opened with readonly=True raises TypeError on
+    writes. Call flush() to write changes to disk, and close() (or use the
+    grid as a context manager) when done with it.
+    '''
+    def __init__(self, path, *, readonly=False):
+        self.readonly = readonly
+        self._file = open(path, 'rb' if readonly else 'r+b')
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("Not a mapped grid file", path)
+
+            magic, version, typecode, byte_order, num_rows, num_columns = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError("Not a mapped grid file", path)
+            if version != _VERSION:
+                raise ValueError("Unsupported mapped grid version", version)
+            if byte_order != _BYTE_ORDER:
+                raise ValueError("Mapped grid file has the wrong byte order", path)
+
+            GridBase.__init__(self, num_rows, num_columns)
+            self.typecode = typecode.decode('ascii')
+            size = _HEADER.size + num_rows * num_columns * array(self.typecode).itemsize
+            self._mmap = mmap.mmap(
+                self._file.fileno(), size,
+                access=mmap.ACCESS_READ if readonly else mmap.ACCESS_WRITE)
+        except Exception:
+            self._file.close()
+            raise
+
+        self.content = memoryview(self._mmap)[_HEADER.size:].cast(self.typecode)
+
+    @classmethod
+    def create(cls, path, num_rows, num_columns, typecode, *, fill=0):
+        '''
+        Create a new mapped grid file, overwriting any existing file, and
+        return it opened for writing. New files are sparse where the
+        filesystem supports it, so creating a grid with fill=0 takes the same
+        time regardless of its size.
+        '''
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(
+                _MAGIC, _VERSION, typecode.encode('ascii'), _BYTE_ORDER,
+                num_rows, num_columns))
+            file.truncate(_HEADER.size + num_rows * num_columns * array(typecode).itemsize)
+
+        grid = cls(path)
+        if fill != 0:
+            grid.unsafe_fill_rect(0, 0, num_rows, num_columns, fill)
+        return grid
+
+    @classmethod
+    def from_numpy(cls, ndarray, typecode=None, *, path):
+        '''
+        Create a new mapped grid file at path from a 2D numpy array, as with
+        create, and return it opened for writing. typecode is as for
+        TypedDenseGrid.from_numpy.
+        '''
+        num_rows, num_columns = ndarray.shape
+        content = _numpy_content(ndarray, typecode)
+        grid = cls.create(path, num_rows, num_columns, content.typecode)
+        grid.content[:] = memoryview(content)
+        return grid
+
+    @classmethod
+    def _convert_loaded(cls, grid):
+        raise TypeError(
+            "MappedGrid.load can't choose a path; create one with "
+            "MappedGrid.create and use gridly.serialize.load_into")
+
+    ####################################################################
+    # Iterators
+    ####################################################################
+    # The inherited iterators would hold slices of the mapping for as long
+    # as they're alive, which makes close() fail, so they iterate over
+    # copies of the cells instead.
+
+    def unsafe_row(self, row):
+        return iter(self.content[self._row_slice(row)].tolist())
+
+    def unsafe_column(self, column):
+        return iter(self.content[column::self.num_columns].tolist())
+
+    def flush(self):
+        '''
+        Write any changes to the file.
+        '''
+        if not self.readonly:
+            self._mmap.flush()
+
+    def close(self):
+        '''
+        Flush and unmap the grid, and close the file. The grid can't be used
+        afterwards, and any memoryviews obtained from it must be released
+        first.
+        '''
+        if self._file.closed:
+            return
+        self.flush()
+        self.content.release()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,319 @@
+import operator
+import weakref
+
+import numpy
+
+from gridly import Location
+from gridly.grid.base import GridBase
+from gridly.grid.view import _strided_slice
+from gridly.tracking import GridObserver
+
+
+def _comparison(op):
+    def compare(self, other, rect=None):
+        '''
+        Compare each cell with other, which may be a scalar, an array, or
+        another NumpyGrid. Return a boolean array with the shape of the region.
+        Another NumpyGrid must have the same dimensions as this one, and the
+        same region of it is compared; raises ValueError if it doesn't.
+        '''
+        if isinstance(other, NumpyGrid):
+            if other.dimensions != self.dimensions:
+                raise ValueError(
+                    "Compared grids must have the same dimensions",
+                    self.dimensions, other.dimensions)
+            other = other.region(rect)
+        return op(self.region(rect), other)
+
+    compare.__name__ = op.__name__
+    return compare
+
+
+def _reduction(name):
+    def reduce(self, rect=None):
+        '''
+        Reduce the whole grid, or the region in rect, to a single value.
+        '''
+        return getattr(numpy, name)(self.region(rect)).item()
+
+    reduce.__name__ = name
+    return reduce
+
+
+class _ParentNotifier(GridObserver):
+    '''
+    Observer attached to the views of a NumpyGrid while the grid has
+    observers. A view's array shares memory with its parent's, so writes
+    through the view are reported to the parent's observers, in the parent's
+    coordinates. Views of an unobserved grid have no observers, so writes to
+    them cost nothing extra.
+    '''
+    def __init__(self, parent, origin, row_step, column_step):
+        self.parent = parent
+        self.origin = origin
+        self.row_step = row_step
+        self.column_step = column_step
+
+    def _location(self, row, column):
+        return Location(
+            self.origin[0] + row * self.row_step[0] + column * self.column_step[0],
+            self.origin[1] + row * self.row_step[1] + column * self.column_step[1])
+
+    def _rect(self, top, left, num_rows, num_columns):
+        '''
+        Return the parent rectangle covering a rectangle of the view.
+        '''
+        first = self._location(top, left)
+        if num_rows == 0 or num_columns == 0:
+            return first[0], first[1], 0, 0
+        last = self._location(top + num_rows - 1, left + num_columns - 1)
+        parent_top, parent_bottom = sorted((first[0], last[0]))
+        parent_left, parent_right = sorted((first[1], last[1]))
+        return (
+            parent_top, parent_left,
+            parent_bottom - parent_top + 1, parent_right - parent_left + 1)
+
+    def _forward(self, hook, kind, change):
+        parent = self.parent
+        if parent._observers and not parent._observer_depth:
+            parent._notify(hook, kind, change)
+
+    def cells_changing(self, grid, locations):
+        self._forward('cells_changing', 'cells', [self._location(*location) for location in locations])
+
+    def cells_changed(self, grid, locations):
+        self._forward('cells_changed', 'cells', [self._location(*location) for location in locations])
+
+    def rect_changing(self, grid, top, left, num_rows, num_columns):
+        self._forward('rect_changing', 'rect', self._rect(top, left, num_rows, num_columns))
+
+    def rect_changed(self, grid, top, left, num_rows, num_columns):
+        self._forward('rect_changed', 'rect', self._rect(top, left, num_rows, num_columns))
+
+
+class NumpyGrid(GridBase):
+    '''
+    NumpyGrid is a dense grid backed by a 2D numpy array. In addition to the
+    regular grid interface, it supports vectorized operations over the whole
+    grid or over a rectangular region. Regions are given as a
+    (top, left, num_rows, num_columns) tuple, and are bounds checked once per
+    operation.
+
+    This class requires numpy, which is an optional dependency of gridly.
+    '''
+    def __init__(self, num_rows, num_columns, *, fill=0, dtype=None, content=None, func=None):
+        GridBase.__init__(self, num_rows, num_columns)
+        shape = (num_rows, num_columns)
+
+        if func is not None:
+            self.content = numpy.array(
+                list(map(func, self.locations())), dtype=dtype).reshape(shape)
+        elif content is not None:
+            content = numpy.array(content, dtype=dtype)
+            if content.size != num_rows * num_columns:
+                raise ValueError("content must have length {}".format(
+                    num_rows * num_columns))
+            self.content = content.reshape(shape)
+        else:
+            self.content = numpy.full(shape, fill, dtype=dtype)
+
+    @classmethod
+    def from_numpy(cls, array):
+        '''
+        Create a NumpyGrid which wraps a 2D array. The array is not copied, so
+        writes to the grid are writes to the array.
+        '''
+        array = numpy.asarray(array)
+        if array.ndim != 2:
+            raise ValueError("array must be 2-dimensional", array.shape)
+
+        grid = cls.__new__(cls)
+        GridBase.__init__(grid, array.shape[0], array.shape[1])
+        grid.content = array
+        return grid
+
+    @classmethod
+    def _convert_loaded(cls, grid):
+        return cls.from_numpy(grid.to_numpy())
+
+    def to_numpy(self, dtype=None):
+        '''
+        Return the underlying array. It is only copied if a different dtype
+        is requested.
+        '''
+        if dtype is None:
+            return self.content
+        return self.content.astype(dtype, copy=False)
+
+    @property
+    def dtype(self):
+        return self.content.dtype
+
+    ####################################################################
+    # Basic element access
+    ####################################################################
+    def unsafe_get(self, location):
+        return self.content[location[0], location[1]]
+
+    def unsafe_set(self, location, value):
+        self.content[location[0], location[1]] = value
+
+    def unsafe_row(self, row):
+        return iter(self.content[row])
+
+    def unsafe_column(self, column):
+        return iter(self.content[:, column])
+
+    def unsafe_get_many(self, locations):
+        if not locations:
+            return []
+        rows, columns = zip(*locations)
+        return list(self.content[list(rows), list(columns)])
+
+    def unsafe_set_many(self, pairs):
+        pairs = list(pairs)
+        if pairs:
+            locations, values = zip(*pairs)
+            rows, columns = zip(*locations)
+            self.content[list(rows), list(columns)] = values
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        self.content[top:top + num_rows, left:left + num_columns] = value
+
+    def unsafe_copy_rect(self, source, top, left, source_top, source_left, num_rows, num_columns):
+        if isinstance(source, NumpyGrid):
+            values = source.content[
+                source_top:source_top + num_rows,
+                source_left:source_left + num_columns]
+        else:
+            source_get = source.unsafe_get
+            values = [
+                [source_get((source_top + row, source_left + column)) for column in range(num_columns)]
+                for row in range(num_rows)]
+        self.content[top:top + num_rows, left:left + num_columns] = values
+
+    def unsafe_set_row(self, row, values):
+        self.content[row] = values
+
+    def unsafe_set_column(self, column, values):
+        self.content[:, column] = values
+
+    def _transformed_view(self, origin, row_step, column_step, num_rows, num_columns):
+        # Views of a NumpyGrid are NumpyGrids wrapping a numpy view, so they
+        # keep the vectorized operations. All the view methods step along
+        # exactly one axis per view axis, so this is always a slice, possibly
+        # transposed.
+        origin_row, origin_column = origin
+        if row_step[1] == 0:
+            array = self.content[
+                _strided_slice(origin_row, row_step[0], num_rows),
+                _strided_slice(origin_column, column_step[1], num_columns)]
+        else:
+            array = self.content[
+                _strided_slice(origin_row, column_step[0], num_columns),
+                _strided_slice(origin_column, row_step[1], num_rows)].T
+        view = NumpyGrid.from_numpy(array)
+        notifier = _ParentNotifier(self, origin, row_step, column_step)
+        if self._views is None:
+            self._views = weakref.WeakKeyDictionary()
+        self._views[view] = notifier
+        if self._observers:
+            view.add_observer(notifier)
+        return view
+
+    # The notifiers of the live views are only attached while this grid has
+    # observers. Attaching one makes the view observed in turn, so views of
+    # views are attached too.
+    _views = None
+
+    def add_observer(self, observer):
+        attach = not self._observers
+        GridBase.add_observer(self, observer)
+        if attach and self._views is not None:
+            for view, notifier in list(self._views.items()):
+                view.add_observer(notifier)
+
+    def remove_observer(self, observer):
+        GridBase.remove_observer(self, observer)
+        if not self._observers and self._views is not None:
+            for view, notifier in list(self._views.items()):
+                if notifier in view._observers:
+                    view.remove_observer(notifier)
+
+    ####################################################################
+    # Vectorized operations
+    ####################################################################
+    def _region_rect(self, rect):
+        '''
+        Return the bounds checked rectangle of a region.
+        '''
+        if rect is None:
+            return (0, 0, self.num_rows, self.num_columns)
+        return self.check_rect(*rect)
+
+    def region(self, rect=None):
+        '''
+        Return a writable array view of the whole grid, or of the region given
+        by rect. Raises IndexError if the region is out of range. Writes to
+        the array are not seen by observers; use fill, apply or assign.
+        '''
+        if rect is None:
+            return self.content
+
+        top, left, num_rows, num_columns = self.check_rect(*rect)
+        return self.content[top:top + num_rows, left:left + num_columns]
+
+    def fill(self, value, rect=None):
+        '''
+        Set every cell in the grid or region to value.
+        '''
+        self._observed_rect(
+            self._region_rect(rect), operator.setitem, self.region(rect), Ellipsis, value)
+
+    def apply(self, func, rect=None):
+        '''
+        Replace the grid or region with func(region). func is called once, with
+        the whole region as an array, and should return an array (or scalar)
+        which can be broadcast to the region's shape.
+        '''
+        region = self.region(rect)
+        self._observed_rect(
+            self._region_rect(rect), operator.setitem, region, Ellipsis, func(region))
+
+    def map(self, func, rect=None, dtype=None):
+        '''
+        Return a new NumpyGrid, with the shape of the grid or region, containing
+        func(region). The grid itself is not modified.
+        '''
+        result = numpy.asarray(func(self.region(rect)), dtype=dtype)
+        return NumpyGrid.from_numpy(result)
+
+    def assign(self, mask, value, rect=None):
+        '''
+        Set the cells of the grid or region for which mask is true to value.
+        mask is a boolean array with the shape of the region, such as one
+        returned by the comparison methods. value may be a scalar or an array
+        with one element for each true cell in the mask.
+        '''
+        self._observed_rect(
+            self._region_rect(rect), operator.setitem, self.region(rect), mask, value)
+
+    eq = _comparison(operator.eq)
+    ne = _comparison(operator.ne)
+    lt = _comparison(operator.lt)
+    le = _comparison(operator.le)
+    gt = _comparison(operator.gt)
+    ge = _comparison(operator.ge)
+
+    sum = _reduction('sum')
+    min = _reduction('min')
+    max = _reduction('max')
+    mean = _reduction('mean')
+    any = _reduction('any')
+    all = _reduction('all')
+
+    def count(self, value=True, rect=None):
+        '''
+        Count the cells in the grid or region which are equal to value.
+        '''
+        return int(numpy.count_nonzero(self.region(rect) == value))
@@ -0,0 +1,148 @@
+import weakref
+
+from gridly.grid.base import GridBase
+from gridly.tracking import GridObserver
+
+
+class _SnapshotObserver(GridObserver):
+    '''
+    Observer shared by every live snapshot of a grid. Before a write, each
+    row about to change is copied once and handed to every snapshot which
+    doesn't have its own copy yet.
+    '''
+    def __init__(self, grid):
+        self.grid = grid
+        self.snapshots = []
+
+    def add(self, snapshot):
+        self.snapshots.append(weakref.ref(snapshot, self._collected))
+
+    def discard(self, snapshot):
+        self.snapshots = [ref for ref in self.snapshots if ref() not in (snapshot, None)]
+        self._detach_if_unused()
+
+    def _collected(self, ref):
+        self.snapshots = [other for other in self.snapshots if other is not ref]
+        self._detach_if_unused()
+
+    def _detach_if_unused(self):
+        if not self.snapshots and self in self.grid._observers:
+            self.grid.remove_observer(self)
+
+    def _save_rows(self, rows):
+        grid = self.grid
+        num_columns = grid.num_columns
+        done = []
+        # Copies are keyed by content as well as row, since the grid's content
+        # may have been replaced since an older snapshot was taken
+        copies = {}
+        for ref in self.snapshots:
+            snapshot = ref()
+            if snapshot is None:
+                continue
+
+            saved = snapshot._saved
+            content = snapshot._content
+            for row in rows:
+                if row not in saved:
+                    key = (id(content), row)
+                    values = copies.get(key)
+                    if values is None:
+                        start = row * num_columns
+                        values = content[start:start + num_columns]
+                        if isinstance(values, memoryview):
+                            values = values.tolist()
+                        copies[key] = values
+                    saved[row] = values
+            if len(saved) == grid.num_rows:
+                done.append(snapshot)
+
+        # Snapshots with every row saved no longer depend on the grid
+        for snapshot in done:
+            snapshot.release()
+
+    def cells_changing(self, grid, locations):
+        self._save_rows({row for row, _ in locations})
+
+    def rect_changing(self, grid, top, left, num_rows, num_columns):
+        self._save_rows(range(top, top + num_rows))
+
+
+class SnapshotGrid(GridBase):
+    '''
+    SnapshotGrid is a read-only view of a DenseGrid as it was when the
+    snapshot was taken; create one with DenseGrid.snapshot(). Taking a
+    snapshot copies nothing. Instead, the snapshot reads the grid's content
+    directly, and each row is copied just before the grid first writes to
+    it, so memory grows only with the rows that have changed. Rows copied
+    for a write are shared by every snapshot of the grid that needs them.
+
+    Reads are consistent while a single thread writes to the grid, provided
+    every write is reported to the grid's observers: writes through the
+    grid's methods, its views, and Automaton are. Writes made directly to
+    the grid's content, or through buffers which share it, such as the
+    array from TypedDenseGrid.to_numpy() or a memoryview taken before the
+    snapshot, are not, and silently change the snapshot too. Writing to a
+    snapshot raises TypeError. Call release() when done with a snapshot to
+    stop copying rows for it; this also happens when it is garbage
+    collected.
+    '''
+    def __init__(self, grid):
+        GridBase.__init__(self, grid.num_rows, grid.num_columns)
+        self._content = grid.content
+        self._saved = {}
+
+        observer = next(
+            (observer for observer in grid._observers
+             if isinstance(observer, _SnapshotObserver)),
+            None)
+        if observer is None:
+            observer = _SnapshotObserver(grid)
+            grid.add_observer(observer)
+        observer.add(self)
+        self._observer = observer
+
+    def release(self):
+        '''
+        Stop tracking changes to the grid. Rows which haven't been copied yet
+        read the grid's current values afterwards.
+        '''
+        if self._observer is not None:
+            observer, self._observer = self._observer, None
+            observer.discard(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    @property
+    def num_saved_rows(self):
+        '''
+        The number of rows which have been copied for this snapshot.
+        '''
+        return len(self._saved)
+
+    # Each read takes the live value first and then checks for a saved row.
+    # The writer saves a row before writing to it, so if no row was saved by
+    # the time of the check, the live value was read before any write.
+
+    def unsafe_get(self, location):
+        row, column = location
+        value = self._content[row * self.num_columns + column]
+        saved = self._saved.get(row)
+        if saved is not None:
+            return saved[column]
+        return value
+
+    def unsafe_set(self, location, value):
+        raise TypeError("Snapshots are read-only")
+
+    def unsafe_row(self, row):
+        start = row * self.num_columns
+        values = self._content[start:start + self.num_columns]
+        if isinstance(values, memoryview):
+            values = values.tolist()
+        saved = self._saved.get(row)
+        return iter(values if saved is None else saved)
@@ -1,21 +1,297 @@
+import itertools
+from collections.abc import MutableMapping
+
+from gridly import Location
 from gridly.grid.base import GridBase
 
+_MISSING = object()
+
+
+def _remove_from_index(index, key, value):
+    '''
+    Remove value from the set index[key], removing the set if it is empty.
+    '''
+    values = index[key]
+    values.discard(value)
+    if not values:
+        del index[key]
+
+
+class _SparseContent(MutableMapping):
+    '''
+    The content of a SparseGrid, as a mapping of location to stored value.
+    Reads go straight to the grid's dict; writes and deletions also update
+    the grid's row and column indexes.
+    '''
+    def __init__(self, grid):
+        self._grid = grid
+        self._content = grid._content
+
+    def __getitem__(self, location):
+        return self._content[location]
+
+    def __setitem__(self, location, value):
+        self._grid._store(location, value)
+
+    def __delitem__(self, location):
+        if location not in self._content:
+            raise KeyError(location)
+        self._grid._discard(location)
+
+    def __iter__(self):
+        return iter(self._content)
+
+    def __len__(self):
+        return len(self._content)
+
+    def __contains__(self, location):
+        return location in self._content
+
+    def __repr__(self):
+        return repr(self._content)
+
+    def get(self, location, default=None):
+        return self._content.get(location, default)
+
+    def keys(self):
+        return self._content.keys()
+
+    def values(self):
+        return self._content.values()
+
+    def items(self):
+        return self._content.items()
+
+    def clear(self):
+        self._content.clear()
+        self._grid._rows.clear()
+        self._grid._columns.clear()
+
 
 class SparseGrid(GridBase):
     '''
     SparseGrid is for grids for which most of the cells are some empty, default
     value. Implemented as a dict.
+
+    In addition to the content dict, the grid keeps an index of the occupied
+    columns of each row and the occupied rows of each column, so that
+    iteration over the occupied cells only visits the stored cells. content
+    is a mapping which keeps these indexes up to date, so it can still be
+    written to directly, or replaced with a new dict. Like any direct write,
+    this isn't reported to observers.
     '''
     def __init__(self, num_rows, num_columns, *, fill=None):
         GridBase.__init__(self, num_rows, num_columns)
-        self.content = {}
+        self._content = {}
         self.fill = fill
+        self._rows = {}
+        self._columns = {}
+
+    @property
+    def content(self):
+        return _SparseContent(self)
+
+    @content.setter
+    def content(self, content):
+        # Refill in place, so that existing content mappings stay valid
+        content = dict(content)
+        self._content.clear()
+        self._rows.clear()
+        self._columns.clear()
+        store = self._store
+        for location, value in content.items():
+            store(location, value)
+
+    ####################################################################
+    # Storage
+    ####################################################################
+    def _store(self, location, value):
+        '''
+        Store a non-fill value, updating the indexes.
+        '''
+        content = self._content
+        if location not in content:
+            row, column = location
+            self._rows.setdefault(row, set()).add(column)
+            self._columns.setdefault(column, set()).add(row)
+        content[location] = value
+
+    def _discard(self, location):
+        '''
+        Remove a stored value, if there is one, updating the indexes.
+        '''
+        if self._content.pop(location, _MISSING) is not _MISSING:
+            row, column = location
+            _remove_from_index(self._rows, row, column)
+            _remove_from_index(self._columns, column, row)
 
     def unsafe_get(self, location):
-        return self.content.get(location, self.fill)
+        return self._content.get(location, self.fill)
 
     def unsafe_set(self, location, value):
         if value == self.fill:
-            self.content.pop(location, None)
+            self._discard(location)
+        else:
+            self._store(location, value)
+
+    def unsafe_get_many(self, locations):
+        get = self._content.get
+        fill = self.fill
+        return [get(location, fill) for location in locations]
+
+    def unsafe_set_many(self, pairs):
+        store = self._store
+        discard = self._discard
+        fill = self.fill
+        for location, value in pairs:
+            if value == fill:
+                discard(location)
+            else:
+                store(location, value)
+
+    def unsafe_fill_rect(self, top, left, num_rows, num_columns, value):
+        if value != self.fill:
+            return GridBase.unsafe_fill_rect(
+                self, top, left, num_rows, num_columns, value)
+
+        # Clearing a rectangle only needs to visit the stored cells in it
+        for location, _ in list(self.unsafe_occupied_in_rect(top, left, num_rows, num_columns)):
+            self._discard(location)
+
+    ####################################################################
+    # Iterators
+    ####################################################################
+    # These override the GridBase iterators to skip lookups in the empty
+    # rows and columns. They still produce every cell, filling in the fill
+    # value lazily; use the occupied_* iterators to visit only the stored
+    # cells.
+
+    def unsafe_row(self, row):
+        columns = self._rows.get(row)
+        if columns is None:
+            return itertools.repeat(self.fill, self.num_columns)
+        return self._sparse_line(columns, ((row, column) for column in self._col_range))
+
+    def unsafe_column(self, column):
+        rows = self._columns.get(column)
+        if rows is None:
+            return itertools.repeat(self.fill, self.num_rows)
+        return self._sparse_line(rows, ((row, column) for row in self._row_range))
+
+    def _sparse_line(self, occupied, locations):
+        content = self._content
+        fill = self.fill
+        for location, index in zip(locations, itertools.count()):
+            yield content[location] if index in occupied else fill
+
+    def cells(self, locations=None):
+        if locations is not None:
+            return GridBase.cells(self, locations)
+        return self._all_cells()
+
+    def _all_cells(self):
+        content = self._content
+        fill = self.fill
+        rows = self._rows
+        col_range = self._col_range
+        for row in self._row_range:
+            columns = rows.get(row)
+            if columns is None:
+                for column in col_range:
+                    yield Location(row, column), fill
+            else:
+                for column in col_range:
+                    location = Location(row, column)
+                    yield location, content[location] if column in columns else fill
+
+    def occupied(self):
+        '''
+        Iterate over (location, cell) pairs for only the stored (non-fill)
+        cells, in row-major order.
+        '''
+        content = self._content
+        rows = self._rows
+        for row in sorted(rows):
+            for column in sorted(rows[row]):
+                location = Location(row, column)
+                yield location, content[location]
+
+    def unsafe_occupied_in_rect(self, top, left, num_rows, num_columns):
+        '''
+        Iterate over (location, cell) pairs for the stored cells in a
+        rectangle, in row-major order. Performs no bounds checking.
+        '''
+        content = self._content
+        rows = self._rows
+        bottom = top + num_rows
+        right = left + num_columns
+
+        # Scan whichever is smaller: the rectangle's rows or the index
+        if num_rows < len(rows):
+            row_indexes = [row for row in range(top, bottom) if row in rows]
         else:
-            self.content[location] = value
+            row_indexes = sorted(row for row in rows if top <= row < bottom)
+
+        for row in row_indexes:
+            columns = rows[row]
+            if num_columns < len(columns):
+                column_indexes = [column for column in range(left, right) if column in columns]
+            else:
+                column_indexes = sorted(column for column in columns if left <= column < right)
+
+            for column in column_indexes:
+                location = Location(row, column)
+                yield location, content[location]
+
+    def occupied_in_rect(self, top, left, num_rows, num_columns):
+        '''
+        Iterate over (location, cell) pairs for the stored cells in the
+        rectangle with the given top-left corner and size, in row-major order.
+        Raises IndexError if the rectangle is out of range.
+        '''
+        return self.unsafe_occupied_in_rect(*self.check_rect(top, left, num_rows, num_columns))
+
+    def occupied_in_row(self, row):
+        '''
+        Iterate over (location, cell) pairs for the stored cells in a row, in
+        column order. Raises IndexError if the row is out of range.
+        '''
+        return self.unsafe_occupied_in_rect(self.check_row(row), 0, 1, self.num_columns)
+
+    def unsafe_occupied_in_column(self, column):
+        '''
+        Iterate over (location, cell) pairs for the stored cells in a column,
+        in row order. Performs no bounds checking.
+        '''
+        content = self._content
+        for row in sorted(self._columns.get(column, ())):
+            location = Location(row, column)
+            yield location, content[location]
+
+    def occupied_in_column(self, column):
+        '''
+        Iterate over (location, cell) pairs for the stored cells in a column,
+        in row order. Raises IndexError if the column is out of range.
+        '''
+        return self.unsafe_occupied_in_column(self.check_column(column))
+
+    def to_numpy(self, dtype=None):
+        import numpy
+        result = numpy.full(self.dimensions, self.fill, dtype=dtype)
+        for (row, column), value in self._content.items():
+            result[row, column] = value
+        return result
+
+    @classmethod
+    def from_numpy(cls, array, *, fill=None):
+        '''
+        Create a new grid from a 2D numpy array. Only the cells which are not
+        equal to fill are stored.
+        '''
+        import numpy
+        grid = cls(array.shape[0], array.shape[1], fill=fill)
+        mask = array != fill
+        values = array[mask].tolist()
+        rows, columns = numpy.nonzero(mask)
+        grid.unsafe_set_many(zip(zip(rows.tolist(), columns.tolist()), values))
+        return grid
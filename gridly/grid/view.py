@@ -0,0 +1,115 @@
+from gridly.grid.base import GridBase
+
+
+class GridView(GridBase):
+    '''
+    GridView is a window onto another grid. It owns no data; every read and
+    write is remapped onto the parent grid, so writes through a view land in
+    the parent. A view's cell (row, column) maps to the parent location
+
+        origin + row * row_step + column * column_step
+
+    which is enough to describe subgrids, transposes, rotations and flips, and
+    any combination of them. Views are normally created with the view methods
+    on GridBase rather than directly. Taking a view of a view creates a single
+    view onto the original parent.
+    '''
+    def __init__(self, parent, origin, row_step, column_step, num_rows, num_columns):
+        GridBase.__init__(self, num_rows, num_columns)
+        self.parent = parent
+        self.origin = tuple(origin)
+        self.row_step = tuple(row_step)
+        self.column_step = tuple(column_step)
+
+    def _parent_location(self, location):
+        '''
+        Convert a location in this view to a location in the parent. Performs
+        no bounds checking.
+        '''
+        row, column = location
+        origin_row, origin_column = self.origin
+        row_step_row, row_step_column = self.row_step
+        column_step_row, column_step_column = self.column_step
+        return (
+            origin_row + row * row_step_row + column * column_step_row,
+            origin_column + row * row_step_column + column * column_step_column)
+
+    def _parent_step(self, step):
+        '''
+        Convert a step (a difference between locations) in this view to a step
+        in the parent.
+        '''
+        row, column = step
+        return (
+            row * self.row_step[0] + column * self.column_step[0],
+            row * self.row_step[1] + column * self.column_step[1])
+
+    def _transformed_view(self, origin, row_step, column_step, num_rows, num_columns):
+        return self.parent._transformed_view(
+            self._parent_location(origin),
+            self._parent_step(row_step),
+            self._parent_step(column_step),
+            num_rows, num_columns)
+
+    def unsafe_get(self, location):
+        return self.parent.unsafe_get(self._parent_location(location))
+
+    def unsafe_set(self, location, value):
+        self.parent.unsafe_set(self._parent_location(location), value)
+
+
+def _strided_slice(start, step, count):
+    '''
+    Return a slice which selects count elements, starting at start, with the
+    given (possibly negative) step.
+    '''
+    if count == 0:
+        return slice(0, 0)
+
+    stop = start + step * count
+    return slice(start, stop if stop >= 0 else None, step)
+
+
+class DenseGridView(GridView):
+    '''
+    GridView specialized for DenseGrid parents. Locations are converted
+    directly to indexes into the parent's content with strided index math,
+    and rows and columns are read with slices.
+    '''
+    def __init__(self, parent, origin, row_step, column_step, num_rows, num_columns):
+        GridView.__init__(
+            self, parent, origin, row_step, column_step, num_rows, num_columns)
+        parent_columns = parent.num_columns
+        self.content = parent.content
+        self._base = parent._index(self.origin)
+        self._row_stride = self.row_step[0] * parent_columns + self.row_step[1]
+        self._column_stride = self.column_step[0] * parent_columns + self.column_step[1]
+
+    def _index(self, location):
+        '''
+        Convert a (row, column) tuple to an index into the parent's content.
+        Performs no bounds checking.
+        '''
+        return self._base + location[0] * self._row_stride + location[1] * self._column_stride
+
+    def unsafe_get(self, location):
+        return self.content[self._index(location)]
+
+    def unsafe_set(self, location, value):
+        # Writes go through the parent while it is observed, so that its
+        # observers see them.
+        if self.parent._observers:
+            return GridView.unsafe_set(self, location, value)
+        self.content[self._index(location)] = value
+
+    def unsafe_row(self, row):
+        return iter(self.content[_strided_slice(
+            self._base + row * self._row_stride,
+            self._column_stride,
+            self.num_columns)])
+
+    def unsafe_column(self, column):
+        return iter(self.content[_strided_slice(
+            self._base + column * self._column_stride,
+            self._row_stride,
+            self.num_rows)])
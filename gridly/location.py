@@ -1,6 +1,8 @@
 import collections
 from functools import wraps
 
+_new = tuple.__new__
+
 
 class Location(collections.namedtuple('Location', ('row', 'column'))):
     '''
@@ -10,80 +12,100 @@ class Location(collections.namedtuple('Location', ('row', 'column'))):
 
     Note that Location does *not* perform any type checking on its arguments;
     all the type checking is performed by the validators of the Grid classes.
+
+    Locations have no instance dict, and the arithmetic methods build their
+    results directly with tuple.__new__, skipping the namedtuple constructor.
     '''
+    __slots__ = ()
 
     @classmethod
     def zero(cls):
         '''
         Create a (0, 0) initialized Location
         '''
+        if cls is Location:
+            return _ZERO
         return cls(0, 0)
 
     def __add__(self, other):
         '''
         Adds 2 Locations, memberwise.
         '''
-        return Location(self[0] + other[0], self[1] + other[1])
+        return _new(Location, (self[0] + other[0], self[1] + other[1]))
+
+    def __radd__(self, other):
+        '''
+        Defer to the other operand, so that (row, column) + Location is
+        still tuple concatenation. This exists so that when a subclass, such
+        as a Direction, is added to a Location, Python finds __radd__ without
+        falling back to Enum's slow class-level __getattr__.
+        '''
+        return NotImplemented
 
     def __sub__(self, other):
         '''
         Subtracts 2 Locations, memberwise.
         '''
-        return Location(self[0] - other[0], self[1] - other[1])
+        return _new(Location, (self[0] - other[0], self[1] - other[1]))
 
     def __mul__(self, value):
         '''
         Multiply a location by a factor
         '''
-        return Location(self[0] * value, self[1] * value)
+        return _new(Location, (self[0] * value, self[1] * value))
 
     def above(self, distance=1):
         '''
         Return the location above this one, at the specified distance
         '''
-        return Location(self[0] - distance, self[1])
+        return _new(Location, (self[0] - distance, self[1]))
 
     def below(self, distance=1):
         '''
         Return the location below this one, at the specified distance
         '''
-        return Location(self[0] + distance, self[1])
+        return _new(Location, (self[0] + distance, self[1]))
 
     def left(self, distance=1):
         '''
         Return the location to the left of this one, at the specified distance
         '''
-        return Location(self[0], self[1] - distance)
+        return _new(Location, (self[0], self[1] - distance))
 
     def right(self, distance=1):
         '''
         Return the location to the right of this one, at the specified distance
         '''
-        return Location(self[0], self[1] + distance)
+        return _new(Location, (self[0], self[1] + distance))
 
     def relative(self, direction, distance=1):
         '''
         Return the location in a relative Direction and distance
         '''
+        if distance == 1:
+            return self + direction
         return self + (direction * distance)
 
     def adjacent(self):
         '''
         Return a set of the 4 locations adjacent to self.
         '''
-        return {self + d for d in ((0, 1), (0, -1), (1, 0), (-1, 0))}
+        row, column = self
+        return {_new(Location, (row + r, column + c)) for r, c in _ADJACENT}
 
     def diagonals(self):
         '''
         Return a set of the 4 locations diagonaly adjacent to self
         '''
-        return {self + d for d in ((1, 1), (-1, 1), (1, -1), (-1, -1))}
+        row, column = self
+        return {_new(Location, (row + r, column + c)) for r, c in _DIAGONALS}
 
     def surrounding(self):
         '''
         Return a set of the 8 locations surrounding self
         '''
-        return self.adjacent() | self.diagonals()
+        row, column = self
+        return {_new(Location, (row + r, column + c)) for r, c in _SURROUNDING}
 
     def relatives(self, directions):
         '''
@@ -92,3 +114,9 @@ class Location(collections.namedtuple('Location', ('row', 'column'))):
         '''
         for direction in directions:
             yield self + direction
+
+
+_ZERO = Location(0, 0)
+_ADJACENT = ((0, 1), (0, -1), (1, 0), (-1, 0))
+_DIAGONALS = ((1, 1), (-1, 1), (1, -1), (-1, -1))
+_SURROUNDING = _ADJACENT + _DIAGONALS
@@ -0,0 +1,254 @@
+'''
+Line of sight, raycasting and field of view.
+
+Lines are traced with Bresenham's algorithm, so they visit exactly one cell
+per step along the major axis. Visibility is decided by an opacity predicate,
+opaque(cell), which returns true for cells that block sight. The cells at
+either end of a line never block it: a viewer can see an opaque cell, such as
+a wall, but not through it.
+
+Because grids are rectangles, a line between two in-bounds cells stays in
+bounds, so after checking the endpoints once, lines are walked without any
+further bounds checks, using flat cell indexes. The batch functions also cache
+the opacity of each cell they visit, so each cell is read from the grid and
+tested at most once per call.
+'''
+from gridly.location import Location
+
+# (column from dx, column from dy, row from dx, row from dy) for each octant
+_OCTANTS = (
+    (1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+    (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+
+def _steps(start, end):
+    '''
+    Yield the (row, column) steps of a Bresenham line from start to end, not
+    including start. The line continues past end if it isn't stopped.
+    '''
+    row, column = start
+    row_delta = abs(end[0] - row)
+    column_delta = abs(end[1] - column)
+    row_step = 1 if end[0] > row else -1
+    column_step = 1 if end[1] > column else -1
+    error = column_delta - row_delta
+
+    while True:
+        double_error = 2 * error
+        if double_error > -row_delta:
+            error -= row_delta
+            column += column_step
+        if double_error < column_delta:
+            error += column_delta
+            row += row_step
+        yield row, column
+
+
+def line(start, end):
+    '''
+    Return a list of the Locations on the line from start to end, including
+    both.
+    '''
+    start = Location(*start)
+    end = tuple(end)
+    if start == end:
+        return [start]
+
+    result = [start]
+    for step in _steps(start, end):
+        result.append(Location(*step))
+        if step == end:
+            return result
+
+
+class _Opacity:
+    '''
+    Lazily computed opacity of the cells of a grid, by flat index. Only the
+    cells which are visited are stored, so the cost follows the length of
+    the lines or the radius of the field of view, not the area of the grid.
+    '''
+    def __init__(self, grid, opaque):
+        self.grid = grid
+        self.opaque = opaque
+        self.num_columns = grid.num_columns
+        self.states = {}
+
+    def __call__(self, index):
+        state = self.states.get(index)
+        if state is None:
+            cell = self.grid.unsafe_get(divmod(index, self.num_columns))
+            state = self.states[index] = bool(self.opaque(cell))
+        return state
+
+
+def _clear_between(opacity, start, end):
+    '''
+    Return true if no cell strictly between start and end is opaque. Both
+    must be in bounds; no other bounds checking is performed.
+    '''
+    num_columns = opacity.num_columns
+    row, column = start
+    end_row, end_column = end
+    row_delta = abs(end_row - row)
+    column_delta = abs(end_column - column)
+    column_step = 1 if end_column > column else -1
+    row_step = num_columns if end_row > row else -num_columns
+    error = column_delta - row_delta
+
+    index = row * num_columns + column
+    target = end_row * num_columns + end_column
+    while True:
+        double_error = 2 * error
+        if double_error > -row_delta:
+            error -= row_delta
+            index += column_step
+        if double_error < column_delta:
+            error += column_delta
+            index += row_step
+        if index == target:
+            return True
+        if opacity(index):
+            return False
+
+
+def line_of_sight(grid, start, end, opaque):
+    '''
+    Return true if there is a clear line of sight from start to end: that
+    is, if no cell strictly between them on the line is opaque. Raises
+    IndexError if either location is out of range.
+    '''
+    start = grid.check_location(start)
+    end = grid.check_location(end)
+    if tuple(start) == tuple(end):
+        return True
+    return _clear_between(_Opacity(grid, opaque), start, end)
+
+
+def lines_of_sight(grid, pairs, opaque):
+    '''
+    Given an iterable of (start, end) location pairs, return a list of
+    whether each has a clear line of sight, as with line_of_sight. The whole
+    batch is bounds checked first, and each cell's opacity is computed at
+    most once.
+    '''
+    pairs = list(pairs)
+    grid.check_locations(location for pair in pairs for location in pair)
+
+    opacity = _Opacity(grid, opaque)
+    return [
+        tuple(start) == tuple(end) or _clear_between(opacity, start, end)
+        for start, end in pairs]
+
+
+def raycast(grid, start, toward, opaque, *, max_distance=None):
+    '''
+    Cast a ray from start through toward, continuing past toward until it
+    hits an opaque cell or leaves the grid. Return the Location of the first
+    opaque cell hit, not counting start, or None. If max_distance is given,
+    the ray stops after that many steps. Raises IndexError if start is out of
+    range, or ValueError if toward is start.
+    '''
+    start = grid.check_location(start)
+    if tuple(start) == tuple(toward):
+        raise ValueError("toward must not be start")
+
+    # The number of cells the ray can move along each axis before leaving
+    # the grid
+    row_delta = toward[0] - start[0]
+    column_delta = toward[1] - start[1]
+    row_room = grid.num_rows - 1 - start[0] if row_delta > 0 else start[0]
+    column_room = grid.num_columns - 1 - start[1] if column_delta > 0 else start[1]
+    if abs(column_delta) >= abs(row_delta):
+        major, major_room, minor, minor_room = abs(column_delta), column_room, abs(row_delta), row_room
+    else:
+        major, major_room, minor, minor_room = abs(row_delta), row_room, abs(column_delta), column_room
+
+    # Each step moves one cell along the major axis, and after k steps the
+    # ray has moved (2 * k * minor + major - 1) // (2 * major) cells along
+    # the minor axis, so the last in-bounds step is known up front, and the
+    # steps up to it are read without bounds checks.
+    num_steps = major_room
+    if minor:
+        num_steps = min(num_steps, major * (2 * minor_room + 1) // (2 * minor))
+    if max_distance is not None:
+        num_steps = min(num_steps, max_distance)
+
+    unsafe_get = grid.unsafe_get
+    for _, location in zip(range(num_steps), _steps(start, toward)):
+        if opaque(unsafe_get(location)):
+            return Location(*location)
+    return None
+
+
+def _cast_octant(opacity, visible, origin, radius, octant):
+    '''
+    Recursive shadowcasting over one octant, with an explicit stack. Each
+    stack entry is a row (distance from the origin) and the range of slopes
+    still lit at that row.
+    '''
+    origin_row, origin_column = origin
+    column_dx, column_dy, row_dx, row_dy = octant
+    num_rows = opacity.grid.num_rows
+    num_columns = opacity.num_columns
+    radius_squared = radius * radius
+
+    stack = [(1, 1.0, 0.0)]
+    while stack:
+        distance, start_slope, end_slope = stack.pop()
+        if start_slope < end_slope:
+            continue
+
+        for distance in range(distance, radius + 1):
+            dy = -distance
+            blocked = False
+            new_start = start_slope
+            for dx in range(-distance, 1):
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start_slope < right_slope:
+                    continue
+                if end_slope > left_slope:
+                    break
+
+                column = origin_column + dx * column_dx + dy * column_dy
+                row = origin_row + dx * row_dx + dy * row_dy
+                if 0 <= row < num_rows and 0 <= column < num_columns:
+                    index = row * num_columns + column
+                    if dx * dx + dy * dy <= radius_squared:
+                        visible.add(index)
+                    cell_opaque = opacity(index)
+                else:
+                    cell_opaque = True
+
+                if blocked:
+                    if cell_opaque:
+                        new_start = right_slope
+                    else:
+                        blocked = False
+                        start_slope = new_start
+                elif cell_opaque and distance < radius:
+                    blocked = True
+                    stack.append((distance + 1, start_slope, left_slope))
+                    new_start = right_slope
+
+            if blocked:
+                break
+
+
+def field_of_view(grid, origin, opaque, *, radius=None):
+    '''
+    Return a set of the Locations visible from origin, using recursive
+    shadowcasting, within radius (Euclidean) of it; by default, the whole
+    grid. Opaque cells are visible, but block sight beyond them. The origin is
+    always visible. Raises IndexError if origin is out of range.
+    '''
+    origin = grid.check_location(origin)
+    if radius is None:
+        radius = max(grid.num_rows, grid.num_columns)
+
+    opacity = _Opacity(grid, opaque)
+    num_columns = grid.num_columns
+    visible = {origin[0] * num_columns + origin[1]}
+    for octant in _OCTANTS:
+        _cast_octant(opacity, visible, origin, radius, octant)
+    return {Location(*divmod(index, num_columns)) for index in visible}
@@ -0,0 +1,113 @@
+import functools
+
+from gridly.location import Location
+
+# Common stencils, as offsets relative to a cell, in row-major order
+ADJACENT = (Location(-1, 0), Location(0, -1), Location(0, 1), Location(1, 0))
+DIAGONALS = (Location(-1, -1), Location(-1, 1), Location(1, -1), Location(1, 1))
+SURROUNDING = (
+    Location(-1, -1), Location(-1, 0), Location(-1, 1),
+    Location(0, -1), Location(0, 1),
+    Location(1, -1), Location(1, 0), Location(1, 1))
+
+
+def _classify(size, deltas):
+    '''
+    For each index in range(size), determine which deltas keep it in range.
+    Return a list mapping each index to a class number, and a list mapping
+    each class number to the tuple of indexes of the valid deltas. Only cells
+    near the edges have classes other than the all-valid one, so the number
+    of classes is small.
+    '''
+    classes = {}
+    index_classes = []
+    for index in range(size):
+        valid = tuple(i for i, delta in enumerate(deltas) if 0 <= index + delta < size)
+        index_classes.append(classes.setdefault(valid, len(classes)))
+
+    class_deltas = [None] * len(classes)
+    for valid, number in classes.items():
+        class_deltas[number] = frozenset(valid)
+    return index_classes, class_deltas
+
+
+class NeighborTable:
+    '''
+    NeighborTable is a precomputed index of the in-bounds neighbors of every
+    cell in a grid of a given shape, for a given stencil of offsets. Rather
+    than storing the neighbors of every cell, each row and each column is
+    assigned a class according to which offsets keep it in bounds, and the
+    valid offsets are stored once per (row class, column class) pair. Looking
+    up a cell's neighbors therefore performs no bounds checking at all.
+
+    Tables are normally obtained with `neighbor_table` or
+    `GridBase.neighbor_table`, which cache them by shape and stencil.
+    '''
+    def __init__(self, num_rows, num_columns, stencil):
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.stencil = tuple(Location(*offset) for offset in stencil)
+        self.flat_offsets = tuple(
+            row * num_columns + column for row, column in self.stencil)
+
+        self._row_classes, row_valid = _classify(
+            num_rows, [offset[0] for offset in self.stencil])
+        self._column_classes, column_valid = _classify(
+            num_columns, [offset[1] for offset in self.stencil])
+
+        self._offsets = [
+            [tuple(
+                offset for i, offset in enumerate(self.stencil)
+                if i in rows and i in columns)
+             for columns in column_valid]
+            for rows in row_valid]
+        self._flat_offsets = [
+            [tuple(row * num_columns + column for row, column in offsets)
+             for offsets in row_offsets]
+            for row_offsets in self._offsets]
+
+    def offsets(self, location):
+        '''
+        Return a tuple of the stencil offsets which are in bounds from a
+        location. Performs no bounds checking on the location itself.
+        '''
+        return self._offsets[self._row_classes[location[0]]][self._column_classes[location[1]]]
+
+    def neighbors(self, location):
+        '''
+        Return a list of the in-bounds neighbors of a location. Performs no
+        bounds checking on the location itself.
+        '''
+        row, column = location
+        return [
+            Location(row + row_offset, column + column_offset)
+            for row_offset, column_offset
+            in self._offsets[self._row_classes[row]][self._column_classes[column]]]
+
+    def neighbor_indices(self, index):
+        '''
+        Return a list of the row-major flat indexes of the in-bounds neighbors
+        of the cell at a row-major flat index. Performs no bounds checking on
+        the index itself.
+        '''
+        row, column = divmod(index, self.num_columns)
+        return [
+            index + offset for offset
+            in self._flat_offsets[self._row_classes[row]][self._column_classes[column]]]
+
+
+@functools.lru_cache(maxsize=64)
+def _neighbor_table(num_rows, num_columns, stencil):
+    return NeighborTable(num_rows, num_columns, stencil)
+
+
+def neighbor_table(num_rows, num_columns, stencil=ADJACENT):
+    '''
+    Return the NeighborTable for a grid shape and stencil. Tables are cached,
+    so this is cheap to call repeatedly.
+    '''
+    try:
+        return _neighbor_table(num_rows, num_columns, stencil)
+    except TypeError:
+        # Unhashable stencil, such as a list of lists
+        return _neighbor_table(num_rows, num_columns, tuple(map(tuple, stencil)))
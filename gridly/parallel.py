@@ -0,0 +1,207 @@
+'''
+Parallel band-wise map/reduce over grids, using a process pool.
+
+The grid is stored in a SharedDenseGrid, whose content lives in a
+multiprocessing.shared_memory block. SharedDenseGrids pickle as just the name
+of their block, so workers attach to the same memory and read and write the
+cells in place; the content is never copied between processes.
+
+The grid is split into bands of whole rows, which are contiguous in memory.
+Each band is handed to a worker as a view, along with halo rows above and
+below it for stencil operations, which read the cells around the band.
+'''
+import concurrent.futures
+import functools
+import os
+from array import array
+from multiprocessing import shared_memory
+
+from gridly.grid.base import GridBase
+from gridly.grid.dense import TypedDenseGrid
+
+
+def _attach(name, num_rows, num_columns, typecode):
+    return SharedDenseGrid(num_rows, num_columns, typecode, name=name)
+
+
+class SharedDenseGrid(TypedDenseGrid):
+    '''
+    SharedDenseGrid is a TypedDenseGrid whose content is a shared memory
+    block, so it can be shared between processes without copying. Creating a
+    grid allocates a new block, which is freed when the creating grid is
+    unlinked; pass name to attach to an existing block instead. Pickling the
+    grid (for instance, to send it to a worker process) pickles only the
+    name, and unpickling attaches to the same block.
+
+    Call close() in every process when done with the grid, and unlink() in
+    the creating process to free the memory. Used as a context manager, the
+    grid is closed, and unlinked if this process created it.
+    '''
+    def __init__(self, num_rows, num_columns, typecode, *, fill=0, name=None):
+        GridBase.__init__(self, num_rows, num_columns)
+        self.typecode = typecode
+        size = num_rows * num_columns * array(typecode).itemsize
+
+        self._owner = name is None
+        if self._owner:
+            # Zero-size blocks aren't allowed; new blocks are zero-filled
+            self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        else:
+            self._memory = shared_memory.SharedMemory(name=name)
+
+        self.content = self._memory.buf[:size].cast(typecode)
+        if self._owner and fill != 0:
+            self.unsafe_fill_rect(0, 0, num_rows, num_columns, fill)
+
+    @classmethod
+    def from_grid(cls, grid, typecode=None):
+        '''
+        Create a new shared grid with a copy of another grid's content. If
+        typecode is not given, it is taken from the grid.
+        '''
+        if typecode is None:
+            typecode = grid.typecode
+        shared = cls(grid.num_rows, grid.num_columns, typecode)
+        shared.unsafe_copy_rect(grid, 0, 0, 0, 0, grid.num_rows, grid.num_columns)
+        return shared
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def __reduce__(self):
+        return _attach, (self.name, self.num_rows, self.num_columns, self.typecode)
+
+    def close(self):
+        '''
+        Detach from the shared memory in this process. The grid can't be used
+        afterwards, and any memoryviews or arrays obtained from it must be
+        released first.
+        '''
+        if self.content is None:
+            return
+        self.content.release()
+        self.content = None
+        self._memory.close()
+
+    def unlink(self):
+        '''
+        Free the shared memory block, once every process has closed it. Only
+        the creating grid can unlink the block.
+        '''
+        if not self._owner:
+            raise TypeError("Only the creating grid can unlink shared memory")
+        self._memory.unlink()
+        self._owner = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        owner = self._owner
+        self.close()
+        if owner:
+            self.unlink()
+
+
+def _bands(num_rows, band_rows):
+    return [(top, min(band_rows, num_rows - top)) for top in range(0, num_rows, band_rows)]
+
+
+def _run_band(func, source, dest, top, num_rows, halo):
+    '''
+    Run func over one band. This is the function run in the worker.
+    '''
+    start = max(0, top - halo)
+    stop = min(source.num_rows, top + num_rows + halo)
+    source_view = source.view(start, 0, stop - start, source.num_columns)
+    dest_view = None if dest is None else dest.view(top, 0, num_rows, dest.num_columns)
+    return func(source_view, dest_view, top - start)
+
+
+def _run_attached(func, source, dest, top, num_rows, halo):
+    '''
+    Run func over a band in a worker process, then detach from the grids,
+    which were attached when they were unpickled.
+    '''
+    try:
+        return _run_band(func, source, dest, top, num_rows, halo)
+    finally:
+        for grid in (source, dest):
+            if grid is not None:
+                try:
+                    grid.close()
+                except BufferError:
+                    # func kept a reference into the memory; the block is
+                    # detached when that is garbage collected instead.
+                    pass
+
+
+def map_bands(func, source, dest=None, *, halo=0, band_rows=None, processes=None, executor=None):
+    '''
+    Run func over bands of rows of source in a process pool, and return a
+    list of the results, in band order.
+
+    For each band, func(source_view, dest_view, offset) is called in a
+    worker. source_view is a view of the band's rows of source plus up to
+    halo rows above and below it (fewer at the edges of the grid), and offset
+    is the number of halo rows above, so band row r is source_view row
+    r + offset. dest_view is a view of the band's rows of dest, or None if
+    dest is None. func and its result must be picklable, so func must be a
+    module-level function.
+
+    source and dest must be SharedDenseGrids. Bands must only write to
+    dest_view; with a halo, dest must not be source, since neighboring bands
+    read each other's rows. band_rows defaults to splitting the grid into
+    four bands per process. Pass an existing concurrent.futures executor to
+    reuse its processes, or processes=1 to run in this process.
+    '''
+    for grid in (source, dest):
+        if grid is not None and not isinstance(grid, SharedDenseGrid):
+            raise TypeError("Grids must be SharedDenseGrids", grid)
+    if dest is not None and dest.dimensions != source.dimensions:
+        raise ValueError("Grids must have the same dimensions", source.dimensions, dest.dimensions)
+    if halo and dest is source:
+        raise ValueError("dest must not be source when there is a halo")
+    if halo < 0:
+        raise ValueError("halo must not be negative", halo)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if band_rows is None:
+        band_rows = -(-source.num_rows // (processes * 4))
+    bands = _bands(source.num_rows, max(band_rows, 1))
+
+    if executor is None and processes == 1:
+        return [_run_band(func, source, dest, top, num_rows, halo) for top, num_rows in bands]
+
+    def submit(executor):
+        futures = [
+            executor.submit(_run_attached, func, source, dest, top, num_rows, halo)
+            for top, num_rows in bands]
+        return [future.result() for future in futures]
+
+    if executor is not None:
+        return submit(executor)
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        return submit(executor)
+
+
+def reduce_bands(func, grid, combine, *, halo=0, band_rows=None, processes=None, executor=None):
+    '''
+    Run func(view, offset) over bands of rows of grid in a process pool, as
+    with map_bands, and combine the per-band results, in band order, with
+    combine(a, b). For example, to sum a grid:
+
+        reduce_bands(band_sum, grid, operator.add)
+
+    where band_sum(view, offset) returns the sum of its view.
+    '''
+    results = map_bands(
+        functools.partial(_reduce_band, func), grid,
+        halo=halo, band_rows=band_rows, processes=processes, executor=executor)
+    return functools.reduce(combine, results)
+
+
+def _reduce_band(func, source_view, dest_view, offset):
+    return func(source_view, offset)
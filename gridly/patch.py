@@ -0,0 +1,272 @@
+'''
+Grid diffs and patches, for sending only what changed between two grids.
+
+A Patch is a list of runs, where each run is a row, the column where the run
+starts, and the new values of consecutive cells in that row. diff() builds the
+patch which turns one grid into another, and apply_patch() applies it. Patches
+have a compact binary encoding, whose size scales with the number of changed
+cells rather than with the area of the grid.
+
+Patches without a typecode pickle their values. When decoding, pickled values
+are only accepted if they are plain data (see gridly.serialize), unless
+trusted=True is passed; patches received from other machines should use a
+typecode, or be decoded untrusted.
+'''
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+
+from gridly.location import Location
+from gridly.grid import DenseGrid, SparseGrid
+from gridly.serialize import _loads, _typecode
+
+# magic, version, flags, typecode (or NUL for pickle), byte order,
+# num_rows, num_columns, number of runs
+_HEADER = struct.Struct('<8sHBcc3xQQQ')
+_MAGIC = b'GRIDLYPT'
+_VERSION = 1
+_BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+_COMPRESSED = 1
+
+
+class Patch:
+    '''
+    Patch is the set of changes which turns one grid into another, as a list
+    of (row, column, values) runs, where values are the new values of the
+    cells starting at (row, column) and extending to the right. Runs are in
+    row-major order and don't overlap. typecode, if not None, is the array
+    typecode used to encode the values.
+    '''
+    def __init__(self, num_rows, num_columns, runs=(), *, typecode=None):
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.runs = list(runs)
+        self.typecode = typecode
+
+    @property
+    def dimensions(self):
+        return self.num_rows, self.num_columns
+
+    def __len__(self):
+        '''
+        The number of changed cells.
+        '''
+        return sum(len(values) for _, _, values in self.runs)
+
+    def __bool__(self):
+        return bool(self.runs)
+
+    def __iter__(self):
+        '''
+        Iterate over (location, value) pairs for every changed cell.
+        '''
+        for row, column, values in self.runs:
+            for offset, value in enumerate(values):
+                yield Location(row, column + offset), value
+
+    def __eq__(self, other):
+        if not isinstance(other, Patch):
+            return NotImplemented
+        return (
+            self.dimensions == other.dimensions and
+            [(row, column, list(values)) for row, column, values in self.runs] ==
+            [(row, column, list(values)) for row, column, values in other.runs])
+
+    def __repr__(self):
+        return 'Patch({}, {}, {} runs, {} cells)'.format(
+            self.num_rows, self.num_columns, len(self.runs), len(self))
+
+    ####################################################################
+    # Binary encoding
+    ####################################################################
+    def encode(self, *, compress=False):
+        '''
+        Encode the patch as bytes. The runs are stored as a table of
+        (row, column, length) triples, followed by the values: raw machine
+        values if the patch has a typecode, or pickled otherwise.
+        '''
+        typecode = self.typecode
+        positions = array('Q')
+        for row, column, values in self.runs:
+            positions.extend((row, column, len(values)))
+
+        if typecode is None:
+            values = pickle.dumps(
+                [value for _, _, run in self.runs for value in run],
+                pickle.HIGHEST_PROTOCOL)
+        else:
+            values = array(typecode)
+            for _, _, run in self.runs:
+                values.extend(run if isinstance(run, array) else array(typecode, run))
+            values = values.tobytes()
+
+        body = positions.tobytes() + values
+        if compress:
+            body = zlib.compress(body)
+
+        header = _HEADER.pack(
+            _MAGIC, _VERSION, _COMPRESSED if compress else 0,
+            b'\0' if typecode is None else typecode.encode('ascii'),
+            _BYTE_ORDER, self.num_rows, self.num_columns, len(self.runs))
+        return header + body
+
+    @classmethod
+    def decode(cls, data, *, trusted=False):
+        '''
+        Decode a patch encoded with encode(). Raises ValueError if data isn't
+        an encoded patch. Pickled values are only accepted if they are plain
+        data, unless trusted is true. Never pass trusted=True for a patch
+        from an untrusted source, since unpickling it can run arbitrary code.
+        '''
+        if len(data) < _HEADER.size:
+            raise ValueError("Not an encoded patch")
+
+        magic, version, flags, typecode, byte_order, num_rows, num_columns, num_runs = (
+            _HEADER.unpack_from(data))
+        if magic != _MAGIC:
+            raise ValueError("Not an encoded patch")
+        if version != _VERSION:
+            raise ValueError("Unsupported patch version", version)
+
+        body = data[_HEADER.size:]
+        if flags & _COMPRESSED:
+            body = zlib.decompress(body)
+        swap = byte_order != _BYTE_ORDER
+        typecode = None if typecode == b'\0' else typecode.decode('ascii')
+
+        positions = array('Q')
+        split = num_runs * 3 * positions.itemsize
+        positions.frombytes(body[:split])
+        if swap:
+            positions.byteswap()
+
+        if typecode is None:
+            values = _loads(body[split:], trusted)
+        else:
+            values = array(typecode)
+            values.frombytes(body[split:])
+            if swap:
+                values.byteswap()
+
+        runs = []
+        start = 0
+        for index in range(0, len(positions), 3):
+            row, column, length = positions[index:index + 3]
+            runs.append((row, column, values[start:start + length]))
+            start += length
+        if start != len(values):
+            raise ValueError("Patch values don't match its runs")
+
+        return cls(num_rows, num_columns, runs, typecode=typecode)
+
+
+def _runs_from_locations(locations, get):
+    '''
+    Group sorted locations into runs of consecutive columns in the same row,
+    with the values from get(location).
+    '''
+    runs = []
+    previous = None
+    for location in locations:
+        row, column = location
+        if previous is not None and previous[0] == row and previous[1] + 1 == column:
+            runs[-1][2].append(get(location))
+        else:
+            runs.append((row, column, [get(location)]))
+        previous = location
+    return runs
+
+
+def _row_runs(row, a_values, b_values, runs):
+    '''
+    Append the runs where two rows differ, with the values from b.
+    '''
+    run = None
+    for column, (a_value, b_value) in enumerate(zip(a_values, b_values)):
+        if a_value != b_value:
+            if run is None:
+                run = []
+                runs.append((row, column, run))
+            run.append(b_value)
+        else:
+            run = None
+
+
+def _diff_dense(a, b):
+    a_content = a.content
+    b_content = b.content
+    num_columns = a.num_columns
+    runs = []
+    for row in range(a.num_rows):
+        start = row * num_columns
+        a_row = a_content[start:start + num_columns]
+        b_row = b_content[start:start + num_columns]
+        # Whole-row comparison is done in C; only differing rows are scanned
+        if a_row != b_row:
+            _row_runs(row, a_row, b_row, runs)
+    return runs
+
+
+def _diff_sparse(a, b):
+    a_content = a._content
+    b_content = b._content
+    changed = a_content.keys() ^ b_content.keys()
+    changed.update(
+        location for location in a_content.keys() & b_content.keys()
+        if a_content[location] != b_content[location])
+    return _runs_from_locations(sorted(changed), b.unsafe_get)
+
+
+def _diff_generic(a, b):
+    runs = []
+    for row, (a_row, b_row) in enumerate(zip(a.rows(), b.rows())):
+        _row_runs(row, a_row, b_row, runs)
+    return runs
+
+
+def diff(a, b):
+    '''
+    Return a Patch which turns grid a into grid b. The grids must have the
+    same dimensions. Two DenseGrids (or TypedDenseGrids) are compared row by
+    row, and two SparseGrids with the same fill by their stored cells; any
+    other grids are compared cell by cell.
+    '''
+    if a.dimensions != b.dimensions:
+        raise ValueError("Grids must have the same dimensions", a.dimensions, b.dimensions)
+
+    if isinstance(a, DenseGrid) and isinstance(b, DenseGrid):
+        runs = _diff_dense(a, b)
+    elif isinstance(a, SparseGrid) and isinstance(b, SparseGrid) and a.fill == b.fill:
+        runs = _diff_sparse(a, b)
+    else:
+        runs = _diff_generic(a, b)
+
+    return Patch(a.num_rows, a.num_columns, runs, typecode=_typecode(b))
+
+
+def apply_patch(grid, patch):
+    '''
+    Apply a patch to a grid, which must have the patch's dimensions. Raises
+    IndexError if any run is out of range, in which case nothing is written.
+    Runs are written straight into the content of an unobserved DenseGrid;
+    otherwise every changed cell is written in one batch.
+    '''
+    if grid.dimensions != patch.dimensions:
+        raise ValueError(
+            "Patch dimensions don't match the grid", patch.dimensions, grid.dimensions)
+
+    # Patches may come from elsewhere, so check every run once up front
+    for row, column, values in patch.runs:
+        grid.check_rect(row, column, 1, len(values))
+
+    if isinstance(grid, DenseGrid) and not grid._observers:
+        content = grid.content
+        num_columns = grid.num_columns
+        for row, column, values in patch.runs:
+            start = row * num_columns + column
+            content[start:start + len(values)] = grid._coerce(values)
+    else:
+        grid.unsafe_set_many(patch)
@@ -0,0 +1,426 @@
+'''
+Shortest path searches over any grid.
+
+All of the searches work internally on row-major flat cell indexes, with
+preallocated arrays for the search state and the grid's cached NeighborTable
+for the moves, so no Location objects or sets are created while searching.
+Moves are described by a stencil (see gridly.neighbors); use ADJACENT for
+4-connectivity and SURROUNDING for 8-connectivity.
+
+Each search takes an iterable of goal locations, stops as soon as the nearest
+one is reached, and returns the path to it as a list of Locations, from start
+to goal inclusive, or None if no goal is reachable.
+
+distance_field computes the distance from a set of sources to every cell at
+once, as a DistanceField grid, which can be repaired incrementally when a few
+cells change.
+'''
+import heapq
+from array import array
+from collections import deque
+
+from gridly.grid.dense import TypedDenseGrid
+from gridly.location import Location
+from gridly.neighbors import ADJACENT, SURROUNDING
+
+_INFINITY = float('inf')
+
+
+def _endpoints(grid, start, goals):
+    '''
+    Bounds check start and goals, and convert them to flat indexes.
+    '''
+    num_columns = grid.num_columns
+    row, column = grid.check_location(start)
+    targets = {
+        goal_row * num_columns + goal_column
+        for goal_row, goal_column in grid.check_locations(goals)}
+    return row * num_columns + column, targets
+
+
+def _build_path(parents, index, num_columns):
+    '''
+    Follow the parents array back from index to the start of the search,
+    which is its own parent, and return the path as a list of Locations.
+    '''
+    path = []
+    while True:
+        path.append(Location(*divmod(index, num_columns)))
+        parent = parents[index]
+        if parent == index:
+            break
+        index = parent
+    path.reverse()
+    return path
+
+
+def bfs(grid, start, goals, passable=None, *, stencil=ADJACENT):
+    '''
+    Breadth-first search from start to the nearest of goals, minimizing the
+    number of moves. passable(cell) should return true for cells which can be
+    entered; by default every cell can be. The start cell is never tested.
+    '''
+    start, targets = _endpoints(grid, start, goals)
+    if not targets:
+        return None
+
+    num_columns = grid.num_columns
+    neighbor_indices = grid.neighbor_table(stencil).neighbor_indices
+    unsafe_get = grid.unsafe_get
+
+    # parents doubles as the visited set: -1 means unvisited.
+    parents = array('q', [-1]) * (grid.num_rows * num_columns)
+    parents[start] = start
+    queue = deque([start])
+
+    while queue:
+        index = queue.popleft()
+        if index in targets:
+            return _build_path(parents, index, num_columns)
+
+        for neighbor in neighbor_indices(index):
+            if parents[neighbor] == -1:
+                if passable is None or passable(unsafe_get(divmod(neighbor, num_columns))):
+                    parents[neighbor] = index
+                    queue.append(neighbor)
+                else:
+                    # Mark impassable cells as visited, so they're only tested once
+                    parents[neighbor] = -2
+
+    return None
+
+
+def _stencil_heuristic(stencil, min_cost):
+    '''
+    Create an admissible heuristic for a stencil: no single move can reduce
+    the Manhattan or Chebyshev distance to a goal by more than the largest
+    move in the stencil, and every move costs at least min_cost. If no move
+    in the stencil goes anywhere, only the start can be reached, so the
+    heuristic is always 0.
+    '''
+    manhattan_reach = max((abs(row) + abs(column) for row, column in stencil), default=0)
+    chebyshev_reach = max((max(abs(row), abs(column)) for row, column in stencil), default=0)
+    if not manhattan_reach:
+        def heuristic(location, goal):
+            return 0
+
+        return heuristic
+
+    def heuristic(location, goal):
+        rows = abs(location[0] - goal[0])
+        columns = abs(location[1] - goal[1])
+        return min_cost * max(
+            (rows + columns) / manhattan_reach,
+            max(rows, columns) / chebyshev_reach)
+
+    return heuristic
+
+
+def _search(grid, start, goals, cost, stencil, heuristic, max_cost):
+    '''
+    Best-first search shared by dijkstra and astar. With heuristic=None this
+    is Dijkstra's algorithm.
+    '''
+    start, targets = _endpoints(grid, start, goals)
+    if not targets:
+        return None
+
+    num_columns = grid.num_columns
+    size = grid.num_rows * num_columns
+    neighbor_indices = grid.neighbor_table(stencil).neighbor_indices
+    unsafe_get = grid.unsafe_get
+
+    if heuristic is None:
+        def estimate(index):
+            return 0
+    else:
+        target_locations = [divmod(target, num_columns) for target in targets]
+
+        def estimate(index):
+            location = divmod(index, num_columns)
+            return min(heuristic(location, target) for target in target_locations)
+
+    # Entry costs are computed lazily, and only once per cell. -1 means the
+    # cost hasn't been computed yet.
+    costs = array('d', [-1.0]) * size
+    distances = array('d', [_INFINITY]) * size
+    parents = array('q', [-1]) * size
+    distances[start] = 0.0
+    parents[start] = start
+    heap = [(estimate(start), 0.0, start)]
+
+    while heap:
+        _, distance, index = heapq.heappop(heap)
+        if distance > distances[index]:
+            continue  # stale heap entry
+
+        if index in targets:
+            return _build_path(parents, index, num_columns)
+
+        for neighbor in neighbor_indices(index):
+            step = costs[neighbor]
+            if step < 0:
+                step = 1 if cost is None else cost(unsafe_get(divmod(neighbor, num_columns)))
+                if step is None:
+                    step = _INFINITY
+                elif step < 0:
+                    raise ValueError("cell costs must not be negative", step)
+                costs[neighbor] = step
+
+            new_distance = distance + step
+            if new_distance < distances[neighbor] and (max_cost is None or new_distance <= max_cost):
+                distances[neighbor] = new_distance
+                parents[neighbor] = index
+                heapq.heappush(heap, (new_distance + estimate(neighbor), new_distance, neighbor))
+
+    return None
+
+
+def dijkstra(grid, start, goals, cost=None, *, stencil=ADJACENT, max_cost=None):
+    '''
+    Find the cheapest path from start to the nearest of goals. cost(cell)
+    should return the cost of entering a cell, or None if it can't be
+    entered; by default every cell costs 1. Paths costing more than max_cost
+    are not explored.
+    '''
+    return _search(grid, start, goals, cost, stencil, None, max_cost)
+
+
+def astar(grid, start, goals, cost=None, *, stencil=ADJACENT, heuristic=None, min_cost=1, max_cost=None):
+    '''
+    Find the cheapest path from start to the nearest of goals with A*. cost
+    and max_cost are as for dijkstra. heuristic(location, goal) should
+    estimate the cost from a location to a goal without overestimating it;
+    the default is derived from the stencil and min_cost, which must be no
+    more than the cost of entering any cell.
+    '''
+    if heuristic is None:
+        heuristic = _stencil_heuristic(stencil, min_cost)
+    return _search(grid, start, goals, cost, stencil, heuristic, max_cost)
+
+
+####################################################################
+# Distance fields
+####################################################################
+
+# Named metrics, as the stencil of moves, each costing 1
+_METRICS = {
+    'manhattan': ADJACENT,
+    'chebyshev': SURROUNDING,
+}
+
+
+class DistanceField(TypedDenseGrid):
+    '''
+    DistanceField is a grid of doubles holding, for every cell of a source
+    grid, the cost of the cheapest path to it from the nearest of a set of
+    sources; create one with distance_field. Sources have distance 0, and
+    unreachable cells have distance infinity. As with dijkstra, the cost of a
+    path is the total cost of entering each cell along it after the source.
+
+    When some cells of the source grid change (for instance, a door closes),
+    call repair() with their locations to update only the distances which
+    depend on them.
+    '''
+    def __init__(self, grid, sources, passable=None, *, metric='manhattan', stencil=None):
+        if callable(metric):
+            weight = metric
+            stencil = ADJACENT if stencil is None else stencil
+        elif metric in _METRICS:
+            if stencil is not None:
+                raise ValueError("stencil can only be given with a cost function metric")
+            weight = None
+            stencil = _METRICS[metric]
+        else:
+            raise ValueError("Unknown metric", metric)
+
+        TypedDenseGrid.__init__(self, grid.num_rows, grid.num_columns, 'd', fill=_INFINITY)
+        num_columns = grid.num_columns
+        self.grid = grid
+        self.passable = passable
+        self.weight = weight
+        self.stencil = tuple(stencil)
+        self.sources = frozenset(
+            row * num_columns + column for row, column in grid.check_locations(sources))
+
+        self._forward = grid.neighbor_table(self.stencil).neighbor_indices
+        self._backward = grid.neighbor_table(
+            tuple((-row, -column) for row, column in self.stencil)).neighbor_indices
+        self.recompute()
+
+    def _cost(self, cell):
+        '''
+        Return the cost of entering a cell: infinity if it can't be entered.
+        '''
+        if self.passable is not None and not self.passable(cell):
+            return _INFINITY
+        if self.weight is None:
+            return 1.0
+        step = self.weight(cell)
+        if step is None:
+            return _INFINITY
+        if step < 0:
+            raise ValueError("cell costs must not be negative", step)
+        return float(step)
+
+    def _propagate(self, heap):
+        '''
+        Run Dijkstra's algorithm from the entries on the heap, lowering any
+        distances that can be improved.
+        '''
+        distances = self.content
+        costs = self._costs
+        forward = self._forward
+        while heap:
+            distance, index = heapq.heappop(heap)
+            if distance > distances[index]:
+                continue  # stale heap entry
+            for neighbor in forward(index):
+                new_distance = distance + costs[neighbor]
+                if new_distance < distances[neighbor]:
+                    distances[neighbor] = new_distance
+                    heapq.heappush(heap, (new_distance, neighbor))
+
+    def recompute(self):
+        '''
+        Recompute the whole field from the source grid.
+        '''
+        cost = self._cost
+        self._costs = array('d', (cost(cell) for row in self.grid.rows() for cell in row))
+        distances = self.content
+        distances[:] = array('d', [_INFINITY]) * len(distances)
+        for source in self.sources:
+            distances[source] = 0.0
+
+        if self.weight is not None:
+            self._propagate([(0.0, source) for source in self.sources])
+            return
+
+        # Every move costs 1, so a breadth-first search suffices
+        costs = self._costs
+        forward = self._forward
+        queue = deque(self.sources)
+        while queue:
+            index = queue.popleft()
+            new_distance = distances[index] + 1.0
+            for neighbor in forward(index):
+                if distances[neighbor] == _INFINITY and costs[neighbor] != _INFINITY:
+                    distances[neighbor] = new_distance
+                    queue.append(neighbor)
+
+    def repair(self, locations):
+        '''
+        Update the field after the cells at locations changed in the source
+        grid. Only the distances which may depend on those cells are
+        recomputed. Raises IndexError if any location is out of range.
+        '''
+        num_columns = self.num_columns
+        changed = {
+            row * num_columns + column
+            for row, column in self.grid.check_locations(locations)}
+        if not changed:
+            return
+
+        distances = self.content
+        costs = self._costs
+        sources = self.sources
+        forward = self._forward
+        backward = self._backward
+
+        # Find every cell whose distance may have been reached through a
+        # changed cell: those whose distance is exactly that of an invalid
+        # neighbor plus the cost of entering them. Ties may invalidate some
+        # cells needlessly, which costs only time.
+        invalid = set(changed)
+        stack = list(changed)
+        while stack:
+            index = stack.pop()
+            distance = distances[index]
+            if distance == _INFINITY:
+                continue
+            for neighbor in forward(index):
+                if (neighbor not in invalid and neighbor not in sources and
+                        distances[neighbor] == distance + costs[neighbor]):
+                    invalid.add(neighbor)
+                    stack.append(neighbor)
+
+        unsafe_get = self.grid.unsafe_get
+        cost = self._cost
+        for index in changed:
+            costs[index] = cost(unsafe_get(divmod(index, num_columns)))
+        invalid -= sources
+        for index in invalid:
+            distances[index] = _INFINITY
+
+        # Reseed each invalid cell from its valid neighbors, then let the
+        # search lower whatever it can, including cells outside the invalid
+        # region which a changed cell made cheaper to reach.
+        heap = []
+        for index in invalid:
+            step = costs[index]
+            if step == _INFINITY:
+                continue
+            best = min((distances[neighbor] for neighbor in backward(index)), default=_INFINITY)
+            if best != _INFINITY:
+                distances[index] = best + step
+                heap.append((best + step, index))
+        for index in changed & sources:
+            heap.append((0.0, index))
+        heapq.heapify(heap)
+        self._propagate(heap)
+
+    def next_step(self, location):
+        '''
+        Return the neighbor of location which is one step closer to the
+        nearest source along a cheapest path, or None if location is a source
+        or is unreachable. Raises IndexError if location is out of range.
+        '''
+        row, column = self.check_location(location)
+        index = row * self.num_columns + column
+        distances = self.content
+        distance = distances[index]
+        if index in self.sources or distance == _INFINITY:
+            return None
+
+        target = distance - self._costs[index]
+        best = min(self._backward(index), key=distances.__getitem__)
+        # Prefer the exact predecessor, in case of floating point ties
+        for neighbor in self._backward(index):
+            if distances[neighbor] == target:
+                best = neighbor
+                break
+        return Location(*divmod(best, self.num_columns))
+
+    def path(self, location):
+        '''
+        Return the cheapest path from location to the nearest source, as a
+        list of Locations including both, or None if location is unreachable.
+        Raises IndexError if location is out of range.
+        '''
+        location = Location(*self.check_location(location))
+        if self.unsafe_get(location) == _INFINITY:
+            return None
+        path = [location]
+        while True:
+            location = self.next_step(location)
+            if location is None:
+                return path
+            path.append(location)
+
+
+def distance_field(grid, sources, passable=None, *, metric='manhattan', stencil=None):
+    '''
+    Compute the distance from the nearest of sources to every cell of grid,
+    and return it as a DistanceField. passable(cell) should return true for
+    cells which can be entered; by default every cell can be. Sources are
+    never tested. metric is one of:
+
+    - 'manhattan': moves to the 4 adjacent cells, each costing 1
+    - 'chebyshev': moves to the 8 surrounding cells, each costing 1
+    - a function cost(cell), which returns the cost of entering a cell, or
+      None if it can't be entered, with moves given by stencil (by default,
+      ADJACENT)
+
+    Raises IndexError if any source is out of range.
+    '''
+    return DistanceField(grid, sources, passable, metric=metric, stencil=stencil)
@@ -0,0 +1,267 @@
+'''
+Flood fill and connected-component labeling.
+
+Both are iterative, so they work on grids of any size without recursion, and
+use the grid's cached NeighborTable for connectivity, so any stencil works:
+ADJACENT (the default) for 4-connectivity, SURROUNDING for 8-connectivity.
+Stencils are assumed to be symmetric.
+'''
+import collections
+from array import array
+
+from gridly.location import Location
+from gridly.neighbors import ADJACENT
+from gridly.grid import TypedDenseGrid, SparseGrid
+
+Component = collections.namedtuple(
+    'Component', ('label', 'key', 'size', 'top', 'left', 'num_rows', 'num_columns'))
+Component.__doc__ = '''
+A connected component found by label(). key is the key shared by every cell
+in the component, and (top, left, num_rows, num_columns) is its bounding box.
+'''
+
+Labeling = collections.namedtuple('Labeling', ('labels', 'components'))
+Labeling.__doc__ = '''
+The result of label(). labels is a grid of the same shape as the input, with
+0 for background cells and the component's label everywhere else. components
+is a list of Components, where components[i] has label i + 1.
+'''
+
+_DEFAULT = object()
+
+# The largest grid for which flood marks visited cells in a bytearray
+_MAX_VISITED_BYTES = 1 << 24
+
+
+def flood(grid, seed, match=None, *, stencil=ADJACENT):
+    '''
+    Return a list of the locations connected to seed through cells for which
+    match(cell) is true, in breadth-first order. By default, match selects
+    cells equal to the seed cell. The seed is always included.
+    '''
+    row, column = grid.check_location(seed)
+    if match is None:
+        seed_value = grid.unsafe_get(seed)
+
+        def match(cell):
+            return cell == seed_value
+
+    num_columns = grid.num_columns
+    neighbor_indices = grid.neighbor_table(stencil).neighbor_indices
+    unsafe_get = grid.unsafe_get
+    start = row * num_columns + column
+    size = grid.num_rows * num_columns
+
+    # Visited cells are marked in a bytearray over the whole grid, unless
+    # that would be large, or the grid is sparse, in which case the region
+    # is usually a small part of it; then they are kept in a set instead.
+    queue = collections.deque([start])
+    region = []
+    if size <= _MAX_VISITED_BYTES and not isinstance(grid, SparseGrid):
+        visited = bytearray(size)
+        visited[start] = 1
+        while queue:
+            index = queue.popleft()
+            region.append(Location(*divmod(index, num_columns)))
+            for neighbor in neighbor_indices(index):
+                if not visited[neighbor]:
+                    visited[neighbor] = 1
+                    if match(unsafe_get(divmod(neighbor, num_columns))):
+                        queue.append(neighbor)
+    else:
+        visited = {start}
+        while queue:
+            index = queue.popleft()
+            region.append(Location(*divmod(index, num_columns)))
+            for neighbor in neighbor_indices(index):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    if match(unsafe_get(divmod(neighbor, num_columns))):
+                        queue.append(neighbor)
+
+    return region
+
+
+def flood_fill(grid, seed, value, match=None, *, stencil=ADJACENT):
+    '''
+    Set every cell in the region flood(grid, seed, match) to value. Return
+    the number of cells filled.
+    '''
+    region = flood(grid, seed, match, stencil=stencil)
+    grid.unsafe_set_many((location, value) for location in region)
+    return len(region)
+
+
+class _UnionFind:
+    '''
+    Disjoint set forest over the integers 0..n, growing on demand.
+    '''
+    def __init__(self):
+        self.parents = array('q')
+
+    def add(self):
+        node = len(self.parents)
+        self.parents.append(node)
+        return node
+
+    def find(self, node):
+        parents = self.parents
+        root = node
+        while parents[root] != root:
+            root = parents[root]
+        # Path compression
+        while parents[node] != root:
+            parents[node], node = root, parents[node]
+        return root
+
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a < b:
+            self.parents[b] = a
+        elif b < a:
+            self.parents[a] = b
+
+
+def _label_dense(grid, key, background, stencil):
+    '''
+    Two-pass union-find labeling over every cell, in row-major order.
+    '''
+    num_rows, num_columns = grid.dimensions
+    keys = [key(cell) for row in grid.rows() for cell in row]
+    neighbor_indices = grid.neighbor_table(stencil).neighbor_indices
+    provisional = array('q', [-1]) * len(keys)
+    sets = _UnionFind()
+
+    # First pass: give each cell the provisional label of a matching earlier
+    # neighbor, and record equivalences between provisional labels.
+    for index, cell_key in enumerate(keys):
+        if cell_key == background:
+            continue
+
+        label = -1
+        for neighbor in neighbor_indices(index):
+            if neighbor < index and keys[neighbor] == cell_key:
+                if label == -1:
+                    label = provisional[neighbor]
+                else:
+                    sets.union(label, provisional[neighbor])
+
+        provisional[index] = sets.add() if label == -1 else label
+
+    # Second pass: resolve the final labels, in order of first appearance
+    labels = TypedDenseGrid(num_rows, num_columns, 'q')
+    content = labels.content
+    final = {}
+    sizes = []
+    bounds = []
+    cell_keys = []
+    for index, label in enumerate(provisional):
+        if label == -1:
+            continue
+
+        root = sets.find(label)
+        label = final.get(root)
+        row, column = divmod(index, num_columns)
+        if label is None:
+            label = final[root] = len(final) + 1
+            sizes.append(0)
+            bounds.append([row, column, row, column])
+            cell_keys.append(keys[index])
+
+        content[index] = label
+        sizes[label - 1] += 1
+        box = bounds[label - 1]
+        box[2] = row
+        if column < box[1]:
+            box[1] = column
+        elif column > box[3]:
+            box[3] = column
+
+    return labels, sizes, bounds, cell_keys
+
+
+def _label_sparse(grid, key, background, stencil):
+    '''
+    Union-find labeling over only the occupied cells of a SparseGrid.
+    '''
+    occupied = {}
+    for location, cell in grid.occupied():
+        cell_key = key(cell)
+        if cell_key != background:
+            occupied[location] = cell_key
+
+    table = grid.neighbor_table(stencil)
+    nodes = {location: index for index, location in enumerate(occupied)}
+    sets = _UnionFind()
+    for _ in nodes:
+        sets.add()
+
+    for location, node in nodes.items():
+        cell_key = occupied[location]
+        for neighbor in table.neighbors(location):
+            neighbor_node = nodes.get(neighbor)
+            if neighbor_node is not None and occupied[neighbor] == cell_key:
+                sets.union(node, neighbor_node)
+
+    labels = SparseGrid(grid.num_rows, grid.num_columns, fill=0)
+    store = labels._store
+    final = {}
+    sizes = []
+    bounds = []
+    cell_keys = []
+    for location, node in nodes.items():
+        root = sets.find(node)
+        label = final.get(root)
+        row, column = location
+        if label is None:
+            label = final[root] = len(final) + 1
+            sizes.append(0)
+            bounds.append([row, column, row, column])
+            cell_keys.append(occupied[location])
+
+        store(location, label)
+        sizes[label - 1] += 1
+        box = bounds[label - 1]
+        box[2] = row
+        if column < box[1]:
+            box[1] = column
+        elif column > box[3]:
+            box[3] = column
+
+    return labels, sizes, bounds, cell_keys
+
+
+def label(grid, key=None, *, background=_DEFAULT, stencil=ADJACENT):
+    '''
+    Label the connected components of a grid. Neighboring cells are in the
+    same component if key(cell) is equal for both; by default the key is the
+    cell itself. Cells whose key equals background are not part of any
+    component. background defaults to the key of the fill of a SparseGrid,
+    and to None for other grids.
+
+    For a SparseGrid, only the occupied cells are visited, so the background
+    must be the key of the grid's fill. For every other grid, every cell is
+    visited. Components are labeled from 1, in row-major order of their first
+    cell. Return a Labeling.
+    '''
+    if key is None:
+        def key(cell):
+            return cell
+
+    if isinstance(grid, SparseGrid):
+        if background is _DEFAULT:
+            background = key(grid.fill)
+        elif key(grid.fill) != background:
+            raise ValueError(
+                "The background of a SparseGrid must be the key of its fill", background)
+        labels, sizes, bounds, keys = _label_sparse(grid, key, background, stencil)
+    else:
+        if background is _DEFAULT:
+            background = None
+        labels, sizes, bounds, keys = _label_dense(grid, key, background, stencil)
+
+    components = [
+        Component(index + 1, keys[index], size, top, left, bottom - top + 1, right - left + 1)
+        for index, (size, (top, left, bottom, right)) in enumerate(zip(sizes, bounds))]
+    return Labeling(labels, components)
@@ -0,0 +1,449 @@
+'''
+Compact, versioned binary serialization for grids.
+
+A file is a fixed header followed by a body, which may be zlib compressed.
+The header records the format version, the dimensions, whether the grid is
+dense or sparse, and the codec: either an array typecode, in which case values
+are stored as raw machine values, or pickle, for arbitrary objects.
+
+Dense bodies are stored one row at a time, and sparse bodies as the fill
+value followed by batches of (row, column, value) entries, so both reading
+and writing can be streamed with GridWriter and GridReader without the whole
+grid ever being in memory.
+
+Unpickling data from an untrusted source can run arbitrary code, so by
+default pickled values are loaded with a restricted unpickler, which only
+accepts plain data: numbers, strings, bytes, containers, None, Locations and
+Directions. Pass trusted=True to load arbitrary objects from files you trust.
+'''
+import io
+import os
+import pickle
+import struct
+import sys
+import zlib
+from array import array
+
+from gridly.location import Location
+from gridly.grid import DenseGrid, TypedDenseGrid, SparseGrid
+
+# magic, version, flags, typecode (or NUL for pickle), byte order,
+# num_rows, num_columns
+_HEADER = struct.Struct('<8sHBcc3xQQ')
+_FRAME = struct.Struct('<Q')
+_MAGIC = b'GRIDLYSV'
+_VERSION = 1
+_BYTE_ORDER = b'<' if sys.byteorder == 'little' else b'>'
+
+_SPARSE = 1
+_COMPRESSED = 2
+
+# The number of sparse entries written in each batch
+_BATCH_SIZE = 4096
+
+# The globals which the restricted unpickler may load
+_SAFE_GLOBALS = {
+    ('builtins', 'complex'),
+    ('builtins', 'bytearray'),
+    ('builtins', 'set'),
+    ('builtins', 'frozenset'),
+    ('gridly.location', 'Location'),
+    ('gridly.direction', 'Direction'),
+}
+
+
+class _RestrictedUnpickler(pickle.Unpickler):
+    '''
+    Unpickler which refuses every global outside _SAFE_GLOBALS, so that it
+    can't be made to call arbitrary functions.
+    '''
+    def find_class(self, module, name):
+        if (module, name) not in _SAFE_GLOBALS:
+            raise pickle.UnpicklingError(
+                "{}.{} is not allowed in untrusted data".format(module, name))
+        return pickle.Unpickler.find_class(self, module, name)
+
+
+def _loads(data, trusted):
+    '''
+    Unpickle data. Unless trusted is true, only plain data is accepted, and
+    ValueError is raised for anything else.
+    '''
+    if trusted:
+        return pickle.loads(data)
+    try:
+        return _RestrictedUnpickler(io.BytesIO(data)).load()
+    except pickle.UnpicklingError as error:
+        raise ValueError(
+            "Refusing to unpickle untrusted data; pass trusted=True if it comes "
+            "from a trusted source", str(error)) from error
+
+
+class _CompressedReader:
+    '''
+    File-like wrapper which decompresses a zlib stream as it is read.
+    '''
+    def __init__(self, file):
+        self.file = file
+        self.decompressor = zlib.decompressobj()
+        self.buffer = bytearray()
+
+    def read(self, size):
+        buffer = self.buffer
+        while len(buffer) < size and not self.decompressor.eof:
+            chunk = self.file.read(65536)
+            if not chunk:
+                break
+            buffer += self.decompressor.decompress(chunk)
+        result = bytes(buffer[:size])
+        del buffer[:size]
+        return result
+
+
+class _CompressedWriter:
+    '''
+    File-like wrapper which compresses everything written to it.
+    '''
+    def __init__(self, file):
+        self.file = file
+        self.compressor = zlib.compressobj()
+
+    def write(self, data):
+        self.file.write(self.compressor.compress(data))
+
+    def finish(self):
+        self.file.write(self.compressor.flush())
+
+
+def _open(file, mode):
+    '''
+    Return (file object, whether we own it) for a path or file object.
+    '''
+    if isinstance(file, (str, bytes, os.PathLike)):
+        return open(file, mode), True
+    return file, False
+
+
+def _typecode(grid):
+    '''
+    Return the array typecode for a grid's cells, or None if they need to be
+    pickled.
+    '''
+    typecode = getattr(grid, 'typecode', None)
+    if typecode is None:
+        dtype = getattr(grid, 'dtype', None)
+        if dtype is not None and dtype.kind in 'iuf' and dtype.char in array.typecodes:
+            typecode = dtype.char
+    return typecode
+
+
+def _sparse_typecode(grid):
+    '''
+    Return an array typecode which can store the fill and every stored value
+    of a SparseGrid exactly, or None if they need to be pickled.
+    '''
+    values = [grid.fill]
+    values.extend(grid.content.values())
+    if all(type(value) is int for value in values):
+        if all(-2 ** 63 <= value < 2 ** 63 for value in values):
+            return 'q'
+    elif all(type(value) is float for value in values):
+        return 'd'
+    return None
+
+
+class GridWriter:
+    '''
+    GridWriter writes a grid file incrementally. For a dense grid, call
+    write_row once for each row, in order. For a sparse grid (sparse=True),
+    call write_entries any number of times with (location, value) pairs. Call
+    close() (or use the writer as a context manager) to finish the file.
+
+    typecode selects the raw array codec, for the rows of a dense grid, or
+    the fill and values of a sparse grid; otherwise values are pickled.
+    '''
+    def __init__(self, file, num_rows, num_columns, *, typecode=None, sparse=False, fill=None, compress=False):
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.typecode = typecode
+        self.sparse = sparse
+        self._rows_written = 0
+        self._file, self._owned = _open(file, 'wb')
+
+        flags = (_SPARSE if sparse else 0) | (_COMPRESSED if compress else 0)
+        self._file.write(_HEADER.pack(
+            _MAGIC, _VERSION, flags,
+            b'\0' if typecode is None else typecode.encode('ascii'),
+            _BYTE_ORDER, num_rows, num_columns))
+
+        self._output = _CompressedWriter(self._file) if compress else self._file
+        if sparse:
+            self._write_frame(self._encode_values([fill]))
+
+    def _encode_values(self, values):
+        if self.typecode is None:
+            return pickle.dumps(values, pickle.HIGHEST_PROTOCOL)
+        return array(self.typecode, values).tobytes()
+
+    def _write_frame(self, data):
+        self._output.write(_FRAME.pack(len(data)))
+        self._output.write(data)
+
+    def write_row(self, values):
+        '''
+        Write the next row of a dense grid.
+        '''
+        if self.sparse:
+            raise TypeError("write_row is only for dense grids")
+        if self._rows_written == self.num_rows:
+            raise ValueError("All rows have already been written")
+
+        if self.typecode is None:
+            row = list(values)
+        else:
+            row = values if isinstance(values, array) and values.typecode == self.typecode else array(self.typecode, values)
+        if len(row) != self.num_columns:
+            raise ValueError("row must have length {}".format(self.num_columns))
+
+        if self.typecode is None:
+            self._write_frame(pickle.dumps(row, pickle.HIGHEST_PROTOCOL))
+        else:
+            self._output.write(row.tobytes())
+        self._rows_written += 1
+
+    def write_entries(self, pairs):
+        '''
+        Write (location, value) pairs of a sparse grid.
+        '''
+        if not self.sparse:
+            raise TypeError("write_entries is only for sparse grids")
+
+        batch = []
+        for location, value in pairs:
+            batch.append((location, value))
+            if len(batch) == _BATCH_SIZE:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        # Typed batches are the (row, column) positions followed by the
+        # values; pickled ones are a list of (row, column, value) triples.
+        if self.typecode is None:
+            self._write_frame(pickle.dumps(
+                [(row, column, value) for (row, column), value in batch],
+                pickle.HIGHEST_PROTOCOL))
+        else:
+            positions = array('Q')
+            for location, _ in batch:
+                positions.extend(location)
+            self._write_frame(
+                positions.tobytes() + self._encode_values([value for _, value in batch]))
+
+    def close(self):
+        '''
+        Finish writing the file. Raises ValueError if a dense grid is missing
+        rows.
+        '''
+        if self._file is None:
+            return
+
+        try:
+            if self.sparse:
+                self._write_frame(b'')
+            elif self._rows_written != self.num_rows:
+                raise ValueError("Only {} of {} rows were written".format(
+                    self._rows_written, self.num_rows))
+
+            if self._output is not self._file:
+                self._output.finish()
+        finally:
+            if self._owned:
+                self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GridReader:
+    '''
+    GridReader reads a grid file incrementally. After opening, the header is
+    available as num_rows, num_columns, typecode, sparse and fill (for sparse
+    grids). Read a dense grid with rows(), which yields each row as a list, or
+    as an array for typed grids, and a sparse grid with entries(), which
+    yields (location, value) pairs.
+
+    Pickled values are only loaded if they are plain data, unless trusted is
+    true. Never pass trusted=True for a file from an untrusted source, since
+    unpickling it can run arbitrary code.
+    '''
+    def __init__(self, file, *, trusted=False):
+        self._file, self._owned = _open(file, 'rb')
+        try:
+            header = self._file.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError("Not a grid file")
+
+            magic, version, flags, typecode, byte_order, num_rows, num_columns = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError("Not a grid file")
+            if version != _VERSION:
+                raise ValueError("Unsupported grid file version", version)
+        except Exception:
+            self.close()
+            raise
+
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.typecode = None if typecode == b'\0' else typecode.decode('ascii')
+        self.sparse = bool(flags & _SPARSE)
+        self.trusted = trusted
+        self._swap = byte_order != _BYTE_ORDER
+        self._input = _CompressedReader(self._file) if flags & _COMPRESSED else self._file
+        self.fill = self._decode_values(self._read_frame())[0] if self.sparse else None
+
+    def _decode_values(self, data):
+        if self.typecode is None:
+            return _loads(data, self.trusted)
+        values = array(self.typecode)
+        values.frombytes(data)
+        if self._swap:
+            values.byteswap()
+        return values
+
+    @property
+    def dimensions(self):
+        return self.num_rows, self.num_columns
+
+    def _read_exactly(self, size):
+        data = self._input.read(size)
+        if len(data) != size:
+            raise ValueError("Grid file is truncated")
+        return data
+
+    def _read_frame(self):
+        size, = _FRAME.unpack(self._read_exactly(_FRAME.size))
+        return self._read_exactly(size)
+
+    def rows(self):
+        '''
+        Iterate over the rows of a dense grid.
+        '''
+        if self.sparse:
+            raise TypeError("rows is only for dense grids")
+
+        if self.typecode is None:
+            for _ in range(self.num_rows):
+                yield _loads(self._read_frame(), self.trusted)
+        else:
+            row_size = self.num_columns * array(self.typecode).itemsize
+            for _ in range(self.num_rows):
+                row = array(self.typecode)
+                row.frombytes(self._read_exactly(row_size))
+                if self._swap:
+                    row.byteswap()
+                yield row
+
+    def entries(self):
+        '''
+        Iterate over the (location, value) pairs of a sparse grid.
+        '''
+        if not self.sparse:
+            raise TypeError("entries is only for sparse grids")
+
+        entry_size = None if self.typecode is None else 16 + array(self.typecode).itemsize
+        while True:
+            frame = self._read_frame()
+            if not frame:
+                break
+
+            if entry_size is None:
+                for row, column, value in _loads(frame, self.trusted):
+                    yield Location(row, column), value
+                continue
+
+            if len(frame) % entry_size:
+                raise ValueError("Grid file is corrupt")
+            count = len(frame) // entry_size
+            positions = array('Q')
+            positions.frombytes(frame[:count * 16])
+            if self._swap:
+                positions.byteswap()
+            values = self._decode_values(frame[count * 16:])
+            for index, value in enumerate(values):
+                yield Location(positions[2 * index], positions[2 * index + 1]), value
+
+    def close(self):
+        if self._owned:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save(grid, file, *, compress=False):
+    '''
+    Save a grid to a path or binary file object. SparseGrids use the sparse
+    encoding, which only stores the occupied cells, with raw values if they
+    are all ints or all floats; every other grid is stored densely, one row
+    at a time.
+    '''
+    if isinstance(grid, SparseGrid):
+        with GridWriter(
+                file, grid.num_rows, grid.num_columns, typecode=_sparse_typecode(grid),
+                sparse=True, fill=grid.fill, compress=compress) as writer:
+            writer.write_entries(grid.occupied())
+    else:
+        with GridWriter(file, grid.num_rows, grid.num_columns, typecode=_typecode(grid), compress=compress) as writer:
+            for row in grid.rows():
+                writer.write_row(row)
+
+
+def load(file, *, trusted=False):
+    '''
+    Load a grid from a path or binary file object. Sparse files load as a
+    SparseGrid, typed dense files as a TypedDenseGrid, and other dense files
+    as a DenseGrid. See GridReader for trusted.
+    '''
+    with GridReader(file, trusted=trusted) as reader:
+        if reader.sparse:
+            grid = SparseGrid(reader.num_rows, reader.num_columns, fill=reader.fill)
+            grid.unsafe_set_many(reader.entries())
+        elif reader.typecode is None:
+            grid = DenseGrid(reader.num_rows, reader.num_columns)
+            content = grid.content = []
+            for row in reader.rows():
+                content.extend(row)
+        else:
+            grid = TypedDenseGrid(reader.num_rows, reader.num_columns, reader.typecode)
+            content = grid.content = array(reader.typecode)
+            for row in reader.rows():
+                content.extend(row)
+    return grid
+
+
+def load_into(file, grid, *, trusted=False):
+    '''
+    Load a grid file into an existing grid of the same dimensions, such as a
+    MappedGrid, one row (or batch of sparse entries) at a time. For sparse
+    files, only the stored cells are written. See GridReader for trusted.
+    '''
+    with GridReader(file, trusted=trusted) as reader:
+        if reader.dimensions != grid.dimensions:
+            raise ValueError(
+                "Grid file dimensions don't match the grid",
+                reader.dimensions, grid.dimensions)
+
+        if reader.sparse:
+            grid.unsafe_set_many(reader.entries())
+        else:
+            for row_index, row in enumerate(reader.rows()):
+                grid.unsafe_set_row(row_index, row)
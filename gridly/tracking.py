@@ -0,0 +1,188 @@
+'''
+Change tracking for grids.
+
+ChangeTracker observes a grid and records what changed since the last
+checkpoint: the dirty cells, rows and tiles, and an ordered log of the new
+values. Renderers can redraw only the dirty tiles, and network sync can send
+the log instead of the whole grid. Tracking is opt-in: a grid without
+observers runs its normal, unwrapped methods.
+'''
+import collections
+import itertools
+
+from gridly.location import Location
+
+Changes = collections.namedtuple(
+    'Changes', ('cells', 'rows', 'tiles', 'log', 'complete'))
+Changes.__doc__ = '''
+The changes drained from a ChangeTracker. cells is a set of the dirty
+Locations, rows a sorted list of the dirty rows, and tiles a sorted list of
+the (tile row, tile column) pairs of the dirty tiles. log is a list of
+(location, value) pairs, in the order the cells were written, where value is
+the value written. complete is false if the log overflowed, in which case only
+the most recent entries are in the log, and cells should be used instead.
+'''
+
+
+class GridObserver:
+    '''
+    Base class for grid observers, with hooks which do nothing. Register an
+    observer with grid.add_observer. The *_changing hooks are called before
+    a write, and the *_changed hooks after it (even if the write raised).
+    '''
+    def cells_changing(self, grid, locations):
+        pass
+
+    def cells_changed(self, grid, locations):
+        pass
+
+    def rect_changing(self, grid, top, left, num_rows, num_columns):
+        pass
+
+    def rect_changed(self, grid, top, left, num_rows, num_columns):
+        pass
+
+
+class ChangeTracker(GridObserver):
+    '''
+    ChangeTracker records the changes made to a grid. The grid is divided into
+    square tiles of tile_size x tile_size cells for the dirty-tile bitmap. The
+    log keeps at most log_size entries (or is unbounded if log_size is None);
+    older entries are discarded.
+
+    The tracker starts observing the grid when it is created. Call close(), or
+    use the tracker as a context manager, to stop.
+    '''
+    def __init__(self, grid, *, tile_size=16, log_size=4096):
+        if tile_size < 1:
+            raise ValueError("tile_size must be positive", tile_size)
+
+        self.grid = grid
+        self.num_rows, self.num_columns = grid.dimensions
+        self.tile_size = tile_size
+        self.tile_rows = -(-grid.num_rows // tile_size)
+        self.tile_columns = -(-grid.num_columns // tile_size)
+        self.log_size = log_size
+
+        self.dirty_cells = set()
+        self.dirty_rows = set()
+        self.tiles = bytearray(self.tile_rows * self.tile_columns)
+        self.log = collections.deque(maxlen=log_size)
+        self._logged = 0
+
+        grid.add_observer(self)
+
+    ####################################################################
+    # Observer hooks
+    ####################################################################
+    def cells_changed(self, grid, locations):
+        dirty_cells = self.dirty_cells
+        dirty_rows = self.dirty_rows
+        tiles = self.tiles
+        tile_size = self.tile_size
+        tile_columns = self.tile_columns
+        log = self.log
+        unsafe_get = grid.unsafe_get
+
+        for location in locations:
+            row, column = location
+            dirty_cells.add(location)
+            dirty_rows.add(row)
+            tiles[(row // tile_size) * tile_columns + column // tile_size] = 1
+            log.append((location, unsafe_get(location)))
+        self._logged += len(locations)
+
+    def rect_changed(self, grid, top, left, num_rows, num_columns):
+        bottom = top + num_rows
+        right = left + num_columns
+        tile_size = self.tile_size
+        tile_columns = self.tile_columns
+
+        self.dirty_rows.update(range(top, bottom))
+        for tile_row in range(top // tile_size, -(-bottom // tile_size)):
+            start = tile_row * tile_columns
+            for tile_column in range(left // tile_size, -(-right // tile_size)):
+                self.tiles[start + tile_column] = 1
+
+        dirty_cells = self.dirty_cells
+        log = self.log
+        columns = range(left, right)
+        for row in range(top, bottom):
+            for column, value in zip(columns, itertools.islice(grid.unsafe_row(row), left, right)):
+                location = Location(row, column)
+                dirty_cells.add(location)
+                log.append((location, value))
+        self._logged += num_rows * num_columns
+
+    ####################################################################
+    # Queries
+    ####################################################################
+    @property
+    def dirty(self):
+        '''
+        True if anything changed since the last checkpoint.
+        '''
+        return bool(self.dirty_cells)
+
+    def dirty_tiles(self):
+        '''
+        Return a sorted list of the (tile row, tile column) pairs of the dirty
+        tiles.
+        '''
+        tile_columns = self.tile_columns
+        return [
+            divmod(index, tile_columns)
+            for index, dirty in enumerate(self.tiles) if dirty]
+
+    def tile_rect(self, tile):
+        '''
+        Return the (top, left, num_rows, num_columns) rectangle covered by a
+        tile, clipped to the grid.
+        '''
+        tile_size = self.tile_size
+        top = tile[0] * tile_size
+        left = tile[1] * tile_size
+        return (
+            top, left,
+            min(tile_size, self.num_rows - top),
+            min(tile_size, self.num_columns - left))
+
+    ####################################################################
+    # Checkpoints
+    ####################################################################
+    def checkpoint(self):
+        '''
+        Forget every change recorded so far.
+        '''
+        self.dirty_cells = set()
+        self.dirty_rows = set()
+        self.tiles = bytearray(len(self.tiles))
+        self.log.clear()
+        self._logged = 0
+
+    def drain(self):
+        '''
+        Return the Changes since the last checkpoint, and checkpoint.
+        '''
+        changes = Changes(
+            self.dirty_cells,
+            sorted(self.dirty_rows),
+            self.dirty_tiles(),
+            list(self.log),
+            self.log_size is None or self._logged <= self.log_size)
+        self.checkpoint()
+        return changes
+
+    def close(self):
+        '''
+        Stop observing the grid.
+        '''
+        if self.grid is not None:
+            self.grid.remove_observer(self)
+            self.grid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
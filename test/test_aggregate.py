@@ -0,0 +1,97 @@
+import random
+import unittest
+
+from gridly import DenseGrid, TypedDenseGrid, SparseGrid
+from gridly.aggregate import SummedAreaTable, FenwickTree2D
+
+
+def brute_sum(grid, top, left, num_rows, num_columns):
+    return sum(
+        grid[row, column]
+        for row in range(top, top + num_rows)
+        for column in range(left, left + num_columns))
+
+
+def brute_count(grid, top, left, num_rows, num_columns):
+    return sum(
+        1
+        for row in range(top, top + num_rows)
+        for column in range(left, left + num_columns)
+        if grid[row, column] != 0)
+
+
+class TestAggregate:
+    '''
+    Test an aggregate index type against brute force on dense and sparse
+    grids, through a series of random writes.
+    '''
+    def check_all(self, grid, index, rng):
+        for _ in range(20):
+            top = rng.randrange(grid.num_rows + 1)
+            left = rng.randrange(grid.num_columns + 1)
+            num_rows = rng.randrange(grid.num_rows - top + 1)
+            num_columns = rng.randrange(grid.num_columns - left + 1)
+            rect = (top, left, num_rows, num_columns)
+            self.assertEqual(index.sum(*rect), brute_sum(grid, *rect), rect)
+            self.assertEqual(index.count(*rect), brute_count(grid, *rect), rect)
+
+    def run_updates(self, grid):
+        rng = random.Random(7)
+        for location in grid.locations():
+            if rng.random() < 0.3:
+                grid[location] = rng.randrange(-5, 10)
+
+        with self.index_type(grid) as index:
+            self.check_all(grid, index, rng)
+            for _ in range(10):
+                row = rng.randrange(grid.num_rows)
+                column = rng.randrange(grid.num_columns)
+                grid[row, column] = rng.randrange(10)
+                grid.set_many([((row, 0), 1), ((row, 0), 2), ((0, column), 0)])
+                grid.fill_rect(row, column, 1, grid.num_columns - column, rng.randrange(3))
+                self.check_all(grid, index, rng)
+
+    def test_dense(self):
+        self.run_updates(DenseGrid(7, 9, fill=0))
+
+    def test_typed(self):
+        self.run_updates(TypedDenseGrid(8, 5, 'l'))
+
+    def test_sparse(self):
+        self.run_updates(SparseGrid(6, 11, fill=0))
+
+    def test_mean_and_key(self):
+        grid = DenseGrid(2, 2, content=['a', 'bb', '', 'dddd'])
+        with self.index_type(grid, key=len) as index:
+            self.assertEqual(index.sum(0, 0, 2, 2), 7)
+            self.assertEqual(index.count(0, 0, 2, 2), 3)
+            self.assertEqual(index.mean(0, 0, 2, 2), 1.75)
+            grid[1, 0] = 'ccc'
+            self.assertEqual(index.mean(1, 0, 1, 2), 3.5)
+            with self.assertRaises(ValueError):
+                index.mean(0, 0, 0, 2)
+            with self.assertRaises(IndexError):
+                index.sum(0, 0, 3, 1)
+
+    def test_close(self):
+        grid = DenseGrid(2, 2, fill=0)
+        index = self.index_type(grid)
+        index.close()
+        self.assertEqual(grid._observers, ())
+
+
+class TestSummedAreaTable(TestAggregate, unittest.TestCase):
+    index_type = SummedAreaTable
+
+    def test_stale(self):
+        grid = DenseGrid(3, 3, fill=1)
+        with SummedAreaTable(grid) as table:
+            self.assertFalse(table.stale)
+            grid[1, 1] = 5
+            self.assertTrue(table.stale)
+            self.assertEqual(table.sum(0, 0, 3, 3), 13)
+            self.assertFalse(table.stale)
+
+
+class TestFenwickTree2D(TestAggregate, unittest.TestCase):
+    index_type = FenwickTree2D
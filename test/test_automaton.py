@@ -0,0 +1,124 @@
+import random
+import unittest
+from gridly import DenseGrid, TypedDenseGrid, NumpyGrid, ADJACENT
+from gridly.automaton import Automaton
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LIFE = [[0, 0, 0, 1, 0, 0, 0, 0, 0], [0, 0, 1, 1, 0, 0, 0, 0, 0]]
+
+
+def life_rule(cell, neighbors):
+    return LIFE[cell][sum(neighbors)]
+
+
+def glider(grid_type, *args, **kwargs):
+    grid = grid_type(10, 10, *args, **kwargs)
+    for location in ((0, 1), (1, 2), (2, 0), (2, 1), (2, 2)):
+        grid[location] = 1
+    return grid
+
+
+def alive(grid):
+    return {location for location, cell in grid.cells() if cell}
+
+
+class TestAutomaton:
+    def test_blinker(self):
+        grid = self.make_grid(5, 5)
+        for column in (1, 2, 3):
+            grid[2, column] = 1
+        automaton = self.make_automaton(grid)
+
+        automaton.step()
+        self.assertEqual(alive(automaton.grid), {(1, 2), (2, 2), (3, 2)})
+        automaton.step()
+        self.assertEqual(alive(automaton.grid), {(2, 1), (2, 2), (2, 3)})
+        self.assertEqual(automaton.generation, 2)
+
+    def test_glider(self):
+        grid = self.make_grid(10, 10)
+        for location in ((0, 1), (1, 2), (2, 0), (2, 1), (2, 2)):
+            grid[location] = 1
+        automaton = self.make_automaton(grid)
+        automaton.step(8)
+        self.assertEqual(
+            alive(automaton.grid), {(2, 3), (3, 4), (4, 2), (4, 3), (4, 4)})
+
+    def make_automaton(self, grid):
+        return Automaton(grid, table=LIFE)
+
+
+class TestDenseAutomaton(TestAutomaton, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return DenseGrid(num_rows, num_columns, fill=0)
+
+    def test_rule_function(self):
+        grid = self.make_grid(4, 4)
+        grid[1, 1] = 1
+        automaton = Automaton(
+            grid, lambda cell, neighbors: max([cell] + neighbors), stencil=ADJACENT)
+        automaton.step(2)
+        self.assertEqual(len(alive(automaton.grid)), 11)
+
+    def test_requires_one_rule(self):
+        with self.assertRaises(ValueError):
+            Automaton(self.make_grid(2, 2))
+        with self.assertRaises(ValueError):
+            Automaton(self.make_grid(2, 2), life_rule, table=LIFE)
+
+
+class TestTiledAutomaton(TestAutomaton, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return DenseGrid(num_rows, num_columns, fill=0)
+
+    def make_automaton(self, grid):
+        return Automaton(grid, life_rule, tile_size=3)
+
+    def test_matches_untiled(self):
+        rng = random.Random(1)
+        content = [int(rng.random() < 0.3) for _ in range(23 * 17)]
+        tiled = Automaton(DenseGrid(23, 17, content=content), table=LIFE, tile_size=4)
+        untiled = Automaton(DenseGrid(23, 17, content=content), table=LIFE)
+        for _ in range(30):
+            tiled.step()
+            untiled.step()
+            self.assertEqual(tiled.grid.content, untiled.grid.content)
+
+    def test_skips_stable_tiles(self):
+        grid = self.make_grid(12, 12)
+        for row, column in ((0, 0), (0, 1), (1, 0), (1, 1)):
+            grid[row, column] = 1
+        automaton = Automaton(grid, table=LIFE, tile_size=4)
+        automaton.step()
+        self.assertEqual(automaton._active, set())
+        automaton.step(3)
+        self.assertEqual(len(alive(automaton.grid)), 4)
+
+    def test_tile_size_too_small(self):
+        with self.assertRaises(ValueError):
+            Automaton(self.make_grid(4, 4), life_rule, stencil=[(0, 2)], tile_size=1)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestTypedAutomaton(TestAutomaton, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return TypedDenseGrid(num_rows, num_columns, 'b')
+
+    def test_vectorized(self):
+        self.assertTrue(Automaton(self.make_grid(2, 2), table=LIFE)._vectorized)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestNumpyAutomaton(TestAutomaton, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return NumpyGrid(num_rows, num_columns, dtype=int)
+
+    def test_rule_function(self):
+        automaton = Automaton(glider(NumpyGrid, dtype=int), life_rule)
+        automaton.step(4)
+        self.assertEqual(
+            alive(automaton.grid), {(1, 2), (2, 3), (3, 1), (3, 2), (3, 3)})
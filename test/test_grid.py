@@ -1,5 +1,16 @@
-from unittest import TestCase
-from gridly import DenseGrid, SparseGrid, CompositeGrid
+import os
+import tempfile
+from unittest import TestCase, skipIf
+from gridly import (
+    DenseGrid, TypedDenseGrid, SparseGrid, ChunkedGrid, MappedGrid,
+    CompositeGrid, FunctionGrid, BitGrid, NumpyGrid)
+from gridly.grid import InstrumentedGrid
+from gridly.neighbors import SURROUNDING
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class TestGenericGrid:
     '''
@@ -147,9 +158,901 @@ class TestDenseGrid(TestGenericConcreteGrid, TestCase):
         for (r, c), cell in grid.cells():
             self.assertEqual(cell, r + c)
 
+class TestTypedDenseGrid(TestGenericGrid, TestCase):
+    def setUp(self):
+        self.grid = TypedDenseGrid(self.num_rows, self.num_columns, 'l')
+
+    def test_fill(self):
+        grid = TypedDenseGrid(2, 3, 'd', fill=1.5)
+        self.assertEqual(list(grid.row(1)), [1.5] * 3)
+
+    def test_get_set(self):
+        self.grid[2, 3] = 7
+        self.assertEqual(self.grid[2, 3], 7)
+        self.assertEqual(list(self.grid.column(3)), [0, 0, 7, 0, 0])
+        with self.assertRaises(TypeError):
+            self.grid[2, 3] = 'x'
+
+    def test_func_init(self):
+        grid = TypedDenseGrid(3, 4, 'l', func=lambda loc: loc[0] * 10 + loc[1])
+        self.assertEqual(
+            [list(row) for row in grid.rows()],
+            [[0, 1, 2, 3], [10, 11, 12, 13], [20, 21, 22, 23]])
+
+    def test_memoryview(self):
+        view = self.grid.memoryview()
+        self.assertEqual(view.shape, (self.num_rows, self.num_columns))
+        view[1, 2] = 9
+        self.assertEqual(self.grid[1, 2], 9)
+
+    def test_empty_memoryview(self):
+        for dimensions in ((0, 3), (3, 0), (0, 0)):
+            view = TypedDenseGrid(*dimensions, 'd').memoryview()
+            self.assertEqual((view.shape, view.format, view.tolist()), ((0,), 'd', []))
+            self.assertTrue(view.readonly)
+
+    def test_row_view(self):
+        self.grid[4, 6] = 3
+        view = self.grid.row_view(4)
+        self.assertEqual(view.tolist(), [0, 0, 0, 0, 0, 0, 3])
+        view[0] = 5
+        self.assertEqual(self.grid[4, 0], 5)
+        with self.assertRaises(IndexError):
+            self.grid.row_view(self.num_rows)
+
 class TestSparseGrid(TestGenericConcreteGrid, TestCase):
     grid_type = SparseGrid
 
+class TestGridViews:
+    '''
+    Test views for each grid type. The parent is a 3x4 grid where each cell
+    is row * 10 + column.
+    '''
+    def setUp(self):
+        self.grid = self.make_grid(3, 4, lambda loc: loc[0] * 10 + loc[1])
+
+    def assertCells(self, grid, expected):
+        self.assertEqual([list(row) for row in grid.rows()], expected)
+        self.assertEqual(
+            [list(column) for column in grid.columns()],
+            [list(column) for column in zip(*expected)])
+        for (r, c), cell in grid.cells():
+            self.assertEqual(cell, expected[r][c])
+
+    def test_subgrid(self):
+        view = self.grid.view(1, 1, 2, 2)
+        self.assertEqual(view.dimensions, (2, 2))
+        self.assertCells(view, [[11, 12], [21, 22]])
+
+    def test_subgrid_bounds(self):
+        view = self.grid.view(1, 1, 2, 2)
+        with self.assertRaises(IndexError):
+            view[2, 0]
+        with self.assertRaises(IndexError):
+            view[0, -1]
+        with self.assertRaises(IndexError):
+            self.grid.view(2, 0, 2, 1)
+
+    def test_write_through(self):
+        view = self.grid.view(1, 2, 2, 2)
+        view[1, 1] = 99
+        self.assertEqual(self.grid[2, 3], 99)
+
+    def test_transposed(self):
+        self.assertCells(self.grid.transposed(), [
+            [0, 10, 20], [1, 11, 21], [2, 12, 22], [3, 13, 23]])
+
+    def test_rotated(self):
+        self.assertCells(self.grid.rotated(), [
+            [20, 10, 0], [21, 11, 1], [22, 12, 2], [23, 13, 3]])
+        self.assertCells(self.grid.rotated(2), [
+            [23, 22, 21, 20], [13, 12, 11, 10], [3, 2, 1, 0]])
+        self.assertCells(self.grid.rotated(-1), [
+            [3, 13, 23], [2, 12, 22], [1, 11, 21], [0, 10, 20]])
+        self.assertCells(self.grid.rotated(4), [
+            [0, 1, 2, 3], [10, 11, 12, 13], [20, 21, 22, 23]])
+
+    def test_flipped(self):
+        self.assertCells(self.grid.flipped_vertically(), [
+            [20, 21, 22, 23], [10, 11, 12, 13], [0, 1, 2, 3]])
+        self.assertCells(self.grid.flipped_horizontally(), [
+            [3, 2, 1, 0], [13, 12, 11, 10], [23, 22, 21, 20]])
+
+    def test_view_of_view(self):
+        view = self.grid.rotated().view(1, 0, 2, 2).flipped_horizontally()
+        self.assertCells(view, [[11, 21], [12, 22]])
+        view[0, 0] = -1
+        self.assertEqual(self.grid[1, 1], -1)
+
+    def test_empty_view(self):
+        view = self.grid.view(3, 4, 0, 0)
+        self.assertEqual(list(view.rows()), [])
+        self.assertEqual(list(self.grid.view(0, 0, 2, 0).row(1)), [])
+
+
+class TestDenseGridViews(TestGridViews, TestCase):
+    def make_grid(self, num_rows, num_columns, func):
+        return DenseGrid(num_rows, num_columns, func=func)
+
+
+class TestTypedDenseGridViews(TestGridViews, TestCase):
+    def make_grid(self, num_rows, num_columns, func):
+        return TypedDenseGrid(num_rows, num_columns, 'l', func=func)
+
+
+class TestSparseGridViews(TestGridViews, TestCase):
+    def make_grid(self, num_rows, num_columns, func):
+        grid = SparseGrid(num_rows, num_columns)
+        for location in grid.locations():
+            grid[location] = func(location)
+        return grid
+
+
+@skipIf(numpy is None, 'numpy is not installed')
+class TestNumpyGridViews(TestGridViews, TestCase):
+    def make_grid(self, num_rows, num_columns, func):
+        return NumpyGrid(num_rows, num_columns, func=func)
+
+    def test_views_are_numpy_grids(self):
+        view = self.grid.rotated().view(0, 1, 2, 2)
+        self.assertIsInstance(view, NumpyGrid)
+        self.assertEqual(view.sum(), 10 + 11 + 0 + 1)
+
+
+class TestBulkAccess:
+    '''
+    Test the batched and region access methods for each grid type. The grid
+    is 4x5 and filled with 0.
+    '''
+    def setUp(self):
+        self.grid = self.make_grid(4, 5)
+
+    def assertRows(self, expected):
+        self.assertEqual([list(row) for row in self.grid.rows()], expected)
+
+    def test_get_set_many(self):
+        self.grid.set_many([((0, 0), 1), ((3, 4), 2), ((2, 1), 3)])
+        self.assertEqual(self.grid.get_many([(3, 4), (2, 1), (1, 1)]), [2, 3, 0])
+        self.assertEqual(self.grid.get_many([]), [])
+
+    def test_many_bounds_check(self):
+        with self.assertRaises(IndexError):
+            self.grid.get_many([(0, 0), (4, 0)])
+        with self.assertRaises(IndexError):
+            self.grid.set_many([((0, 0), 1), ((0, -1), 1)])
+        with self.assertRaises(TypeError):
+            self.grid.get_many([(0, 0), (0, 1.5)])
+        with self.assertRaises(TypeError):
+            self.grid.get_many([(0, 0), (0, 1, 2)])
+
+        # Nothing is written if any location is invalid
+        self.assertEqual(self.grid[0, 0], 0)
+
+    def test_fill_rect(self):
+        self.grid.fill_rect(1, 1, 2, 3, 7)
+        self.assertRows([
+            [0, 0, 0, 0, 0],
+            [0, 7, 7, 7, 0],
+            [0, 7, 7, 7, 0],
+            [0, 0, 0, 0, 0]])
+        self.grid.fill_rect(2, 2, 2, 3, 0)
+        self.assertRows([
+            [0, 0, 0, 0, 0],
+            [0, 7, 7, 7, 0],
+            [0, 7, 0, 0, 0],
+            [0, 0, 0, 0, 0]])
+
+        with self.assertRaises(IndexError):
+            self.grid.fill_rect(3, 0, 2, 1, 1)
+
+    def test_set_row_column(self):
+        self.grid.set_row(1, range(5))
+        self.grid.set_column(4, [9, 9, 9, 9])
+        self.assertRows([
+            [0, 0, 0, 0, 9],
+            [0, 1, 2, 3, 9],
+            [0, 0, 0, 0, 9],
+            [0, 0, 0, 0, 9]])
+
+        with self.assertRaises(IndexError):
+            self.grid.set_row(4, range(5))
+        with self.assertRaises(ValueError):
+            self.grid.set_row(0, range(4))
+        with self.assertRaises(ValueError):
+            self.grid.set_column(0, range(5))
+
+    def test_copy_rect(self):
+        source = DenseGrid(2, 2, content=[1, 2, 3, 4])
+        self.grid.copy_rect(source, 1, 3)
+        self.grid.copy_rect(source, 0, 0, 1, 0, 1, 2)
+        self.assertRows([
+            [3, 4, 0, 0, 0],
+            [0, 0, 0, 1, 2],
+            [0, 0, 0, 3, 4],
+            [0, 0, 0, 0, 0]])
+
+        with self.assertRaises(IndexError):
+            self.grid.copy_rect(source, 3, 3)
+        with self.assertRaises(IndexError):
+            self.grid.copy_rect(source, 0, 0, 1, 1, 2, 1)
+
+    def test_copy_rect_overlapping(self):
+        self.grid.set_row(0, range(5))
+        self.grid.set_row(1, range(10, 15))
+        self.grid.copy_rect(self.grid, 1, 1, 0, 0, 2, 4)
+        self.assertRows([
+            [0, 1, 2, 3, 4],
+            [10, 0, 1, 2, 3],
+            [0, 10, 11, 12, 13],
+            [0, 0, 0, 0, 0]])
+
+        self.grid.copy_rect(self.grid, 0, 0, 1, 1, 2, 4)
+        self.assertRows([
+            [0, 1, 2, 3, 4],
+            [10, 11, 12, 13, 3],
+            [0, 10, 11, 12, 13],
+            [0, 0, 0, 0, 0]])
+
+    def test_copy_rect_between_types(self):
+        source = SparseGrid(2, 2, fill=0)
+        source[1, 1] = 5
+        self.grid.fill_rect(0, 0, 2, 2, 1)
+        self.grid.copy_rect(source, 0, 0)
+        self.assertEqual(self.grid.get_many([(0, 0), (1, 1)]), [0, 5])
+
+    def test_flat_indexes(self):
+        self.assertEqual(self.grid.index((2, 3)), 13)
+        self.assertEqual(self.grid.location(13), (2, 3))
+        self.grid.set_flat(13, 4)
+        self.assertEqual(self.grid[2, 3], 4)
+        self.assertEqual(self.grid.get_flat(13), 4)
+
+        cells = list(self.grid.cells_flat())
+        self.assertEqual(len(cells), 20)
+        self.assertEqual(cells[13], (13, 4))
+        self.assertEqual(cells[0], (0, 0))
+
+        for index in (-1, 20):
+            with self.assertRaises(IndexError):
+                self.grid.get_flat(index)
+            with self.assertRaises(IndexError):
+                self.grid.location(index)
+        with self.assertRaises(TypeError):
+            self.grid.set_flat(1.0, 1)
+        with self.assertRaises(IndexError):
+            self.grid.index((4, 0))
+
+    def test_flat_neighbors(self):
+        self.assertEqual(self.grid.flat_offsets(), (-5, -1, 1, 5))
+        self.assertEqual(self.grid.neighbor_indices(0), [1, 5])
+        with self.assertRaises(IndexError):
+            self.grid.neighbor_indices(20)
+
+
+class TestDenseGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return DenseGrid(num_rows, num_columns, fill=0)
+
+
+class TestTypedDenseGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return TypedDenseGrid(num_rows, num_columns, 'l')
+
+    def test_copy_rect_from_list(self):
+        self.grid.copy_rect(DenseGrid(1, 2, content=[3, 4]), 0, 0)
+        self.assertEqual(list(self.grid.row(0)), [3, 4, 0, 0, 0])
+
+
+class TestSparseGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return SparseGrid(num_rows, num_columns, fill=0)
+
+    def test_no_fill_stored(self):
+        self.grid.fill_rect(0, 0, 4, 5, 1)
+        self.grid.fill_rect(1, 1, 3, 4, 0)
+        self.grid.set_row(0, [0, 0, 1, 1, 1])
+        self.assertEqual(len(self.grid.content), 6)
+
+
+class TestViewBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return SparseGrid(num_rows + 2, num_columns + 2, fill=0).view(
+            1, 1, num_rows, num_columns)
+
+
+@skipIf(numpy is None, 'numpy is not installed')
+class TestNumpyGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return NumpyGrid(num_rows, num_columns, dtype=int)
+
+
+@skipIf(numpy is None, 'numpy is not installed')
+class TestNumpyGrid(TestGenericGrid, TestCase):
+    def setUp(self):
+        self.grid = NumpyGrid(self.num_rows, self.num_columns, dtype=int)
+
+    def test_get_set(self):
+        self.grid[1, 2] = 5
+        self.assertEqual(self.grid[1, 2], 5)
+        self.assertEqual(list(self.grid.row(1)), [0, 0, 5, 0, 0, 0, 0])
+        self.assertEqual(list(self.grid.column(2)), [0, 5, 0, 0, 0])
+
+    def test_func_init(self):
+        grid = NumpyGrid(3, 4, func=lambda loc: loc[0] + loc[1])
+        for (r, c), cell in grid.cells():
+            self.assertEqual(cell, r + c)
+
+    def test_fill_rect(self):
+        self.grid.fill(3, rect=(1, 2, 2, 3))
+        self.assertEqual(self.grid.sum(), 18)
+        self.assertEqual(self.grid.count(3), 6)
+        self.assertEqual(self.grid.max(rect=(0, 0, 1, 7)), 0)
+        self.assertEqual(self.grid.mean(rect=(1, 2, 2, 3)), 3)
+
+    def test_rect_bounds_check(self):
+        with self.assertRaises(IndexError):
+            self.grid.fill(1, rect=(4, 0, 2, 1))
+        with self.assertRaises(IndexError):
+            self.grid.sum(rect=(0, -1, 1, 1))
+
+    def test_apply_and_map(self):
+        self.grid.fill(2)
+        self.grid.apply(lambda region: region * 5, rect=(0, 0, 1, 7))
+        self.assertEqual(list(self.grid.row(0)), [10] * 7)
+        self.assertEqual(list(self.grid.row(1)), [2] * 7)
+
+        squared = self.grid.map(lambda region: region ** 2, rect=(0, 0, 2, 2))
+        self.assertEqual(squared.dimensions, (2, 2))
+        self.assertEqual(list(squared.column(0)), [100, 4])
+        self.assertEqual(self.grid[0, 0], 10)
+
+    def test_masked_assign(self):
+        self.grid.fill(1, rect=(0, 0, 2, 7))
+        self.grid.assign(self.grid.eq(1), 9)
+        self.assertEqual(self.grid.count(9), 14)
+        self.assertEqual(self.grid.count(0), 21)
+
+        self.grid.assign(self.grid.gt(5, rect=(1, 0, 2, 7)), -1, rect=(1, 0, 2, 7))
+        self.assertEqual(list(self.grid.column(0)), [9, -1, 0, 0, 0])
+
+    def test_compare_grids(self):
+        other = NumpyGrid(self.num_rows, self.num_columns, fill=0)
+        other[2, 3] = 4
+        self.grid[2, 3] = 4
+        self.grid[1, 1] = 2
+        self.assertEqual(self.grid.ne(other).sum(), 1)
+        self.assertEqual(
+            self.grid.eq(other, rect=(1, 1, 2, 3)).tolist(),
+            [[False, True, True], [True, True, True]])
+        with self.assertRaises(ValueError):
+            self.grid.eq(NumpyGrid(2, 3), rect=(0, 0, 2, 3))
+
+    def test_from_numpy_shares_memory(self):
+        array = numpy.zeros((2, 3))
+        grid = NumpyGrid.from_numpy(array)
+        grid[1, 1] = 4
+        self.assertEqual(array[1, 1], 4)
+        self.assertIs(grid.to_numpy(), array)
+
+
+@skipIf(numpy is None, 'numpy is not installed')
+class TestNumpyInterop(TestCase):
+    def test_dense(self):
+        grid = DenseGrid(2, 3, func=lambda loc: loc[0] * 3 + loc[1])
+        array = grid.to_numpy()
+        self.assertEqual(array.tolist(), [[0, 1, 2], [3, 4, 5]])
+        self.assertEqual(DenseGrid.from_numpy(array).content, grid.content)
+
+    def test_typed_dense_shares_memory(self):
+        grid = TypedDenseGrid(2, 3, 'd')
+        array = grid.to_numpy()
+        array[1, 2] = 2.5
+        self.assertEqual(grid[1, 2], 2.5)
+
+        copy = TypedDenseGrid.from_numpy(array)
+        self.assertEqual(copy.typecode, 'd')
+        self.assertEqual(list(copy.row(1)), [0, 0, 2.5])
+
+    def test_typed_dense_typecodes(self):
+        array = numpy.array([[True, False]])
+        with self.assertRaises(ValueError):
+            TypedDenseGrid.from_numpy(array)
+        self.assertEqual(list(TypedDenseGrid.from_numpy(array, 'b').row(0)), [1, 0])
+
+        # Non-contiguous arrays are copied in row-major order
+        copy = TypedDenseGrid.from_numpy(numpy.arange(6, dtype='q').reshape(2, 3).T)
+        self.assertEqual(list(copy.content), [0, 3, 1, 4, 2, 5])
+        self.assertEqual(TypedDenseGrid.from_numpy(numpy.zeros((0, 4), 'f')).dimensions, (0, 4))
+
+    def test_sparse(self):
+        grid = SparseGrid(3, 3, fill=0)
+        grid[1, 2] = 7
+        array = grid.to_numpy()
+        self.assertEqual(array.tolist(), [[0, 0, 0], [0, 0, 7], [0, 0, 0]])
+
+        copy = SparseGrid.from_numpy(array, fill=0)
+        self.assertEqual(copy.content, {(1, 2): 7})
+
+
+class TestChunkedGrid(TestGenericConcreteGrid, TestCase):
+    @staticmethod
+    def grid_type(num_rows, num_columns):
+        return ChunkedGrid(num_rows, num_columns, chunk_size=2)
+
+    def test_allocation(self):
+        self.assertEqual(self.grid.num_chunks, 0)
+        self.grid[4, 6] = 1
+        self.grid[4, 5] = 2
+        self.assertEqual(self.grid.num_chunks, 2)
+        self.assertEqual(self.grid.chunk_at((4, 6)).dimensions, (1, 1))
+
+        self.grid[4, 6] = None
+        self.assertEqual(self.grid.num_chunks, 1)
+        self.assertIsNone(self.grid.chunk_at((4, 6)))
+        self.grid[4, 5] = None
+        self.assertEqual(self.grid.num_chunks, 0)
+
+    def test_chunks(self):
+        self.grid[3, 3] = 1
+        self.grid[0, 6] = 2
+        chunks = list(self.grid.chunks())
+        self.assertEqual([location for location, chunk in chunks], [(0, 6), (2, 2)])
+        self.assertEqual(list(chunks[1][1].row(1)), [None, 1])
+
+    def test_fill_rect(self):
+        self.grid.fill_rect(1, 1, 4, 5, 3)
+        self.assertEqual(self.grid.num_chunks, 9)
+        self.assertEqual(self.grid.chunk_at((2, 2)).content, [3] * 4)
+
+        self.grid.fill_rect(0, 0, 5, 6, None)
+        self.assertEqual(self.grid.num_chunks, 0)
+
+    def test_typed(self):
+        grid = ChunkedGrid(100, 100, chunk_size=16, typecode='d')
+        grid[50, 50] = 1.5
+        self.assertEqual(grid[50, 50], 1.5)
+        self.assertEqual(grid[0, 0], 0)
+        self.assertEqual(grid.chunk_at((50, 50)).typecode, 'd')
+        self.assertEqual(sum(grid.row(50)), 1.5)
+
+    def test_typed_failed_set(self):
+        grid = ChunkedGrid(10, 10, chunk_size=4, typecode='b')
+        for value in ('x', 1000):
+            with self.assertRaises((TypeError, OverflowError)):
+                grid[5, 5] = value
+        with self.assertRaises(TypeError):
+            grid.fill_rect(0, 0, 4, 4, 'x')
+        self.assertEqual(grid.num_chunks, 0)
+
+
+class TestChunkedGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return ChunkedGrid(num_rows, num_columns, chunk_size=2, typecode='l')
+
+
+class TestChunkedGridViews(TestGridViews, TestCase):
+    def make_grid(self, num_rows, num_columns, func):
+        grid = ChunkedGrid(num_rows, num_columns, chunk_size=3, fill=0)
+        grid.set_many((location, func(location)) for location in grid.locations())
+        return grid
+
+
+class TestFunctionGrid(TestGenericConcreteGrid, TestCase):
+    @staticmethod
+    def grid_type(num_rows, num_columns):
+        return FunctionGrid(num_rows, num_columns, lambda location: None, max_cells=3)
+
+    def make_counting(self, **kwargs):
+        calls = []
+
+        def func(location):
+            calls.append(location)
+            return location[0] * 10 + location[1]
+
+        return FunctionGrid(10, 10, func, **kwargs), calls
+
+    def test_lazy(self):
+        grid, calls = self.make_counting()
+        self.assertEqual(calls, [])
+        self.assertEqual(grid[3, 4], 34)
+        self.assertEqual(grid[3, 4], 34)
+        self.assertEqual(calls, [(3, 4)])
+        self.assertEqual((grid.hits, grid.misses), (1, 1))
+        self.assertTrue(grid.cached((3, 4)))
+        self.assertFalse(grid.cached((4, 3)))
+
+    def test_lru(self):
+        grid, calls = self.make_counting(max_cells=2)
+        grid[0, 0], grid[0, 1], grid[0, 0], grid[0, 2]
+        self.assertEqual(grid.num_cached, 2)
+        self.assertEqual(grid.evictions, 1)
+        self.assertTrue(grid.cached((0, 0)))
+        self.assertFalse(grid.cached((0, 1)))
+        self.assertEqual(grid[0, 1], 1)
+        self.assertEqual(len(calls), 4)
+
+    def test_tile_policy(self):
+        grid, calls = self.make_counting(max_cells=3, policy='tile', tile_size=2)
+        grid[0, 0], grid[1, 1], grid[0, 2], grid[4, 4]
+        # The first tile was least recently used, so it was evicted whole
+        self.assertFalse(grid.cached((0, 0)))
+        self.assertFalse(grid.cached((1, 1)))
+        self.assertTrue(grid.cached((0, 2)))
+        self.assertEqual(grid.num_cached, 2)
+        self.assertEqual(grid.evictions, 2)
+
+    def test_prefetch(self):
+        for policy in ('lru', 'tile'):
+            grid, calls = self.make_counting(policy=policy, tile_size=4, prefetch=True)
+            self.assertEqual(grid[9, 9], 99)
+            # The bottom-right tile is clipped to 2x2
+            self.assertEqual(len(calls), 4)
+            self.assertEqual(grid[8, 8], 88)
+            self.assertEqual(grid[1, 2], 12)
+            self.assertEqual(len(calls), 20)
+            self.assertEqual(grid.num_cached, 20)
+
+    def test_prefetch_larger_than_cache(self):
+        # A 4x4 tile can't fit in 10 cells, so only the cell read is computed
+        grid, calls = self.make_counting(max_cells=10, tile_size=4, prefetch=True)
+        self.assertEqual(grid[1, 1], 11)
+        self.assertEqual(calls, [(1, 1)])
+        self.assertTrue(grid.cached((1, 1)))
+        self.assertEqual(grid.evictions, 0)
+
+    def test_writes(self):
+        grid, calls = self.make_counting(max_cells=1)
+        grid[2, 2] = 'x'
+        for location in grid.locations():
+            grid[location]
+        self.assertEqual(grid[2, 2], 'x')
+        self.assertNotIn((2, 2), calls)
+
+    def test_write_replaces_cached_value(self):
+        for policy in ('lru', 'tile'):
+            grid, calls = self.make_counting(policy=policy, tile_size=2)
+            grid[3, 3], grid[3, 2]
+            grid[3, 3] = 'x'
+            self.assertEqual(grid.num_cached, 1)
+            grid.invalidate((3, 3))
+            self.assertEqual(grid[3, 3], 33)
+            self.assertEqual(grid.num_cached, 2)
+
+    def test_invalidate(self):
+        for policy in ('lru', 'tile'):
+            grid, calls = self.make_counting(policy=policy, tile_size=3)
+            for row in grid.rows():
+                list(row)
+            grid[5, 5] = 'x'
+            self.assertEqual(len(calls), 100)
+
+            grid.invalidate((0, 0))
+            grid.invalidate_rect(4, 4, 3, 3)
+            self.assertEqual(grid.num_cached, 90)
+            self.assertEqual(grid[5, 5], 55)
+            self.assertEqual(grid[0, 0], 0)
+            self.assertEqual(len(calls), 102)
+
+            grid.clear_cache()
+            self.assertEqual(grid.num_cached, 0)
+            with self.assertRaises(IndexError):
+                grid.invalidate_rect(8, 8, 3, 1)
+
+    def test_invalidate_sparse_cache(self):
+        # With only a few cells cached, the cache is scanned instead of the
+        # rectangle; the result is the same
+        for policy in ('lru', 'tile'):
+            grid, calls = self.make_counting(policy=policy, tile_size=3)
+            grid[0, 0], grid[4, 5], grid[5, 4], grid[9, 9]
+            grid[4, 4] = 'x'
+            grid.invalidate_rect(1, 1, 8, 8)
+            self.assertEqual(grid.num_cached, 2)
+            self.assertTrue(grid.cached((0, 0)))
+            self.assertTrue(grid.cached((9, 9)))
+            self.assertFalse(grid.cached((4, 5)))
+            self.assertEqual(grid[4, 4], 44)
+
+    def test_failed_compute(self):
+        def func(location):
+            if location == (1, 1):
+                raise KeyError(location)
+            return 0
+
+        for prefetch in (False, True):
+            grid = FunctionGrid(4, 4, func, policy='tile', tile_size=2, prefetch=prefetch)
+            with self.assertRaises(KeyError):
+                grid[1, 1]
+            self.assertEqual((grid.num_cached, len(grid._cache)), (0, 0))
+            self.assertEqual(grid[2, 2], 0)
+
+    def test_arguments(self):
+        with self.assertRaises(ValueError):
+            FunctionGrid(2, 2, str, policy='fifo')
+        with self.assertRaises(ValueError):
+            FunctionGrid(2, 2, str, max_cells=0)
+
+
+class TestFunctionGridBulkAccess(TestBulkAccess, TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return FunctionGrid(
+            num_rows, num_columns, lambda location: 0,
+            max_cells=4, policy='tile', tile_size=2, prefetch=True)
+
+
+class TestBitGrid(TestGenericGrid, TestCase):
+    def setUp(self):
+        self.grid = BitGrid(self.num_rows, self.num_columns)
+
+    def make(self, rows):
+        return BitGrid.from_grid(
+            DenseGrid(len(rows), len(rows[0]), func=lambda loc: rows[loc[0]][loc[1]]),
+            lambda cell: cell == '#')
+
+    def assertCells(self, grid, rows):
+        self.assertEqual(
+            [''.join('#' if cell else '.' for cell in row) for row in grid.rows()], rows)
+
+    def test_get_set(self):
+        self.assertFalse(self.grid[2, 3])
+        self.grid[2, 3] = 1
+        self.assertIs(self.grid[2, 3], True)
+        self.assertEqual(self.grid.bits[2], 1 << 3)
+        self.grid[2, 3] = False
+        self.assertEqual(self.grid.bits, [0] * 5)
+        self.assertEqual(BitGrid(2, 3, fill=True).count(), 6)
+
+    def test_no_columns(self):
+        grid = BitGrid(3, 0, fill=True)
+        self.assertEqual([list(row) for row in grid.rows()], [[], [], []])
+        self.assertEqual(list(grid.cells()), [])
+        self.assertEqual(BitGrid.from_grid(grid).bits, [0, 0, 0])
+
+    def test_wide_rows(self):
+        values = [column % 3 == 0 for column in range(5000)]
+        grid = BitGrid(2, 5000)
+        grid.set_row(1, values)
+        self.assertEqual(list(grid.row(1)), values)
+        self.assertEqual(BitGrid.from_grid(grid).bits, grid.bits)
+
+    def test_rows_and_columns(self):
+        grid = self.make(['#..', '.##'])
+        self.assertCells(grid, ['#..', '.##'])
+        self.assertEqual(list(grid.column(1)), [False, True])
+        self.assertEqual(list(grid.true_locations()), [(0, 0), (1, 1), (1, 2)])
+
+    def test_bulk_writes(self):
+        self.grid.fill_rect(1, 2, 2, 3, True)
+        self.assertEqual(self.grid.count_rect(0, 0, 5, 7), 6)
+        self.assertEqual(self.grid.count_rect(1, 3, 1, 4), 2)
+        self.grid.fill_rect(1, 3, 1, 1, False)
+        self.assertEqual(self.grid.count(), 5)
+        self.grid.set_row(4, [1, 0, 1, 0, 1, 0, 1])
+        self.assertEqual(self.grid.bits[4], 0b1010101)
+
+        source = self.make(['##', '.#'])
+        self.grid.copy_rect(source, 3, 5)
+        self.assertCells(self.grid, [
+            '.......',
+            '..#.#..',
+            '..###..',
+            '.....##',
+            '#.#.#.#',
+        ])
+        with self.assertRaises(IndexError):
+            self.grid.count_rect(0, 0, 6, 1)
+
+    def test_find(self):
+        grid = self.make(['..#.#', '#####'])
+        self.assertEqual(grid.find(0), 2)
+        self.assertEqual(grid.find(0, 3), 4)
+        self.assertIsNone(grid.find(0, 5))
+        self.assertEqual(grid.find(0, value=False), 0)
+        self.assertEqual(grid.find(0, 2, value=False), 3)
+        self.assertIsNone(grid.find(1, value=False))
+        with self.assertRaises(IndexError):
+            grid.find(2)
+        with self.assertRaises(IndexError):
+            grid.find(0, 6)
+
+    def test_bitwise(self):
+        a = self.make(['##..', '#.#.'])
+        b = self.make(['#.#.', '.##.'])
+        self.assertCells(a & b, ['#...', '..#.'])
+        self.assertCells(a | b, ['###.', '###.'])
+        self.assertCells(a ^ b, ['.##.', '##..'])
+        self.assertCells(~a, ['..##', '.#.#'])
+
+        a &= b
+        self.assertCells(a, ['#...', '..#.'])
+        with self.assertRaises(ValueError):
+            a | BitGrid(2, 3)
+        with self.assertRaises(TypeError):
+            a | DenseGrid(2, 4)
+
+    def test_rect_operations(self):
+        grid = self.make(['....', '.##.', '....'])
+        source = self.make(['##', '#.'])
+        grid.combine_rect('xor', source, 1, 2)
+        self.assertCells(grid, ['....', '.#.#', '..#.'])
+        grid.combine_rect('or', source, 0, 0, 1, 0, 1, 2)
+        self.assertCells(grid, ['#...', '.#.#', '..#.'])
+        grid.invert_rect(0, 1, 3, 2)
+        self.assertCells(grid, ['###.', '..##', '.#..'])
+        with self.assertRaises(ValueError):
+            grid.combine_rect('nand', source, 0, 0)
+        with self.assertRaises(IndexError):
+            grid.combine_rect('or', source, 2, 0)
+
+    def test_shifts(self):
+        grid = self.make(['#..', '.#.', '..#'])
+        self.assertCells(grid.shifted(1, 0), ['...', '#..', '.#.'])
+        self.assertCells(grid.shifted(0, -1), ['...', '#..', '.#.'])
+        self.assertCells(grid.shifted(-1, 1), ['..#', '...', '...'])
+        self.assertCells(grid.shifted(5, 0), ['...', '...', '...'])
+
+    def test_morphology(self):
+        grid = self.make(['.....', '.....', '..#..', '.....'])
+        dilated = grid.dilated()
+        self.assertCells(dilated, ['.....', '..#..', '.###.', '..#..'])
+        self.assertCells(dilated.eroded(), ['.....', '.....', '..#..', '.....'])
+        self.assertEqual(grid.dilated(SURROUNDING).count(), 9)
+
+    def test_observers(self):
+        from gridly.tracking import ChangeTracker
+        grid = self.make(['....', '....'])
+        with ChangeTracker(grid) as tracker:
+            grid.invert_rect(0, 1, 1, 2)
+            grid |= self.make(['...#', '....'])
+            self.assertTrue(tracker.dirty)
+            self.assertEqual(tracker.drain().rows, [0, 1])
+
+    def test_composite(self):
+        mask = self.make(['#.', '.#'])
+        composite = CompositeGrid(DenseGrid(2, 2, fill=0), mask)
+        composite[0, 1] = (5, True)
+        self.assertEqual(composite.where([(1, '==', True)]), [(0, 0), (0, 1), (1, 1)])
+
+
+class TestMappedGrid(TestGenericGrid, TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'grid')
+        self.grid = MappedGrid.create(self.path, self.num_rows, self.num_columns, 'd')
+        self.addCleanup(self.grid.close)
+
+    def test_persistence(self):
+        self.grid[2, 3] = 1.5
+        self.grid.set_row(4, range(7))
+        self.grid.close()
+
+        with MappedGrid(self.path) as grid:
+            self.assertEqual(grid.dimensions, (self.num_rows, self.num_columns))
+            self.assertEqual(grid.typecode, 'd')
+            self.assertEqual(grid[2, 3], 1.5)
+            self.assertEqual(list(grid.row(4)), list(range(7)))
+            self.assertEqual(list(grid.column(3)), [0, 0, 1.5, 0, 3])
+
+    def test_fill(self):
+        path = self.path + '2'
+        with MappedGrid.create(path, 3, 2, 'l', fill=-1) as grid:
+            self.assertEqual(list(grid.row(2)), [-1, -1])
+            self.assertEqual(os.path.getsize(path), 32 + 6 * grid.content.itemsize)
+
+    def test_readonly(self):
+        self.grid[0, 0] = 2
+        self.grid.flush()
+        with MappedGrid(self.path, readonly=True) as grid:
+            self.assertEqual(grid[0, 0], 2)
+            with self.assertRaises(TypeError):
+                grid[0, 0] = 3
+
+    def test_row_view(self):
+        view = self.grid.row_view(1)
+        view[6] = 4
+        self.assertEqual(self.grid[1, 6], 4)
+        view.release()
+
+    def test_bulk_access(self):
+        self.grid.fill_rect(1, 1, 2, 2, 5)
+        self.grid.copy_rect(TypedDenseGrid(1, 2, 'd', fill=7), 4, 5)
+        self.assertEqual(list(self.grid.row(2)), [0, 5, 5, 0, 0, 0, 0])
+        self.assertEqual(list(self.grid.row(4)), [0, 0, 0, 0, 0, 7, 7])
+
+    def test_close_with_live_iterators(self):
+        row = self.grid.row(1)
+        column = self.grid.column(1)
+        rows = self.grid.rows()
+        next(rows)
+        self.grid.close()
+        self.assertEqual(list(row), [0] * self.num_columns)
+        self.assertEqual(list(column), [0] * self.num_rows)
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_from_numpy(self):
+        array = numpy.arange(6, dtype='i').reshape(2, 3)
+        with MappedGrid.from_numpy(array, path=self.path + '2') as grid:
+            self.assertEqual(grid.typecode, 'i')
+            self.assertEqual(list(grid.row(1)), [3, 4, 5])
+        with MappedGrid(self.path + '2') as grid:
+            self.assertEqual(list(grid.column(2)), [2, 5])
+        with self.assertRaises(TypeError):
+            MappedGrid.from_numpy(array)
+
+    def test_not_a_grid(self):
+        with open(self.path + '2', 'wb') as file:
+            file.write(b'x' * 64)
+        with self.assertRaises(ValueError):
+            MappedGrid(self.path + '2')
+
+
+class TestSparseGridIndexes(TestCase):
+    def setUp(self):
+        self.grid = SparseGrid(100000, 100000, fill=0)
+        self.stored = {(5, 7): 1, (5, 2): 2, (99999, 0): 3, (40, 7): 4}
+        self.grid.set_many(self.stored.items())
+
+    def test_occupied(self):
+        self.assertEqual(list(self.grid.occupied()), [
+            ((5, 2), 2), ((5, 7), 1), ((40, 7), 4), ((99999, 0), 3)])
+
+    def test_occupied_in_row(self):
+        self.assertEqual(list(self.grid.occupied_in_row(5)), [((5, 2), 2), ((5, 7), 1)])
+        self.assertEqual(list(self.grid.occupied_in_row(6)), [])
+        with self.assertRaises(IndexError):
+            self.grid.occupied_in_row(100000)
+
+    def test_occupied_in_column(self):
+        self.assertEqual(list(self.grid.occupied_in_column(7)), [((5, 7), 1), ((40, 7), 4)])
+        with self.assertRaises(IndexError):
+            self.grid.occupied_in_column(-1)
+
+    def test_occupied_in_rect(self):
+        self.assertEqual(
+            list(self.grid.occupied_in_rect(0, 3, 50, 10)), [((5, 7), 1), ((40, 7), 4)])
+        self.assertEqual(
+            list(self.grid.occupied_in_rect(5, 0, 2, 3)), [((5, 2), 2)])
+        self.assertEqual(
+            list(self.grid.occupied_in_rect(0, 0, 100000, 100000)),
+            list(self.grid.occupied()))
+        with self.assertRaises(IndexError):
+            self.grid.occupied_in_rect(99999, 0, 2, 1)
+
+    def test_clearing_updates_indexes(self):
+        self.grid[5, 7] = 0
+        self.grid.fill_rect(0, 0, 41, 100000, 0)
+        self.assertEqual(list(self.grid.occupied()), [((99999, 0), 3)])
+        self.assertEqual(self.grid._rows, {99999: {0}})
+        self.assertEqual(self.grid._columns, {0: {99999}})
+
+    def test_content_writes_update_indexes(self):
+        content = self.grid.content
+        content[5, 3] = 6
+        del content[5, 7]
+        content.pop((40, 7))
+        self.assertEqual(self.grid[5, 3], 6)
+        self.assertEqual(list(self.grid.occupied_in_row(5)), [((5, 2), 2), ((5, 3), 6)])
+        self.assertEqual(list(self.grid.occupied_in_column(7)), [])
+        with self.assertRaises(KeyError):
+            del content[5, 7]
+
+        self.grid.content = {(1, 1): 9}
+        self.assertEqual(content, {(1, 1): 9})
+        self.assertEqual(list(self.grid.occupied()), [((1, 1), 9)])
+        self.assertEqual(self.grid._rows, {1: {1}})
+
+    def test_iteration(self):
+        grid = SparseGrid(3, 4, fill=0)
+        grid[1, 2] = 5
+        grid[1, 3] = 6
+        self.assertEqual(
+            [list(row) for row in grid.rows()],
+            [[0, 0, 0, 0], [0, 0, 5, 6], [0, 0, 0, 0]])
+        self.assertEqual(list(grid.column(2)), [0, 5, 0])
+        self.assertEqual(list(grid.cells())[4:8], [
+            ((1, 0), 0), ((1, 1), 0), ((1, 2), 5), ((1, 3), 6)])
+
+
 class TestCompositeGrid(TestGenericGrid, TestCase):
     def setUp(self):
         self.grid1 = DenseGrid(self.num_rows, self.num_columns)
@@ -181,3 +1084,145 @@ class TestCompositeGrid(TestGenericGrid, TestCase):
         self.grid2 = SparseGrid(self.num_rows+1, self.num_columns+1)
         with self.assertRaises(ValueError):
             self.grid = CompositeGrid(self.grid1, self.grid2)
+
+    def test_set_many(self):
+        self.grid.set_many([((0, 0), (1, 2)), ((4, 6), (3, 4))])
+        self.assertEqual(self.grid.get_all((0, 0)), (1, 2))
+        self.assertEqual(self.grid2[4, 6], 4)
+
+    def test_fill_rect(self):
+        self.grid.fill_rect(1, 1, 2, 3, ('a', 'b'))
+        self.assertEqual(self.grid.get_all((2, 3)), ('a', 'b'))
+        self.assertEqual(self.grid.get_all((3, 3)), (None, None))
+        self.assertEqual(self.grid.get_layer((1, 1), 1), 'b')
+        with self.assertRaises(IndexError):
+            self.grid.get_layer((self.num_rows, 0), 0)
+
+    def test_copy_rect(self):
+        source = CompositeGrid(DenseGrid(2, 2, fill=1), DenseGrid(2, 2, fill=2))
+        self.grid.copy_rect(source, 3, 5)
+        self.assertEqual(self.grid.get_all((4, 6)), (1, 2))
+        self.assertEqual(self.grid.get_all((2, 5)), (None, None))
+
+    def test_layer_iteration(self):
+        self.grid.fill_rect(1, 2, 2, 2, (7, 8))
+        self.assertIs(self.grid.layer(1), self.grid2)
+        self.assertEqual(list(self.grid.layer_row(0, 1)), [None, None, 7, 7, None, None, None])
+        self.assertEqual(list(self.grid.layer_column(1, 3)), [None, 8, 8, None, None])
+        self.assertEqual(
+            [list(row) for row in self.grid.layer_rect(1, 0, 1, 3, 3)],
+            [[None, None, None], [None, 8, 8], [None, 8, 8]])
+        with self.assertRaises(IndexError):
+            list(self.grid.layer_rect(0, 3, 0, 3, 1))
+
+    def test_where(self):
+        self.grid.fill_rect(0, 0, self.num_rows, self.num_columns, (0, 0))
+        self.grid[1, 2] = (1, 5)
+        self.grid[3, 4] = (1, 1)
+        self.grid[4, 0] = (2, 9)
+
+        conditions = [(0, '>=', 1), (1, '>', 2)]
+        self.assertEqual(self.grid.where(conditions), [(1, 2), (4, 0)])
+        self.assertEqual(self.grid.where(conditions, rect=(0, 1, 5, 6)), [(1, 2)])
+        self.assertEqual(self.grid.count_where(conditions), 2)
+        self.assertEqual(self.grid.count_where([(0, lambda cell, value: cell % 2 == value, 1)]), 2)
+        self.assertEqual(self.grid.count_where([]), self.num_rows * self.num_columns)
+
+
+class TestTypedCompositeGrid(TestCase):
+    def setUp(self):
+        self.grid = CompositeGrid(
+            TypedDenseGrid(4, 5, 'l'),
+            TypedDenseGrid(4, 5, 'd'))
+        self.grid[1, 1] = (3, 0.5)
+        self.grid[2, 4] = (3, 2.5)
+        self.grid[3, 0] = (1, 4.0)
+
+    def test_where(self):
+        self.assertEqual(self.grid.where([(0, '==', 3), (1, '>', 1)]), [(2, 4)])
+        self.assertEqual(self.grid.where([(1, '>', 0)], rect=(1, 0, 3, 2)), [(1, 1), (3, 0)])
+        self.assertEqual(self.grid.count_where([(0, '!=', 0)]), 3)
+
+    @skipIf(numpy is None, "numpy is not installed")
+    def test_numpy_layers(self):
+        grid = CompositeGrid(
+            NumpyGrid(3, 3, fill=0),
+            TypedDenseGrid(3, 3, 'b', fill=1))
+        grid[2, 2] = (5, 1)
+        grid[0, 1] = (5, 0)
+        self.assertEqual(grid.where([(0, '==', 5), (1, '==', 1)]), [(2, 2)])
+        self.assertEqual(grid.count_where([(0, '>', 0)]), 2)
+
+
+class TestInstrumentedGrid(TestGenericGrid, TestCase):
+    def setUp(self):
+        self.inner = SparseGrid(self.num_rows, self.num_columns, fill=0)
+        self.grid = InstrumentedGrid(self.inner, tile_size=4)
+
+    def test_counts(self):
+        self.grid[1, 2] = 3
+        self.assertEqual(self.grid[1, 2], 3)
+        self.grid.unsafe_get((0, 0))
+        self.grid.get_many([(0, 0), (4, 6)])
+        self.assertEqual(self.inner[1, 2], 3)
+        self.assertEqual(self.grid.calls, {'set': 1, 'get': 1, 'unsafe_get': 1, 'get_many': 1})
+        self.assertEqual((self.grid.reads, self.grid.writes), (4, 1))
+
+    def test_bounds_errors(self):
+        for location in ((5, 0), (0, -1)):
+            with self.assertRaises(IndexError):
+                self.grid[location]
+        with self.assertRaises(IndexError):
+            self.grid.set_many([((0, 0), 1), ((9, 9), 1)])
+        with self.assertRaises(IndexError):
+            self.grid.fill_rect(0, 0, 6, 1, 1)
+        self.assertEqual(self.grid.bounds_errors, 4)
+        self.assertEqual(self.grid.writes, 0)
+
+    def test_iterators(self):
+        list(self.grid.rows())
+        list(self.grid.row(2))
+        list(self.grid.cells())
+        self.assertEqual(self.grid.calls, {'rows': 1, 'row': 1, 'cells': 1})
+        self.assertEqual(self.grid.reads, 2 * 35 + 7)
+        self.assertEqual(self.grid.hottest_rows(1), [(2, 21)])
+
+    def test_heat(self):
+        self.grid.fill_rect(3, 3, 2, 2, 1)
+        self.grid[0, 6] = 1
+        self.assertEqual(list(self.grid.tile_heat), [1, 2, 1, 1])
+        self.assertEqual(self.grid.hottest_tiles(2), [((0, 1), 2), ((0, 0), 1)])
+        self.assertEqual(list(self.grid.heat_grid().content), [1, 2, 1, 1])
+
+        summary = self.grid.summary()
+        self.assertEqual(summary['calls'], {'fill_rect': 1, 'set': 1})
+        self.assertEqual(summary['writes'], 5)
+        self.assertEqual(summary['hottest_rows'][0], (3, 2))
+
+        self.grid.reset()
+        self.assertEqual(self.grid.summary()['writes'], 0)
+
+    def test_fast_paths(self):
+        grid = InstrumentedGrid(DenseGrid(2, 3, fill=0))
+        grid.copy_rect(InstrumentedGrid(DenseGrid(1, 2, fill=5)), 1, 1)
+        grid.set_row(0, [1, 2, 3])
+        self.assertEqual(grid.grid.content, [1, 2, 3, 0, 5, 5])
+        self.assertEqual(grid.calls, {'copy_rect': 1, 'set_row': 1})
+        with self.assertRaises(TypeError):
+            grid.hottest_tiles()
+
+    def test_checked_bulk_writes(self):
+        with self.assertRaises(IndexError):
+            self.grid.set_row(5, [0] * 7)
+        with self.assertRaises(ValueError):
+            self.grid.set_column(0, [1])
+        with self.assertRaises(IndexError):
+            self.grid.copy_rect(DenseGrid(2, 2, fill=1), 4, 0)
+        self.assertEqual(self.grid.bounds_errors, 2)
+        self.assertEqual(self.grid.writes, 0)
+
+        self.grid.set_column(6, range(5))
+        self.grid.unsafe_set_row(0, [1] * 7)
+        self.assertEqual(self.grid.calls, {
+            'set_row': 1, 'set_column': 2, 'copy_rect': 1, 'unsafe_set_row': 1})
+        self.assertEqual(self.grid.writes, 12)
@@ -51,3 +51,16 @@ class TestLocation(unittest.TestCase):
             for c in range(3):
                 if not (r == 1 and c == 1):
                     self.assertIn(Loc(r, c), surrounding)
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            Loc(1, 2).extra = 3
+
+    def test_arithmetic_type(self):
+        self.assertIs(type(Loc(1, 2) + (1, 1)), Loc)
+        self.assertIs(type(Loc(1, 2) + Dir.up), Loc)
+        self.assertIs(type(Dir.up * 3), Loc)
+        self.assertEqual(Loc.zero(), (0, 0))
+
+    def test_tuple_concatenation(self):
+        self.assertEqual((1, 0) + Loc(1, 2), (1, 0, 1, 2))
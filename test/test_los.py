@@ -0,0 +1,198 @@
+import random
+import unittest
+
+from gridly import DenseGrid, SparseGrid, Location
+from gridly.los import line, line_of_sight, lines_of_sight, raycast, field_of_view
+
+
+def is_wall(cell):
+    return cell == '#'
+
+
+def make_grid(rows, grid_type=DenseGrid):
+    grid = grid_type(len(rows), len(rows[0]), fill='.')
+    for row, cells in enumerate(rows):
+        for column, cell in enumerate(cells):
+            grid[row, column] = cell
+    return grid
+
+
+ROOM = [
+    '..........',
+    '..........',
+    '....#.....',
+    '..........',
+    '..........',
+    '.......###',
+    '..........',
+]
+
+
+class TestLine(unittest.TestCase):
+    def test_single(self):
+        self.assertEqual(line((2, 3), (2, 3)), [Location(2, 3)])
+
+    def test_straight(self):
+        self.assertEqual(line((0, 0), (0, 3)), [(0, 0), (0, 1), (0, 2), (0, 3)])
+        self.assertEqual(line((3, 1), (0, 1)), [(3, 1), (2, 1), (1, 1), (0, 1)])
+
+    def test_diagonal(self):
+        self.assertEqual(line((0, 3), (3, 0)), [(0, 3), (1, 2), (2, 1), (3, 0)])
+
+    def test_properties(self):
+        rng = random.Random(3)
+        for _ in range(200):
+            start = (rng.randrange(-10, 10), rng.randrange(-10, 10))
+            end = (rng.randrange(-10, 10), rng.randrange(-10, 10))
+            points = line(start, end)
+            self.assertEqual(points[0], start)
+            self.assertEqual(points[-1], end)
+            self.assertEqual(
+                len(points),
+                max(abs(end[0] - start[0]), abs(end[1] - start[1])) + 1)
+            for a, b in zip(points, points[1:]):
+                self.assertLessEqual(max(abs(a[0] - b[0]), abs(a[1] - b[1])), 1)
+
+
+class TestLineOfSight:
+    grid_type = None
+
+    def setUp(self):
+        self.grid = make_grid(ROOM, self.grid_type)
+
+    def brute(self, start, end):
+        return not any(is_wall(self.grid[location]) for location in line(start, end)[1:-1])
+
+    def test_line_of_sight(self):
+        self.assertTrue(line_of_sight(self.grid, (6, 0), (0, 9), is_wall))
+        self.assertFalse(line_of_sight(self.grid, (0, 0), (6, 9), is_wall))
+        self.assertFalse(line_of_sight(self.grid, (2, 0), (2, 9), is_wall))
+        # Walls themselves are visible
+        self.assertTrue(line_of_sight(self.grid, (2, 0), (2, 4), is_wall))
+        self.assertTrue(line_of_sight(self.grid, (3, 3), (3, 3), is_wall))
+
+    def test_out_of_range(self):
+        with self.assertRaises(IndexError):
+            line_of_sight(self.grid, (0, 0), (7, 0), is_wall)
+        with self.assertRaises(IndexError):
+            lines_of_sight(self.grid, [((0, 0), (1, 1)), ((0, -1), (1, 1))], is_wall)
+
+    def test_batch(self):
+        rng = random.Random(5)
+        pairs = [
+            (Location(rng.randrange(7), rng.randrange(10)),
+             Location(rng.randrange(7), rng.randrange(10)))
+            for _ in range(300)]
+        self.assertEqual(
+            lines_of_sight(self.grid, pairs, is_wall),
+            [self.brute(start, end) for start, end in pairs])
+
+    def test_batch_reads_each_cell_once(self):
+        seen = []
+
+        def opaque(cell):
+            seen.append(cell)
+            return is_wall(cell)
+
+        lines_of_sight(self.grid, [((0, 0), (0, 9))] * 3, opaque)
+        self.assertEqual(len(seen), 8)
+
+    def test_raycast(self):
+        self.assertEqual(raycast(self.grid, (2, 0), (2, 1), is_wall), (2, 4))
+        # The ray continues past its target
+        self.assertEqual(raycast(self.grid, (5, 0), (5, 2), is_wall), (5, 7))
+        self.assertIsNone(raycast(self.grid, (0, 0), (1, 0), is_wall))
+        self.assertIsNone(raycast(self.grid, (2, 0), (2, 1), is_wall, max_distance=3))
+        self.assertEqual(raycast(self.grid, (2, 0), (2, 1), is_wall, max_distance=4), (2, 4))
+
+    def test_raycast_matches_lines(self):
+        # A ray follows the line toward a point far along the same direction
+        rng = random.Random(7)
+        for _ in range(300):
+            start = Location(rng.randrange(7), rng.randrange(10))
+            toward = Location(rng.randrange(-9, 16), rng.randrange(-9, 19))
+            if start == toward:
+                continue
+            far = (start[0] + 30 * (toward[0] - start[0]), start[1] + 30 * (toward[1] - start[1]))
+            expected = None
+            for location in line(start, far)[1:]:
+                if not (0 <= location[0] < 7 and 0 <= location[1] < 10):
+                    break
+                if is_wall(self.grid[location]):
+                    expected = location
+                    break
+            self.assertEqual(raycast(self.grid, start, toward, is_wall), expected)
+
+    def test_raycast_errors(self):
+        with self.assertRaises(ValueError):
+            raycast(self.grid, (1, 1), (1, 1), is_wall)
+        with self.assertRaises(IndexError):
+            raycast(self.grid, (7, 0), (0, 0), is_wall)
+
+    def test_field_of_view_open(self):
+        grid = make_grid(['.....'] * 5, self.grid_type)
+        self.assertEqual(field_of_view(grid, (2, 2), is_wall), set(grid.locations()))
+        self.assertEqual(
+            field_of_view(grid, (2, 2), is_wall, radius=1),
+            {Location(2, 2)} | set(Location(2, 2).adjacent()))
+
+    def test_field_of_view_walls(self):
+        grid = make_grid([
+            '.....',
+            '.###.',
+            '.#.#.',
+            '.###.',
+            '.....',
+        ], self.grid_type)
+        inside = field_of_view(grid, (2, 2), is_wall)
+        self.assertEqual(inside, {
+            Location(row, column) for row in range(1, 4) for column in range(1, 4)})
+
+        outside = field_of_view(grid, (0, 0), is_wall)
+        self.assertIn(Location(1, 1), outside)
+        self.assertIn(Location(4, 0), outside)
+        self.assertIn(Location(0, 4), outside)
+        self.assertNotIn(Location(4, 4), outside)
+        self.assertNotIn(Location(2, 2), outside)
+
+    def test_field_of_view_symmetric_shadow(self):
+        grid = make_grid([
+            '.......',
+            '.......',
+            '...#...',
+            '.......',
+            '.......',
+        ], self.grid_type)
+        visible = field_of_view(grid, (4, 3), is_wall)
+        self.assertIn(Location(2, 3), visible)
+        self.assertNotIn(Location(0, 3), visible)
+        self.assertNotIn(Location(1, 3), visible)
+        self.assertIn(Location(0, 0), visible)
+        self.assertIn(Location(0, 6), visible)
+
+    def test_field_of_view_out_of_range(self):
+        with self.assertRaises(IndexError):
+            field_of_view(self.grid, (0, 10), is_wall)
+
+
+class TestDenseLineOfSight(TestLineOfSight, unittest.TestCase):
+    grid_type = DenseGrid
+
+
+class TestSparseLineOfSight(TestLineOfSight, unittest.TestCase):
+    grid_type = SparseGrid
+
+
+class TestLargeGrid(unittest.TestCase):
+    def test_cost_follows_the_ray(self):
+        # Only the cells along the ray (or within the radius) are read
+        grid = SparseGrid(4000, 4000, fill='.')
+        reads = []
+
+        def opaque(cell):
+            reads.append(cell)
+            return is_wall(cell)
+
+        self.assertTrue(line_of_sight(grid, (10, 10), (10, 15), opaque))
+        self.assertEqual(len(reads), 4)
+        self.assertEqual(len(field_of_view(grid, (2000, 2000), opaque, radius=2)), 13)
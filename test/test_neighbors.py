@@ -0,0 +1,57 @@
+import unittest
+from gridly import DenseGrid, SparseGrid, Location as Loc
+from gridly import ADJACENT, DIAGONALS, SURROUNDING
+from gridly.neighbors import neighbor_table
+
+
+class TestNeighborTable(unittest.TestCase):
+    def test_matches_location_methods(self):
+        grid = SparseGrid(4, 5)
+        for stencil, method in (
+                (ADJACENT, Loc.adjacent),
+                (DIAGONALS, Loc.diagonals),
+                (SURROUNDING, Loc.surrounding)):
+            for location in grid.locations():
+                self.assertEqual(
+                    set(grid.neighbors(location, stencil)),
+                    set(grid.in_bounds(method(location))))
+
+    def test_corner(self):
+        grid = DenseGrid(3, 3)
+        self.assertEqual(grid.neighbors((0, 0)), [Loc(0, 1), Loc(1, 0)])
+        self.assertEqual(len(grid.neighbors((1, 1), SURROUNDING)), 8)
+
+    def test_custom_stencil(self):
+        knight = [[-2, -1], [-2, 1], [-1, -2], [-1, 2], [1, -2], [1, 2], [2, -1], [2, 1]]
+        grid = DenseGrid(5, 5)
+        self.assertEqual(
+            grid.neighbors((0, 0), knight), [Loc(1, 2), Loc(2, 1)])
+        self.assertEqual(len(grid.neighbors((2, 2), knight)), 8)
+
+    def test_single_row(self):
+        grid = DenseGrid(1, 3)
+        self.assertEqual(grid.neighbors((0, 1), SURROUNDING), [Loc(0, 0), Loc(0, 2)])
+
+    def test_bounds_check(self):
+        grid = DenseGrid(3, 3)
+        with self.assertRaises(IndexError):
+            grid.neighbors((3, 0))
+
+    def test_neighbor_cells(self):
+        grid = DenseGrid(2, 2, func=lambda loc: loc[0] * 2 + loc[1])
+        self.assertEqual(
+            sorted(grid.neighbor_cells((0, 0), SURROUNDING)),
+            [((0, 1), 1), ((1, 0), 2), ((1, 1), 3)])
+
+    def test_cached(self):
+        self.assertIs(neighbor_table(3, 4), neighbor_table(3, 4, ADJACENT))
+        self.assertIs(
+            DenseGrid(3, 4).neighbor_table(SURROUNDING),
+            SparseGrid(3, 4).neighbor_table(SURROUNDING))
+
+    def test_neighbor_indices(self):
+        grid = DenseGrid(3, 4)
+        self.assertEqual(grid.neighbor_indices(5), [1, 4, 6, 9])
+        self.assertEqual(grid.neighbor_indices(11, SURROUNDING), [6, 7, 10])
+        with self.assertRaises(IndexError):
+            grid.neighbor_indices(12)
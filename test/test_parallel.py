@@ -0,0 +1,80 @@
+import operator
+import pickle
+import unittest
+
+from gridly import TypedDenseGrid, ADJACENT
+from gridly.parallel import SharedDenseGrid, map_bands, reduce_bands
+
+
+def neighbor_sums(source, dest, offset):
+    for row in range(dest.num_rows):
+        for column in range(dest.num_columns):
+            dest[row, column] = sum(
+                cell for _, cell in source.neighbor_cells((row + offset, column), ADJACENT))
+    return dest.num_rows
+
+
+def band_sum(view, offset):
+    return sum(sum(row) for row in view.rows())
+
+
+def band_top(view, dest, offset):
+    return view[offset, 0]
+
+
+class TestSharedDenseGrid(unittest.TestCase):
+    def test_pickle_attaches(self):
+        with SharedDenseGrid(3, 4, 'l', fill=2) as grid:
+            attached = pickle.loads(pickle.dumps(grid))
+            self.assertLess(len(pickle.dumps(grid)), 200)
+            attached[1, 1] = 5
+            self.assertEqual(grid[1, 1], 5)
+            self.assertEqual(attached[0, 0], 2)
+            with self.assertRaises(TypeError):
+                attached.unlink()
+            attached.close()
+
+    def test_from_grid(self):
+        grid = TypedDenseGrid(2, 3, 'd', func=lambda loc: loc[0] + loc[1] / 2)
+        with SharedDenseGrid.from_grid(grid) as shared:
+            self.assertEqual(list(shared.content), list(grid.content))
+
+
+class TestParallel(unittest.TestCase):
+    def setUp(self):
+        self.source = SharedDenseGrid(9, 5, 'l')
+        self.dest = SharedDenseGrid(9, 5, 'l')
+        for location in self.source.locations():
+            self.source[location] = location[0] * 5 + location[1]
+        self.expected = TypedDenseGrid(9, 5, 'l')
+        neighbor_sums(self.source, self.expected, 0)
+
+    def tearDown(self):
+        for grid in (self.source, self.dest):
+            grid.close()
+            grid.unlink()
+
+    def test_map_halo(self):
+        for processes in (1, 2):
+            self.dest.fill_rect(0, 0, 9, 5, 0)
+            results = map_bands(
+                neighbor_sums, self.source, self.dest,
+                halo=1, band_rows=2, processes=processes)
+            self.assertEqual(results, [2, 2, 2, 2, 1])
+            self.assertEqual(list(self.dest.content), list(self.expected.content))
+
+    def test_band_offsets(self):
+        results = map_bands(band_top, self.source, halo=2, band_rows=3, processes=1)
+        self.assertEqual(results, [0, 15, 30])
+
+    def test_reduce(self):
+        for processes in (1, 2):
+            self.assertEqual(
+                reduce_bands(band_sum, self.source, operator.add, band_rows=4, processes=processes),
+                sum(range(45)))
+
+    def test_errors(self):
+        with self.assertRaises(TypeError):
+            map_bands(band_top, TypedDenseGrid(2, 2, 'l'), processes=1)
+        with self.assertRaises(ValueError):
+            map_bands(neighbor_sums, self.source, self.source, halo=1, processes=1)
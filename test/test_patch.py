@@ -0,0 +1,129 @@
+import unittest
+
+from gridly import (
+    DenseGrid, TypedDenseGrid, SparseGrid, ChunkedGrid, Patch, diff, apply_patch)
+from gridly.tracking import ChangeTracker
+
+
+class TestPatch:
+    '''
+    Test diff and apply_patch between two grids made by make_grid, which are
+    5x6 and filled with 0.
+    '''
+    def setUp(self):
+        self.a = self.make_grid(5, 6)
+        self.b = self.make_grid(5, 6)
+
+    def assertSame(self, a, b):
+        self.assertEqual([list(row) for row in a.rows()], [list(row) for row in b.rows()])
+
+    def test_identical(self):
+        patch = diff(self.a, self.b)
+        self.assertFalse(patch)
+        self.assertEqual(len(patch), 0)
+
+    def test_runs(self):
+        self.b[1, 1] = 1
+        self.b[1, 2] = 2
+        self.b[1, 4] = 3
+        self.b[4, 0] = 4
+        self.a[3, 3] = 5
+
+        patch = diff(self.a, self.b)
+        self.assertEqual(
+            [(row, column, list(values)) for row, column, values in patch.runs],
+            [(1, 1, [1, 2]), (1, 4, [3]), (3, 3, [0]), (4, 0, [4])])
+        self.assertEqual(len(patch), 5)
+
+        apply_patch(self.a, patch)
+        self.assertSame(self.a, self.b)
+        self.assertFalse(diff(self.a, self.b))
+
+    def test_encoding(self):
+        self.b.fill_rect(2, 1, 2, 4, 9)
+        patch = diff(self.a, self.b)
+        for compress in (False, True):
+            decoded = Patch.decode(patch.encode(compress=compress))
+            self.assertEqual(decoded, patch)
+            apply_patch(self.a, decoded)
+            self.assertSame(self.a, self.b)
+
+
+class TestDensePatch(TestPatch, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return DenseGrid(num_rows, num_columns, fill=0)
+
+
+class Unsafe:
+    def __eq__(self, other):
+        return isinstance(other, Unsafe)
+
+
+class TestDensePatchDecoding(unittest.TestCase):
+    def test_untrusted_pickles(self):
+        patch = Patch(2, 2, [(0, 0, [(1, 2), 'x']), (1, 1, [Unsafe()])])
+        data = patch.encode()
+        with self.assertRaises(ValueError):
+            Patch.decode(data)
+        self.assertEqual(Patch.decode(data, trusted=True), patch)
+
+        plain = Patch(2, 2, [(0, 0, [(1, 2), 'x'])])
+        self.assertEqual(Patch.decode(plain.encode()), plain)
+
+
+class TestTypedDensePatch(TestPatch, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return TypedDenseGrid(num_rows, num_columns, 'h')
+
+    def test_encoding_is_raw(self):
+        self.b[0, 0] = 1
+        patch = diff(self.a, self.b)
+        self.assertEqual(patch.typecode, 'h')
+        self.assertLess(len(patch.encode()), 80)
+
+
+class TestSparsePatch(TestPatch, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        return SparseGrid(num_rows, num_columns, fill=0)
+
+    def test_scales_with_change(self):
+        a = SparseGrid(10 ** 6, 10 ** 6, fill=0)
+        b = SparseGrid(10 ** 6, 10 ** 6, fill=0)
+        b[123456, 654321] = 'x'
+        patch = diff(a, b)
+        self.assertEqual(list(patch), [((123456, 654321), 'x')])
+        apply_patch(a, Patch.decode(patch.encode()))
+        self.assertEqual(a.content, b.content)
+
+
+class TestMixedPatch(TestPatch, unittest.TestCase):
+    def make_grid(self, num_rows, num_columns):
+        if not hasattr(self, 'a'):
+            return ChunkedGrid(num_rows, num_columns, chunk_size=2, fill=0)
+        return SparseGrid(num_rows, num_columns, fill=0)
+
+
+class TestApplyPatch(unittest.TestCase):
+    def test_dimension_mismatch(self):
+        with self.assertRaises(ValueError):
+            diff(DenseGrid(2, 2), DenseGrid(2, 3))
+        with self.assertRaises(ValueError):
+            apply_patch(DenseGrid(2, 2), Patch(2, 3))
+
+    def test_out_of_range(self):
+        grid = DenseGrid(2, 2, fill=0)
+        with self.assertRaises(IndexError):
+            apply_patch(grid, Patch(2, 2, [(0, 0, [1]), (1, 1, [2, 3])]))
+        self.assertEqual(grid[0, 0], 0)
+
+    def test_observed(self):
+        a = DenseGrid(3, 3, fill=0)
+        b = DenseGrid(3, 3, fill=0)
+        b[2, 1] = 1
+        with ChangeTracker(a) as tracker:
+            apply_patch(a, diff(a, b))
+            self.assertEqual(tracker.drain().log, [((2, 1), 1)])
+
+    def test_not_a_patch(self):
+        with self.assertRaises(ValueError):
+            Patch.decode(b'GRIDLYSV' + bytes(64))
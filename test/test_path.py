@@ -0,0 +1,205 @@
+import random
+import unittest
+from gridly import DenseGrid, SparseGrid, Location as Loc, SURROUNDING
+from gridly.path import bfs, dijkstra, astar, distance_field, DistanceField
+
+MAZE = [
+    '.....',
+    '.###.',
+    '...#.',
+    '##.#.',
+    '.....',
+]
+
+
+def make_maze(grid_type=DenseGrid):
+    grid = grid_type(len(MAZE), len(MAZE[0]), fill='.')
+    for location in grid.locations():
+        grid[location] = MAZE[location[0]][location[1]]
+    return grid
+
+
+def passable(cell):
+    return cell != '#'
+
+
+def cost(cell):
+    return None if cell == '#' else 1
+
+
+def assertValidPath(test, grid, path, stencil_size=1):
+    for a, b in zip(path, path[1:]):
+        test.assertLessEqual(max(abs(a[0] - b[0]), abs(a[1] - b[1])), stencil_size)
+        test.assertTrue(passable(grid[b]))
+
+
+class TestPathSearch:
+    def setUp(self):
+        self.grid = make_maze()
+
+    def test_shortest(self):
+        path = self.search(self.grid, (2, 0), [(4, 4)])
+        self.assertEqual(path[0], Loc(2, 0))
+        self.assertEqual(path[-1], Loc(4, 4))
+        self.assertEqual(len(path), 7)
+        assertValidPath(self, self.grid, path)
+
+    def test_start_is_goal(self):
+        self.assertEqual(self.search(self.grid, (0, 0), [(0, 0)]), [Loc(0, 0)])
+
+    def test_nearest_goal(self):
+        path = self.search(self.grid, (0, 0), [(4, 4), (0, 4)])
+        self.assertEqual(path[-1], Loc(0, 4))
+        self.assertEqual(len(path), 5)
+
+    def test_unreachable(self):
+        self.grid[3, 4] = '#'
+        self.grid[4, 3] = '#'
+        self.assertIsNone(self.search(self.grid, (2, 0), [(4, 4)]))
+        self.assertIsNone(self.search(self.grid, (2, 0), []))
+
+    def test_diagonal(self):
+        path = self.search(self.grid, (2, 0), [(4, 4)], stencil=SURROUNDING)
+        self.assertEqual(len(path), 5)
+        assertValidPath(self, self.grid, path)
+
+    def test_sparse(self):
+        grid = make_maze(SparseGrid)
+        self.assertEqual(len(self.search(grid, (2, 0), [(4, 4)])), 7)
+
+    def test_bounds_check(self):
+        with self.assertRaises(IndexError):
+            self.search(self.grid, (5, 0), [(0, 0)])
+        with self.assertRaises(IndexError):
+            self.search(self.grid, (0, 0), [(0, 5)])
+
+
+class TestBFS(TestPathSearch, unittest.TestCase):
+    def search(self, grid, start, goals, **kwargs):
+        return bfs(grid, start, goals, passable, **kwargs)
+
+
+class TestDijkstra(TestPathSearch, unittest.TestCase):
+    def search(self, grid, start, goals, **kwargs):
+        return dijkstra(grid, start, goals, cost, **kwargs)
+
+    def test_weighted(self):
+        grid = DenseGrid(3, 3, fill=1)
+        grid[1, 1] = 10
+        path = dijkstra(grid, (1, 0), [(1, 2)], lambda cell: cell)
+        self.assertEqual(len(path), 5)
+        self.assertNotIn(Loc(1, 1), path)
+
+    def test_max_cost(self):
+        self.assertIsNone(dijkstra(self.grid, (2, 0), [(4, 4)], cost, max_cost=5))
+        self.assertIsNotNone(dijkstra(self.grid, (2, 0), [(4, 4)], cost, max_cost=6))
+
+    def test_negative_cost(self):
+        with self.assertRaises(ValueError):
+            dijkstra(self.grid, (0, 0), [(4, 4)], lambda cell: -1)
+
+
+class TestAStar(TestPathSearch, unittest.TestCase):
+    def search(self, grid, start, goals, **kwargs):
+        return astar(grid, start, goals, cost, **kwargs)
+
+    def test_matches_dijkstra(self):
+        grid = DenseGrid(8, 8, func=lambda loc: (loc[0] * 7 + loc[1] * 3) % 5 + 1)
+
+        def total(path):
+            return sum(grid[location] for location in path[1:])
+
+        for stencil in (None, SURROUNDING):
+            kwargs = {} if stencil is None else {'stencil': stencil}
+            expected = dijkstra(grid, (0, 0), [(7, 7)], lambda cell: cell, **kwargs)
+            actual = astar(grid, (0, 0), [(7, 7)], lambda cell: cell, **kwargs)
+            self.assertEqual(total(actual), total(expected))
+
+    def test_degenerate_stencil(self):
+        for stencil in ([(0, 0)], []):
+            self.assertIsNone(astar(self.grid, (2, 0), [(4, 4)], stencil=stencil))
+            self.assertEqual(astar(self.grid, (2, 0), [(2, 0)], stencil=stencil), [(2, 0)])
+
+
+class TestDistanceField(unittest.TestCase):
+    def setUp(self):
+        self.grid = make_maze()
+
+    def brute(self, grid, sources, **kwargs):
+        '''
+        The distance to every cell, by searching from each source separately.
+        '''
+        field = DenseGrid(grid.num_rows, grid.num_columns, fill=float('inf'))
+        for location in grid.locations():
+            for source in sources:
+                path = dijkstra(grid, source, [location], **kwargs)
+                if path is not None:
+                    distance = sum(kwargs['cost'](grid[step]) for step in path[1:])
+                    field[location] = min(field[location], distance)
+        return field
+
+    def test_manhattan(self):
+        field = self.grid.distance_field([(0, 0)], passable)
+        self.assertIsInstance(field, DistanceField)
+        self.assertEqual(field.typecode, 'd')
+        self.assertEqual(field[0, 0], 0)
+        self.assertEqual(field[4, 4], 8)
+        self.assertEqual(field[1, 1], float('inf'))
+        self.assertEqual(list(field.content), list(self.brute(self.grid, [(0, 0)], cost=cost).content))
+
+    def test_chebyshev(self):
+        field = distance_field(self.grid, [(2, 0)], passable, metric='chebyshev')
+        self.assertEqual(field[4, 4], 4)
+        open_field = distance_field(DenseGrid(5, 5), [(2, 2)], metric='chebyshev')
+        for location in open_field.locations():
+            self.assertEqual(open_field[location], max(abs(location[0] - 2), abs(location[1] - 2)))
+
+    def test_weighted(self):
+        grid = DenseGrid(6, 6, func=lambda loc: (loc[0] * 7 + loc[1] * 3) % 5 + 1)
+        grid[2, 2] = None
+        sources = [(0, 0), (5, 3)]
+        field = distance_field(grid, sources, metric=lambda cell: cell)
+        self.assertEqual(
+            list(field.content),
+            list(self.brute(grid, sources, cost=lambda cell: cell).content))
+
+    def test_multiple_sources(self):
+        field = distance_field(self.grid, [(0, 0), (4, 0)], passable)
+        self.assertEqual(field[4, 4], 4)
+        self.assertEqual(field[2, 0], 2)
+
+    def test_errors(self):
+        with self.assertRaises(IndexError):
+            distance_field(self.grid, [(5, 0)])
+        with self.assertRaises(ValueError):
+            distance_field(self.grid, [(0, 0)], metric='euclidean')
+        with self.assertRaises(ValueError):
+            distance_field(self.grid, [(0, 0)], metric='manhattan', stencil=SURROUNDING)
+        with self.assertRaises(ValueError):
+            distance_field(self.grid, [(0, 0)], metric=lambda cell: -1)
+
+    def test_path(self):
+        field = distance_field(self.grid, [(4, 4)], passable)
+        path = field.path((2, 0))
+        self.assertEqual(path[0], Loc(2, 0))
+        self.assertEqual(path[-1], Loc(4, 4))
+        self.assertEqual(len(path), 7)
+        assertValidPath(self, self.grid, path)
+        self.assertIsNone(field.next_step((4, 4)))
+        self.assertIsNone(field.path((1, 1)))
+
+    def test_repair(self):
+        rng = random.Random(11)
+        grid = DenseGrid(12, 12, fill='.')
+        sources = [(0, 0), (11, 6)]
+        for metric in ('manhattan', 'chebyshev', lambda cell: None if cell == '#' else 2):
+            field = distance_field(grid, sources, passable, metric=metric)
+            for _ in range(30):
+                changed = [
+                    Loc(rng.randrange(12), rng.randrange(12))
+                    for _ in range(rng.randrange(1, 4))]
+                for location in changed:
+                    grid[location] = '#' if grid[location] == '.' else '.'
+                field.repair(changed)
+                expected = distance_field(grid, sources, passable, metric=metric)
+                self.assertEqual(list(field.content), list(expected.content))
@@ -0,0 +1,113 @@
+import unittest
+from gridly import DenseGrid, SparseGrid, Location as Loc, SURROUNDING
+from gridly.regions import flood, flood_fill, label
+
+MAP = [
+    'aa..b',
+    'a..bb',
+    '..c..',
+    'b.c.a',
+]
+
+
+def make_grid(grid_type):
+    grid = grid_type(len(MAP), len(MAP[0]), fill='.')
+    for location in grid.locations():
+        grid[location] = MAP[location[0]][location[1]]
+    return grid
+
+
+class TestFlood(unittest.TestCase):
+    def setUp(self):
+        self.grid = make_grid(DenseGrid)
+
+    def test_flood(self):
+        self.assertEqual(
+            set(flood(self.grid, (0, 0))), {Loc(0, 0), Loc(0, 1), Loc(1, 0)})
+        self.assertEqual(len(flood(self.grid, (0, 2))), 7)
+
+    def test_flood_match(self):
+        self.assertEqual(
+            len(flood(self.grid, (0, 0), lambda cell: cell != 'c')), 18)
+
+    def test_flood_fill(self):
+        self.assertEqual(flood_fill(self.grid, (2, 2), 'x'), 2)
+        self.assertEqual(self.grid[3, 2], 'x')
+        self.assertEqual(flood_fill(self.grid, (0, 4), 'b', stencil=SURROUNDING), 3)
+
+    def test_bounds_check(self):
+        with self.assertRaises(IndexError):
+            flood(self.grid, (4, 0))
+
+    def test_sparse(self):
+        sparse = make_grid(SparseGrid)
+        for seed in ((0, 0), (0, 2), (2, 2)):
+            self.assertEqual(flood(sparse, seed), flood(self.grid, seed))
+
+    def test_huge_sparse(self):
+        # Visiting a small region doesn't allocate anything for the whole grid
+        grid = SparseGrid(100000, 100000, fill=0)
+        grid.fill_rect(500, 500, 3, 4, 1)
+        self.assertEqual(len(flood(grid, (501, 502))), 12)
+
+
+class TestLabel:
+    def test_components(self):
+        labels, components = label(make_grid(self.grid_type), background='.')
+        self.assertEqual(
+            [(c.key, c.size) for c in components],
+            [('a', 3), ('b', 3), ('c', 2), ('b', 1), ('a', 1)])
+        self.assertEqual(components[1][3:], (0, 3, 2, 2))
+        self.assertEqual(components[2][3:], (2, 2, 2, 1))
+
+        self.assertEqual(labels[0, 0], 1)
+        self.assertEqual(labels[1, 3], 2)
+        self.assertEqual(labels[3, 0], 4)
+        self.assertEqual(labels[0, 2], 0)
+
+    def test_surrounding(self):
+        grid = self.grid_type(3, 3, fill=0)
+        grid[0, 0] = 1
+        grid[1, 1] = 1
+        grid[2, 0] = 1
+        self.assertEqual(len(label(grid, background=0).components), 3)
+        labels, components = label(grid, background=0, stencil=SURROUNDING)
+        self.assertEqual(len(components), 1)
+        self.assertEqual(components[0].size, 3)
+
+    def test_merging(self):
+        # A U shape, whose arms only join at the bottom row
+        grid = self.grid_type(3, 3, fill=0)
+        for location in ((0, 0), (1, 0), (2, 0), (2, 1), (2, 2), (1, 2), (0, 2)):
+            grid[location] = 1
+        labels, components = label(grid, background=0)
+        self.assertEqual(len(components), 1)
+        self.assertEqual(labels[0, 2], 1)
+
+
+class TestLabelDense(TestLabel, unittest.TestCase):
+    grid_type = DenseGrid
+
+
+class TestLabelSparse(TestLabel, unittest.TestCase):
+    grid_type = SparseGrid
+
+    def test_default_background(self):
+        grid = SparseGrid(2, 2, fill=0)
+        grid[0, 0] = 5
+        labels, components = label(grid)
+        self.assertEqual(components, [(1, 5, 1, 0, 0, 1, 1)])
+        self.assertEqual(labels.content, {(0, 0): 1})
+
+    def test_default_background_is_key_of_fill(self):
+        # 'A' is stored, but has the same key as the fill
+        grid = SparseGrid(2, 3, fill='a')
+        grid[0, 0] = 'A'
+        grid[0, 2] = 'b'
+        labels, components = label(grid, key=str.upper)
+        self.assertEqual([component.key for component in components], ['B'])
+        self.assertEqual(label(grid, key=str.upper, background='A').components, components)
+
+    def test_background_must_be_fill(self):
+        with self.assertRaises(ValueError):
+            label(SparseGrid(2, 2, fill=0), background=1)
@@ -0,0 +1,202 @@
+import io
+import os
+import tempfile
+import unittest
+from gridly import (
+    DenseGrid, TypedDenseGrid, SparseGrid, ChunkedGrid, MappedGrid, NumpyGrid,
+    Location, Direction)
+from gridly.serialize import GridReader, GridWriter, load, load_into, save
+
+
+def roundtrip(grid, **kwargs):
+    file = io.BytesIO()
+    grid.save(file, **kwargs)
+    file.seek(0)
+    return load(file)
+
+
+class Unsafe:
+    '''
+    A class which the restricted unpickler refuses.
+    '''
+    def __eq__(self, other):
+        return isinstance(other, Unsafe)
+
+
+class TestSerialize(unittest.TestCase):
+    def test_dense(self):
+        grid = DenseGrid(3, 4, func=lambda loc: (loc, 'x' * loc[1]))
+        for compress in (False, True):
+            loaded = roundtrip(grid, compress=compress)
+            self.assertIs(type(loaded), DenseGrid)
+            self.assertEqual(loaded.content, grid.content)
+
+    def test_typed(self):
+        grid = TypedDenseGrid(3, 4, 'd', func=lambda loc: loc[0] / 2 + loc[1])
+        for compress in (False, True):
+            loaded = roundtrip(grid, compress=compress)
+            self.assertIs(type(loaded), TypedDenseGrid)
+            self.assertEqual(loaded.typecode, 'd')
+            self.assertEqual(loaded.content, grid.content)
+
+    def test_typed_is_compact(self):
+        file = io.BytesIO()
+        TypedDenseGrid(100, 100, 'b').save(file)
+        self.assertLess(len(file.getvalue()), 100 * 100 + 64)
+
+    def test_sparse(self):
+        grid = SparseGrid(10000, 10000, fill='.')
+        grid[5, 5] = 'a'
+        grid[9999, 0] = 'b'
+        for compress in (False, True):
+            file = io.BytesIO()
+            grid.save(file, compress=compress)
+            self.assertLess(len(file.getvalue()), 200)
+            file.seek(0)
+            loaded = SparseGrid.load(file)
+            self.assertEqual(loaded.fill, '.')
+            self.assertEqual(loaded.content, grid.content)
+
+    def test_sparse_typed(self):
+        for fill, values, typecode in ((0, (5, -2 ** 40), 'q'), (0.5, (1.25, -3.0), 'd')):
+            grid = SparseGrid(10000, 10000, fill=fill)
+            grid[5, 5], grid[9999, 0] = values
+            file = io.BytesIO()
+            grid.save(file)
+            file.seek(0)
+            self.assertEqual(GridReader(file).typecode, typecode)
+            file.seek(0)
+            loaded = SparseGrid.load(file)
+            self.assertEqual(loaded.fill, fill)
+            self.assertEqual(type(loaded.fill), type(fill))
+            self.assertEqual(loaded.content, grid.content)
+
+        # Mixed values are pickled
+        grid = SparseGrid(3, 3, fill=0)
+        grid[1, 1] = 'x'
+        self.assertEqual(roundtrip(grid).content, grid.content)
+
+    def test_untrusted_pickles(self):
+        grid = DenseGrid(2, 2, func=lambda loc: [loc, Direction.up, {1.5j}, b'x', None])
+        self.assertEqual(roundtrip(grid).content, grid.content)
+
+        grid[0, 0] = Unsafe()
+        file = io.BytesIO()
+        grid.save(file)
+        for loader in (load, DenseGrid.load):
+            file.seek(0)
+            with self.assertRaises(ValueError):
+                loader(file)
+        file.seek(0)
+        self.assertEqual(DenseGrid.load(file, trusted=True)[0, 0], Unsafe())
+
+        sparse = SparseGrid(2, 2, fill=Unsafe())
+        file = io.BytesIO()
+        sparse.save(file)
+        file.seek(0)
+        with self.assertRaises(ValueError):
+            load(file)
+
+    @unittest.skipIf(NumpyGrid is None, "numpy is not installed")
+    def test_load_as_numpy(self):
+        file = io.BytesIO()
+        TypedDenseGrid(2, 3, 'l', content=range(6)).save(file)
+        file.seek(0)
+        grid = NumpyGrid.load(file)
+        self.assertIsInstance(grid, NumpyGrid)
+        self.assertEqual(grid.content.tolist(), [[0, 1, 2], [3, 4, 5]])
+
+    def test_load_as_chunked(self):
+        sparse = SparseGrid(10, 10, fill=0)
+        sparse[7, 7] = 3
+        file = io.BytesIO()
+        sparse.save(file)
+        file.seek(0)
+        grid = ChunkedGrid.load(file)
+        self.assertIsInstance(grid, ChunkedGrid)
+        self.assertEqual((grid[7, 7], grid[0, 0], grid.num_chunks), (3, 0, 1))
+
+    def test_load_as_mapped(self):
+        file = io.BytesIO()
+        TypedDenseGrid(2, 2, 'l').save(file)
+        file.seek(0)
+        with self.assertRaises(TypeError):
+            MappedGrid.load(file)
+
+    def test_other_grids_are_dense(self):
+        grid = ChunkedGrid(4, 4, chunk_size=2, typecode='l')
+        grid[3, 3] = 5
+        loaded = roundtrip(grid)
+        self.assertEqual(loaded.typecode, 'l')
+        self.assertEqual(loaded[3, 3], 5)
+
+    def test_load_type_check(self):
+        file = io.BytesIO()
+        DenseGrid(2, 2).save(file)
+        file.seek(0)
+        with self.assertRaises(ValueError):
+            SparseGrid.load(file)
+
+    def test_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'grid')
+            DenseGrid(2, 2, fill=1).save(path)
+            self.assertEqual(DenseGrid.load(path).content, [1] * 4)
+
+    def test_not_a_grid(self):
+        with self.assertRaises(ValueError):
+            load(io.BytesIO(b'nonsense' * 10))
+
+    def test_truncated(self):
+        file = io.BytesIO()
+        DenseGrid(2, 2).save(file)
+        with self.assertRaises(ValueError):
+            load(io.BytesIO(file.getvalue()[:-3]))
+
+
+class TestStreaming(unittest.TestCase):
+    def test_stream_rows(self):
+        file = io.BytesIO()
+        with GridWriter(file, 3, 2, typecode='l', compress=True) as writer:
+            for row in range(3):
+                writer.write_row([row, -row])
+
+        file.seek(0)
+        with GridReader(file) as reader:
+            self.assertEqual(reader.dimensions, (3, 2))
+            self.assertEqual(
+                [list(row) for row in reader.rows()], [[0, 0], [1, -1], [2, -2]])
+
+    def test_missing_rows(self):
+        writer = GridWriter(io.BytesIO(), 3, 2)
+        writer.write_row([1, 2])
+        with self.assertRaises(ValueError):
+            writer.write_row([1])
+        with self.assertRaises(ValueError):
+            writer.close()
+
+    def test_load_into_mapped(self):
+        grid = TypedDenseGrid(4, 3, 'd', func=lambda loc: loc[0] * 3 + loc[1])
+        file = io.BytesIO()
+        grid.save(file, compress=True)
+        file.seek(0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with MappedGrid.create(os.path.join(directory, 'grid'), 4, 3, 'd') as mapped:
+                load_into(file, mapped)
+                self.assertEqual(list(mapped.content), list(grid.content))
+
+    def test_load_into_sparse(self):
+        grid = SparseGrid(3, 3, fill=0)
+        grid[1, 1] = 4
+        file = io.BytesIO()
+        save(grid, file)
+        file.seek(0)
+
+        dense = DenseGrid(3, 3, fill=0)
+        load_into(file, dense)
+        self.assertEqual(dense[1, 1], 4)
+
+        file.seek(0)
+        with self.assertRaises(ValueError):
+            load_into(file, DenseGrid(2, 3))
@@ -0,0 +1,108 @@
+import gc
+import threading
+import unittest
+
+from gridly import DenseGrid, TypedDenseGrid
+from gridly.automaton import Automaton
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.grid = DenseGrid(4, 3, func=lambda loc: loc[0] * 3 + loc[1])
+        self.original = [list(row) for row in self.grid.rows()]
+
+    def assertOriginal(self, snapshot):
+        self.assertEqual([list(row) for row in snapshot.rows()], self.original)
+
+    def test_unchanged(self):
+        snapshot = self.grid.snapshot()
+        self.assertOriginal(snapshot)
+        self.assertEqual(snapshot.num_saved_rows, 0)
+
+    def test_copy_on_write(self):
+        snapshot = self.grid.snapshot()
+        self.grid[1, 1] = 'x'
+        self.grid.set_many([((1, 2), 'y'), ((3, 0), 'z')])
+        self.assertEqual(snapshot[1, 1], 4)
+        self.assertEqual(snapshot.num_saved_rows, 2)
+        self.assertOriginal(snapshot)
+        self.assertEqual(self.grid[1, 1], 'x')
+
+    def test_rect_writes(self):
+        snapshot = self.grid.snapshot()
+        self.grid.fill_rect(0, 1, 2, 2, None)
+        self.grid.view(2, 0, 2, 3).transposed()[2, 1] = 'v'
+        self.assertOriginal(snapshot)
+        self.assertEqual(snapshot.num_saved_rows, 3)
+
+    def test_shared_rows(self):
+        first = self.grid.snapshot()
+        second = self.grid.snapshot()
+        self.grid[0, 0] = 'x'
+        self.assertIs(first._saved[0], second._saved[0])
+        third = self.grid.snapshot()
+        self.grid[0, 1] = 'y'
+        self.assertEqual(list(third.row(0)), ['x', 1, 2])
+        self.assertOriginal(second)
+
+    def test_read_only(self):
+        snapshot = self.grid.snapshot()
+        with self.assertRaises(TypeError):
+            snapshot[0, 0] = 1
+        with self.assertRaises(TypeError):
+            snapshot.fill_rect(0, 0, 1, 1, 1)
+
+    def test_release(self):
+        snapshot = self.grid.snapshot()
+        snapshot.release()
+        self.assertEqual(self.grid._observers, ())
+
+        with self.grid.snapshot():
+            pass
+        self.assertEqual(self.grid._observers, ())
+
+        self.grid.snapshot()
+        gc.collect()
+        self.grid[0, 0] = 1
+        self.assertEqual(self.grid._observers, ())
+
+    def test_fully_saved(self):
+        snapshot = self.grid.snapshot()
+        self.grid.fill_rect(0, 0, 4, 3, 0)
+        self.assertEqual(self.grid._observers, ())
+        self.assertOriginal(snapshot)
+
+    def test_typed(self):
+        grid = TypedDenseGrid(3, 3, 'l', fill=5)
+        snapshot = grid.snapshot()
+        grid.set_row(1, [1, 2, 3])
+        self.assertEqual(list(snapshot.row(1)), [5, 5, 5])
+
+    def test_automaton(self):
+        life = [[0, 0, 0, 1, 0, 0, 0, 0, 0], [0, 0, 1, 1, 0, 0, 0, 0, 0]]
+        for grid in (DenseGrid(5, 5, fill=0), TypedDenseGrid(5, 5, 'b')):
+            grid[2, 2] = 1
+            automaton = Automaton(grid, table=life)
+            snapshot = grid.snapshot()
+            # The second step writes the next generation into grid
+            automaton.step(2)
+            self.assertIs(automaton.grid, grid)
+            self.assertEqual(grid[2, 2], 0)
+            self.assertEqual(snapshot[2, 2], 1)
+
+    def test_concurrent_reader(self):
+        grid = DenseGrid(50, 20, fill=0)
+        snapshot = grid.snapshot()
+        errors = []
+
+        def read():
+            for _ in range(20):
+                if any(cell != 0 for row in snapshot.rows() for cell in row):
+                    errors.append('inconsistent')
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for value in range(1, 6):
+            grid.fill_rect(0, 0, 50, 20, value)
+        reader.join()
+        self.assertEqual(errors, [])
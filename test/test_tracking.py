@@ -0,0 +1,181 @@
+import copy
+import unittest
+
+from gridly import DenseGrid, SparseGrid, TypedDenseGrid, NumpyGrid
+from gridly.automaton import Automaton
+from gridly.tracking import ChangeTracker, GridObserver
+
+
+class Recorder(GridObserver):
+    def __init__(self):
+        self.events = []
+
+    def cells_changing(self, grid, locations):
+        self.events.append(('cells', locations, [grid.unsafe_get(location) for location in locations]))
+
+    def rect_changing(self, grid, top, left, num_rows, num_columns):
+        self.events.append(('rect', (top, left, num_rows, num_columns)))
+
+
+class TestObservers(unittest.TestCase):
+    def setUp(self):
+        self.grid = DenseGrid(4, 5, fill=0)
+        self.recorder = Recorder()
+        self.grid.add_observer(self.recorder)
+
+    def test_before_hooks(self):
+        self.grid[1, 2] = 3
+        self.grid[1, 2] = 4
+        self.grid.set_many([((0, 0), 1), ((3, 4), 2)])
+        self.grid.fill_rect(1, 1, 2, 2, 5)
+        self.grid.set_row(3, range(5))
+        self.grid.set_flat(6, 9)
+        self.assertEqual(self.recorder.events, [
+            ('cells', [(1, 2)], [0]),
+            ('cells', [(1, 2)], [3]),
+            ('cells', [(0, 0), (3, 4)], [0, 0]),
+            ('rect', (1, 1, 2, 2)),
+            ('rect', (3, 0, 1, 5)),
+            ('cells', [(1, 1)], [5]),
+        ])
+
+    def test_nested_writes_reported_once(self):
+        grid = SparseGrid(3, 3, fill=0)
+        recorder = Recorder()
+        grid.add_observer(recorder)
+        grid.fill_rect(0, 0, 2, 2, 1)
+        self.assertEqual(recorder.events, [('rect', (0, 0, 2, 2))])
+
+    def test_views(self):
+        self.grid.view(1, 1, 2, 2)[1, 0] = 7
+        self.assertEqual(self.recorder.events, [('cells', [(2, 1)], [0])])
+
+    def test_remove(self):
+        self.grid.remove_observer(self.recorder)
+        self.grid[0, 0] = 1
+        self.assertEqual(self.recorder.events, [])
+        self.assertNotIn('unsafe_set', vars(self.grid))
+        with self.assertRaises(ValueError):
+            self.grid.remove_observer(self.recorder)
+
+    def test_copies_are_unobserved(self):
+        clone = copy.copy(self.grid)
+        clone.content = list(clone.content)
+        clone[0, 0] = 1
+        self.assertEqual(self.recorder.events, [])
+        self.assertEqual(self.grid[0, 0], 0)
+
+
+class TestUnwrappedWritePaths(unittest.TestCase):
+    '''
+    Writes which don't go through the mutators report themselves as rect
+    changes.
+    '''
+    def test_keyword_arguments(self):
+        grid = DenseGrid(3, 3, fill=0)
+        recorder = Recorder()
+        grid.add_observer(recorder)
+        grid.unsafe_fill_rect(0, 1, 2, 2, value=7)
+        self.assertEqual(recorder.events, [('rect', (0, 1, 2, 2))])
+        self.assertEqual(grid[1, 2], 7)
+
+    @unittest.skipIf(NumpyGrid is None, "numpy is not installed")
+    def test_numpy_bulk_writes(self):
+        grid = NumpyGrid(4, 5)
+        recorder = Recorder()
+        grid.add_observer(recorder)
+        grid.fill(1, (1, 1, 2, 2))
+        grid.apply(lambda region: region + 1)
+        grid.assign(grid.eq(2), 5, None)
+        self.assertEqual(recorder.events, [
+            ('rect', (1, 1, 2, 2)),
+            ('rect', (0, 0, 4, 5)),
+            ('rect', (0, 0, 4, 5)),
+        ])
+
+    @unittest.skipIf(NumpyGrid is None, "numpy is not installed")
+    def test_numpy_views(self):
+        grid = NumpyGrid(4, 5)
+        view = grid.view(1, 1, 3, 3).transposed()
+        recorder = Recorder()
+        grid.add_observer(recorder)
+        view[0, 2] = 1
+        view.fill_rect(0, 0, 2, 1, 2)
+        self.assertEqual(grid[3, 1], 1)
+        self.assertEqual(recorder.events, [
+            ('cells', [(3, 1)], [0]),
+            ('rect', (1, 1, 1, 2)),
+        ])
+
+        # Views only forward changes while the grid is observed
+        grid.remove_observer(recorder)
+        self.assertFalse(view._observers)
+        nested = grid.view(0, 0, 2, 2).view(1, 1, 1, 1)
+        self.assertFalse(nested._observers)
+        grid.add_observer(recorder)
+        nested[0, 0] = 3
+        self.assertEqual(recorder.events[-1], ('cells', [(1, 1)], [2]))
+
+    def test_buffers_are_read_only_while_observed(self):
+        grid = TypedDenseGrid(2, 3, 'l')
+        with ChangeTracker(grid):
+            self.assertTrue(grid.memoryview().readonly)
+            self.assertTrue(grid.row_view(1).readonly)
+        self.assertFalse(grid.memoryview().readonly)
+
+    def test_automaton(self):
+        life = [[0, 0, 0, 1, 0, 0, 0, 0, 0], [0, 0, 1, 1, 0, 0, 0, 0, 0]]
+        grids = [TypedDenseGrid(6, 6, 'b'), DenseGrid(6, 6, fill=0)]
+        if NumpyGrid is not None:
+            grids.append(NumpyGrid(6, 6, dtype='b'))
+        for grid in grids:
+            grid.set_row(2, [0, 1, 1, 1, 0, 0])
+            automaton = Automaton(grid, table=life, tile_size=3)
+            back = automaton._back
+            with ChangeTracker(back) as tracker:
+                automaton.step()
+                self.assertIs(automaton.grid, back)
+                self.assertTrue(tracker.dirty)
+                self.assertIn(1, tracker.drain().rows)
+
+
+class TestChangeTracker(unittest.TestCase):
+    def setUp(self):
+        self.grid = TypedDenseGrid(10, 10, 'l')
+        self.tracker = ChangeTracker(self.grid, tile_size=4, log_size=5)
+
+    def tearDown(self):
+        self.tracker.close()
+
+    def test_drain(self):
+        self.assertFalse(self.tracker.dirty)
+        self.grid[1, 1] = 5
+        self.grid[9, 9] = 6
+        self.assertTrue(self.tracker.dirty)
+
+        changes = self.tracker.drain()
+        self.assertEqual(changes.cells, {(1, 1), (9, 9)})
+        self.assertEqual(changes.rows, [1, 9])
+        self.assertEqual(changes.tiles, [(0, 0), (2, 2)])
+        self.assertEqual(changes.log, [((1, 1), 5), ((9, 9), 6)])
+        self.assertTrue(changes.complete)
+
+        self.assertFalse(self.tracker.dirty)
+        self.assertEqual(self.tracker.drain().log, [])
+
+    def test_rect(self):
+        self.grid.fill_rect(3, 3, 2, 3, 1)
+        changes = self.tracker.drain()
+        self.assertEqual(len(changes.cells), 6)
+        self.assertEqual(changes.rows, [3, 4])
+        self.assertEqual(changes.tiles, [(0, 0), (0, 1), (1, 0), (1, 1)])
+        self.assertEqual(changes.log[-1], ((4, 5), 1))
+        self.assertFalse(changes.complete)
+
+    def test_tile_rect(self):
+        self.assertEqual(self.tracker.tile_rect((2, 1)), (8, 4, 2, 4))
+
+    def test_close(self):
+        self.tracker.close()
+        self.grid[0, 0] = 1
+        self.assertFalse(self.tracker.dirty)
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+'''
+Benchmarks for the grid types and their access paths.
+
+Each benchmark times a batch of operations over a grid of a given type, size
+and (for sparse grids) density, and reports the time per operation. Results
+are written as JSON, and can be compared against a saved baseline:
+
+    python util/benchmark.py --output baseline.json
+    python util/benchmark.py --baseline baseline.json
+
+The comparison flags every benchmark which is slower than the baseline by
+more than the threshold, and exits with status 1 if there are any. Grids and
+locations are generated from a fixed seed, so runs are reproducible.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gridly import (  # noqa: E402
+    Location, Direction, DenseGrid, TypedDenseGrid, SparseGrid, ChunkedGrid,
+    CompositeGrid, NumpyGrid, SURROUNDING)
+
+SIZES = ((32, 32), (512, 512))
+DENSITIES = (0.01, 0.5)
+SEED = 1234
+
+# The number of locations each access benchmark visits per run
+BATCH = 1000
+
+
+def make_grids(num_rows, num_columns, rng):
+    '''
+    Yield (name, grid) pairs for every grid type at a size, filled with
+    random small ints.
+    '''
+    values = [rng.randrange(100) for _ in range(num_rows * num_columns)]
+
+    yield 'dense', DenseGrid(num_rows, num_columns, content=values)
+    yield 'typed', TypedDenseGrid(num_rows, num_columns, 'l', content=values)
+    if NumpyGrid is not None:
+        yield 'numpy', NumpyGrid.from_numpy(
+            DenseGrid(num_rows, num_columns, content=values).to_numpy())
+
+    for density in DENSITIES:
+        sparse = SparseGrid(num_rows, num_columns, fill=0)
+        chunked = ChunkedGrid(num_rows, num_columns, fill=0)
+        pairs = [
+            (Location(*divmod(index, num_columns)), value + 1)
+            for index, value in enumerate(values) if rng.random() < density]
+        sparse.set_many(pairs)
+        chunked.set_many(pairs)
+        yield 'sparse-{}'.format(density), sparse
+        yield 'chunked-{}'.format(density), chunked
+
+
+def grid_benchmarks(grid, locations):
+    '''
+    Return a dict of benchmark name to (function, number of operations) for a
+    grid.
+    '''
+    unsafe_get = grid.unsafe_get
+    unsafe_set = grid.unsafe_set
+    pairs = [(location, 1) for location in locations]
+    cells = grid.num_rows * grid.num_columns
+
+    def getitem():
+        for location in locations:
+            grid[location]
+
+    def unsafe_get_loop():
+        for location in locations:
+            unsafe_get(location)
+
+    def setitem():
+        for location in locations:
+            grid[location] = 1
+
+    def unsafe_set_loop():
+        for location in locations:
+            unsafe_set(location, 1)
+
+    def get_many():
+        grid.get_many(locations)
+
+    def set_many():
+        grid.set_many(pairs)
+
+    def rows():
+        for row in grid.rows():
+            for cell in row:
+                pass
+
+    def cells_loop():
+        for location, cell in grid.cells():
+            pass
+
+    def neighbors():
+        for location in locations:
+            grid.neighbors(location, SURROUNDING)
+
+    return {
+        'getitem': (getitem, len(locations)),
+        'unsafe_get': (unsafe_get_loop, len(locations)),
+        'setitem': (setitem, len(locations)),
+        'unsafe_set': (unsafe_set_loop, len(locations)),
+        'get_many': (get_many, len(locations)),
+        'set_many': (set_many, len(locations)),
+        'rows': (rows, cells),
+        'cells': (cells_loop, cells),
+        'neighbors': (neighbors, len(locations)),
+    }
+
+
+def composite_benchmarks(grid, locations):
+    def proxy_get():
+        for location in locations:
+            grid[location][1]
+
+    def get_layer():
+        for location in locations:
+            grid.get_layer(location, 1)
+
+    def where():
+        grid.where([(0, '>', 50), (1, '!=', 0)])
+
+    return {
+        'proxy_get': (proxy_get, len(locations)),
+        'get_layer': (get_layer, len(locations)),
+        'where': (where, grid.num_rows * grid.num_columns),
+    }
+
+
+def location_benchmarks(locations):
+    def add():
+        for location in locations:
+            location + Direction.up
+
+    def above():
+        for location in locations:
+            location.above()
+
+    def adjacent():
+        for location in locations:
+            location.adjacent()
+
+    return {
+        'add': (add, len(locations)),
+        'above': (above, len(locations)),
+        'adjacent': (adjacent, len(locations)),
+    }
+
+
+def all_benchmarks():
+    '''
+    Yield (name, function, number of operations) for every benchmark.
+    '''
+    rng = random.Random(SEED)
+    for num_rows, num_columns in SIZES:
+        size = '{}x{}'.format(num_rows, num_columns)
+        locations = [
+            Location(rng.randrange(num_rows), rng.randrange(num_columns))
+            for _ in range(BATCH)]
+
+        grids = dict(make_grids(num_rows, num_columns, rng))
+        for grid_name, grid in grids.items():
+            for name, (func, ops) in grid_benchmarks(grid, locations).items():
+                yield '{}/{}/{}'.format(grid_name, size, name), func, ops
+
+        composite = CompositeGrid(grids['typed'], grids['sparse-0.5'])
+        for name, (func, ops) in composite_benchmarks(composite, locations).items():
+            yield 'composite/{}/{}'.format(size, name), func, ops
+
+    locations = [Location(rng.randrange(100), rng.randrange(100)) for _ in range(BATCH)]
+    for name, (func, ops) in location_benchmarks(locations).items():
+        yield 'location/{}'.format(name), func, ops
+
+
+def measure(func, ops, repeat, min_time):
+    '''
+    Return the best time per operation of func, in seconds, over repeat runs
+    of at least min_time seconds each.
+    '''
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat, number)) / (number * ops)
+
+
+def compare(results, baseline, threshold):
+    '''
+    Return a list of (name, baseline time, time) for every benchmark more
+    than threshold (a fraction) slower than the baseline.
+    '''
+    return [
+        (name, baseline[name], time)
+        for name, time in sorted(results.items())
+        if name in baseline and time > baseline[name] * (1 + threshold)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare the results against this JSON file")
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help="fraction slower than the baseline to flag as a regression (default 0.2)")
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('--repeat', type=int, default=5, help="runs per benchmark (default 5)")
+    parser.add_argument(
+        '--min-time', type=float, default=0.05,
+        help="minimum seconds per run (default 0.05)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, func, ops in all_benchmarks():
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, ops, args.repeat, args.min_time)
+        print('{:<40} {:>12.1f} ns/op'.format(name, results[name] * 1e9))
+
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print('REGRESSION {}: {:.1f} -> {:.1f} ns/op ({:+.0%})'.format(
+                name, before * 1e9, after * 1e9, after / before - 1))
+        if regressions:
+            return 1
+        print('No regressions against {}'.format(args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())